@@ -13,7 +13,8 @@ export default class FakeBridge implements Bridge {
   }
 
   handleDonation (command: CommandSystemDonate): void {
-    console.log(`[FakeBridge] received donation: ${command.key}=${command.json_string}`)
+    const encoding = command.content_encoding ?? 'identity'
+    console.log(`[FakeBridge] received donation (${encoding}): ${command.key}=${command.json_string}`)
   }
 
   handleExit (command: CommandSystemExit): void {
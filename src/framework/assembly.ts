@@ -4,13 +4,30 @@ import WorkerProcessingEngine from './processing/worker_engine'
 import { VisualisationEngine, ProcessingEngine, Bridge } from './types/modules'
 import CommandRouter from './command_router'
 
+const SESSION_ID_KEY = 'port-session-id'
+
+// The session id lasts as long as the browser tab, so a reloaded page continues the session
+// and the script resumes from its checkpoint (see port.checkpoint)
+function getSessionId (): string {
+  try {
+    const storedId = window.sessionStorage.getItem(SESSION_ID_KEY)
+    if (storedId !== null) return storedId
+    const sessionId = String(Date.now())
+    window.sessionStorage.setItem(SESSION_ID_KEY, sessionId)
+    return sessionId
+  } catch (e) {
+    // storage is not available (for example disabled by the browser), every page load is a new session
+    return String(Date.now())
+  }
+}
+
 export default class Assembly {
   visualisationEngine: VisualisationEngine
   processingEngine: ProcessingEngine
   router: CommandRouter
 
   constructor (worker: Worker, bridge: Bridge) {
-    const sessionId = String(Date.now())
+    const sessionId = getSessionId()
     this.visualisationEngine = new ReactEngine(new ReactFactory())
     this.router = new CommandRouter(bridge, this.visualisationEngine)
     this.processingEngine = new WorkerProcessingEngine(sessionId, worker, this.router)
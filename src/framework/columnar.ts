@@ -0,0 +1,48 @@
+import { isInstanceOf } from './helpers'
+
+// Binary columnar tables as produced by port.api.columnar (Python)
+// Every column arrives as a typed array, see the Python module for the layout
+
+export interface ColumnarColumn {
+  name: string
+  type: 'float64' | 'int32' | 'bool' | 'datetime' | 'string'
+  data: Float64Array | Int32Array | Uint8Array
+  offsets?: Int32Array
+  validity?: Uint8Array | null
+}
+
+export interface ColumnarTable {
+  __type__: 'ColumnarTable'
+  rowCount: number
+  columns: ColumnarColumn[]
+}
+export function isColumnarTable (arg: any): arg is ColumnarTable {
+  return isInstanceOf<ColumnarTable>(arg, 'ColumnarTable', ['rowCount', 'columns'])
+}
+
+// Renders every cell of a column as text, the same way String() renders
+// the values of a DataFrame.to_json() table (missing values become "null")
+export function columnTexts (column: ColumnarColumn, rowCount: number): string[] {
+  const texts = new Array<string>(rowCount)
+  const validity = column.validity
+  const isMissing = (row: number): boolean => validity != null && validity[row] === 0
+
+  if (column.type === 'string') {
+    const decoder = new TextDecoder()
+    const offsets = column.offsets as Int32Array
+    const data = column.data as Uint8Array
+    for (let row = 0; row < rowCount; row++) {
+      texts[row] = isMissing(row) ? 'null' : decoder.decode(data.subarray(offsets[row], offsets[row + 1]))
+    }
+  } else if (column.type === 'bool') {
+    for (let row = 0; row < rowCount; row++) {
+      texts[row] = isMissing(row) ? 'null' : String(column.data[row] !== 0)
+    }
+  } else {
+    for (let row = 0; row < rowCount; row++) {
+      const value = column.data[row]
+      texts[row] = isMissing(row) || Number.isNaN(value) ? 'null' : String(value)
+    }
+  }
+  return texts
+}
@@ -1,4 +1,4 @@
-import { Command, Response, isCommandSystem, isCommandSystemExit, isCommandUI, CommandUI, CommandSystem } from './types/commands'
+import { Command, Response, isCommandSystem, isCommandSystemExit, isCommandUI, isCommandBatch, CommandUI, CommandSystem, CommandBatch } from './types/commands'
 import { CommandHandler, Bridge, VisualisationEngine } from './types/modules'
 
 export default class CommandRouter implements CommandHandler {
@@ -16,6 +16,8 @@ export default class CommandRouter implements CommandHandler {
         this.onCommandSystem(command, resolve)
       } else if (isCommandUI(command)) {
         this.onCommandUI(command, resolve)
+      } else if (isCommandBatch(command)) {
+        this.onCommandBatch(command).then(resolve, reject)
       } else {
         reject(new TypeError('[CommandRouter] Unknown command' + JSON.stringify(command)))
       }
@@ -27,6 +29,14 @@ export default class CommandRouter implements CommandHandler {
     resolve({ __type__: 'Response', command, payload: { __type__: 'PayloadVoid', value: undefined } })
   }
 
+  async onCommandBatch (command: CommandBatch): Promise<Response> {
+    let response: Response = { __type__: 'Response', command, payload: { __type__: 'PayloadVoid', value: undefined } }
+    for (const batchedCommand of command.commands) {
+      response = await this.onCommand(batchedCommand)
+    }
+    return response
+  }
+
   onCommandUI (command: CommandUI, reject: (reason?: any) => void): void {
     this.visualisationEngine.render(command).then(
       (response) => { reject(response) },
@@ -1,5 +1,6 @@
-from port.main import start
+from port.main import start, start_async
 
 __all__ = [
-  "start"
+  "start",
+  "start_async",
 ]
@@ -0,0 +1,192 @@
+"""
+Binary columnar encoding of DataFrames for the consent form
+
+Instead of DataFrame.to_json() every column is sent as one contiguous buffer.
+Pyodide converts the memoryviews into JS typed arrays when the command is
+converted with toJs, so no cell is turned into text on the way to the UI.
+
+Layout (the schema header):
+
+    {
+        "__type__": "ColumnarTable",
+        "rowCount": n,
+        "columns": [
+            {"name": str, "type": "float64", "data": <n float64>},
+            {"name": str, "type": "int32", "data": <n int32>, "validity": <n uint8> | None},
+            {"name": str, "type": "bool", "data": <n uint8>, "validity": <n uint8> | None},
+            {"name": str, "type": "datetime", "data": <n float64, ms since epoch, NaN is missing>},
+            {"name": str, "type": "string", "offsets": <n + 1 int32>, "data": <utf8 bytes>,
+             "validity": <n uint8> | None},
+        ]
+    }
+
+Missing and infinite float64 values are NaN (to_json writes both as null),
+missing values in other columns have validity 0.
+Integers that do not fit in int32 are sent as float64 (JS numbers are doubles anyway).
+Floats are rounded to the 10 decimals DataFrame.to_json() keeps, so the consent
+form shows the same texts for both formats (see columnTexts in columnar.ts and
+column_texts below).
+"""
+import pandas as pd
+import numpy as np
+
+from port.helpers import js_string
+
+COLUMNAR_TABLE_TYPE = "ColumnarTable"
+
+# The default double_precision of DataFrame.to_json()
+DOUBLE_PRECISION = 10
+
+INT32_MIN = np.iinfo(np.int32).min
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def _validity(mask: np.ndarray) -> memoryview | None:
+    """
+    mask is True where a value is missing
+    """
+    if not mask.any():
+        return None
+    return memoryview(np.ascontiguousarray(~mask, dtype=np.uint8))
+
+
+def _encode_float(name: str, series: pd.Series) -> dict:
+    data = np.round(series.to_numpy(dtype=np.float64, na_value=np.nan), DOUBLE_PRECISION)
+    data[np.isinf(data)] = np.nan
+    return {"name": name, "type": "float64", "data": memoryview(np.ascontiguousarray(data))}
+
+
+def _encode_int(name: str, series: pd.Series) -> dict:
+    mask = series.isna().to_numpy()
+    values = series.to_numpy(dtype=np.float64, na_value=0)
+    if len(values) and (values.min() < INT32_MIN or values.max() > INT32_MAX):
+        return _encode_float(name, series)
+
+    data = np.ascontiguousarray(values.astype(np.int32))
+    return {"name": name, "type": "int32", "data": memoryview(data), "validity": _validity(mask)}
+
+
+def _encode_bool(name: str, series: pd.Series) -> dict:
+    mask = series.isna().to_numpy()
+    data = np.ascontiguousarray(series.fillna(False).to_numpy(dtype=np.uint8))
+    return {"name": name, "type": "bool", "data": memoryview(data), "validity": _validity(mask)}
+
+
+def _encode_datetime(name: str, series: pd.Series) -> dict:
+    if series.dt.tz is not None:
+        series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+    nanoseconds = series.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    data = nanoseconds.astype(np.float64) / 1e6
+    data[series.isna().to_numpy()] = np.nan
+    return {"name": name, "type": "datetime", "data": memoryview(np.ascontiguousarray(data))}
+
+
+def _encode_string(name: str, series: pd.Series) -> dict:
+    mask = series.isna().to_numpy()
+    encoded = [b"" if missing else str(value).encode("utf8") for value, missing in zip(series, mask)]
+
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if offsets[-1] > INT32_MAX:
+        raise ValueError(f"Column {name} is too large to be encoded")
+
+    return {
+        "name": name,
+        "type": "string",
+        "offsets": memoryview(offsets.astype(np.int32)),
+        "data": memoryview(b"".join(encoded)),
+        "validity": _validity(mask),
+    }
+
+
+def encode_table(df: pd.DataFrame) -> dict:
+    """
+    Encodes df as a ColumnarTable, see the module docstring for the layout
+    """
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_bool_dtype(series):
+            columns.append(_encode_bool(str(name), series))
+        elif pd.api.types.is_integer_dtype(series):
+            columns.append(_encode_int(str(name), series))
+        elif pd.api.types.is_float_dtype(series):
+            columns.append(_encode_float(str(name), series))
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            columns.append(_encode_datetime(str(name), series))
+        else:
+            columns.append(_encode_string(str(name), series))
+
+    return {"__type__": COLUMNAR_TABLE_TYPE, "rowCount": len(df), "columns": columns}
+
+
+def decode_table(table: dict) -> pd.DataFrame:
+    """
+    Reference decoder, turns a ColumnarTable back into a DataFrame
+    """
+    out = {}
+    for column in table["columns"]:
+        validity = column.get("validity")
+        mask = None if validity is None else np.frombuffer(validity, dtype=np.uint8) == 0
+
+        if column["type"] == "float64":
+            series = pd.Series(np.frombuffer(column["data"], dtype=np.float64))
+        elif column["type"] == "datetime":
+            milliseconds = np.frombuffer(column["data"], dtype=np.float64)
+            values = np.full(len(milliseconds), np.datetime64("NaT"), dtype="datetime64[ns]")
+            present = ~np.isnan(milliseconds)
+            values[present] = (milliseconds[present] * 1e6).astype(np.int64).view("datetime64[ns]")
+            series = pd.Series(values)
+        elif column["type"] == "int32":
+            series = pd.Series(np.frombuffer(column["data"], dtype=np.int32))
+            if mask is not None:
+                series = series.astype("Int32").mask(mask)
+        elif column["type"] == "bool":
+            series = pd.Series(np.frombuffer(column["data"], dtype=np.uint8).astype(bool))
+            if mask is not None:
+                series = series.astype("boolean").mask(mask)
+        elif column["type"] == "string":
+            offsets = np.frombuffer(column["offsets"], dtype=np.int32)
+            data = bytes(column["data"])
+            values = [data[offsets[i]:offsets[i + 1]].decode("utf8") for i in range(table["rowCount"])]
+            series = pd.Series(values, dtype=object)
+            if mask is not None:
+                series[mask] = None
+        else:
+            raise ValueError(f"Unknown column type: {column['type']}")
+
+        out[column["name"]] = series
+
+    return pd.DataFrame(out)
+
+
+def column_texts(column: dict, row_count: int) -> list[str]:
+    """
+    The texts of the cells of a column as the consent form shows them, see columnTexts in columnar.ts
+    """
+    validity = column.get("validity")
+    missing = np.zeros(row_count, dtype=bool) if validity is None else np.frombuffer(validity, dtype=np.uint8) == 0
+
+    if column["type"] == "string":
+        offsets = np.frombuffer(column["offsets"], dtype=np.int32)
+        data = bytes(column["data"])
+        return [
+            "null" if missing[row] else data[offsets[row]:offsets[row + 1]].decode("utf8")
+            for row in range(row_count)
+        ]
+    if column["type"] == "bool":
+        values = np.frombuffer(column["data"], dtype=np.uint8)
+        return ["null" if missing[row] else js_string(bool(values[row])) for row in range(row_count)]
+
+    values = np.frombuffer(column["data"], dtype=np.int32 if column["type"] == "int32" else np.float64)
+    missing = missing | np.isnan(values)
+    values = values.tolist()
+    return ["null" if missing[row] else js_string(values[row]) for row in range(row_count)]
+
+
+def table_texts(table: dict) -> dict[str, list[str]]:
+    """
+    The texts of the cells of a ColumnarTable by column name
+    """
+    return {column["name"]: column_texts(column, table["rowCount"]) for column in table["columns"]}
@@ -12,17 +12,19 @@ class CommandUIRender:
 
 
 class CommandSystemDonate:
-    __slots__ = "key", "json_string"
+    __slots__ = "key", "json_string", "content_encoding"
 
-    def __init__(self, key, json_string):
+    def __init__(self, key, json_string, content_encoding="identity"):
         self.key = key
         self.json_string = json_string
+        self.content_encoding = content_encoding
 
     def toDict(self):
         dict = {}
         dict["__type__"] = "CommandSystemDonate"
         dict["key"] = self.key
         dict["json_string"] = self.json_string
+        dict["content_encoding"] = self.content_encoding
         return dict
 
 
@@ -39,3 +41,21 @@ class CommandSystemExit:
         dict["code"] = self.code
         dict["info"] = self.info
         return dict
+
+
+class CommandBatch:
+    """
+    Several commands handled in one cycle, in order
+    The response to the batch is the response to its last command,
+    so only the last command may be one that waits for the participant
+    """
+    __slots__ = "commands"
+
+    def __init__(self, commands):
+        self.commands = commands
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "CommandBatch"
+        dict["commands"] = [command.toDict() for command in self.commands]
+        return dict
@@ -0,0 +1,152 @@
+"""
+Python counterparts of the payloads the UI sends back to the script
+
+In the browser these arrive as JsProxy objects, outside the browser
+(batch runs, replays) the script is driven with the classes below.
+Both expose the same `__type__` and `value` attributes.
+"""
+
+
+class PayloadVoid:
+    __slots__ = "value"
+    __type__ = "PayloadVoid"
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "PayloadVoid"
+        dict["value"] = self.value
+        return dict
+
+
+class PayloadTrue:
+    __slots__ = "value"
+    __type__ = "PayloadTrue"
+
+    def __init__(self, value=True):
+        self.value = value
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "PayloadTrue"
+        dict["value"] = self.value
+        return dict
+
+
+class PayloadFalse:
+    __slots__ = "value"
+    __type__ = "PayloadFalse"
+
+    def __init__(self, value=False):
+        self.value = value
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "PayloadFalse"
+        dict["value"] = self.value
+        return dict
+
+
+class PayloadError:
+    __slots__ = "value"
+    __type__ = "PayloadError"
+
+    def __init__(self, value):
+        self.value = value
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "PayloadError"
+        dict["value"] = self.value
+        return dict
+
+
+class PayloadString:
+    __slots__ = "value"
+    __type__ = "PayloadString"
+
+    def __init__(self, value):
+        self.value = value
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "PayloadString"
+        dict["value"] = self.value
+        return dict
+
+
+class PayloadStringList:
+    __slots__ = "value"
+    __type__ = "PayloadStringList"
+
+    def __init__(self, value):
+        self.value = value
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "PayloadStringList"
+        dict["value"] = list(self.value)
+        return dict
+
+
+class PayloadJSON:
+    __slots__ = "value"
+    __type__ = "PayloadJSON"
+
+    def __init__(self, value):
+        self.value = value
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "PayloadJSON"
+        dict["value"] = self.value
+        return dict
+
+
+class PayloadConsentDelta:
+    """
+    value: JSON with the row ids deleted in the consent form, see port.consent
+    """
+    __slots__ = "value"
+    __type__ = "PayloadConsentDelta"
+
+    def __init__(self, value):
+        self.value = value
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "PayloadConsentDelta"
+        dict["value"] = self.value
+        return dict
+
+
+PAYLOAD_TYPES = {
+    payload.__type__: payload
+    for payload in (
+        PayloadVoid,
+        PayloadTrue,
+        PayloadFalse,
+        PayloadError,
+        PayloadString,
+        PayloadStringList,
+        PayloadJSON,
+        PayloadConsentDelta,
+    )
+}
+
+
+def payload_from_dict(data):
+    """
+    Turns a payload in its wire format ({"__type__": ..., "value": ...})
+    back into one of the payload classes above
+    """
+    if data is None:
+        return None
+
+    payload_type = PAYLOAD_TYPES.get(data.get("__type__"))
+    if payload_type is None:
+        raise ValueError(f"Unknown payload type: {data.get('__type__')}")
+
+    return payload_type(data.get("value"))
@@ -3,6 +3,9 @@ from typing import Optional, TypedDict
 
 import pandas as pd
 
+from port.api.columnar import encode_table
+from port.search_index import build_search_index
+
 
 class Translations(TypedDict):
     """Typed dict containing text that is  display in a speficic language
@@ -51,9 +54,12 @@ class PropsUIFooter:
         progressPercentage: float indicating the progress in the flow
     """
 
+    progressPercentage: Optional[float] = None
+
     def toDict(self):
         dict = {}
         dict["__type__"] = "PropsUIFooter"
+        dict["progressPercentage"] = self.progressPercentage
         return dict
 
 
@@ -92,6 +98,13 @@ class PropsUIPromptConsentFormTable:
         title: title of the table
         data_frame: table to be shown
         visualizations: optional visualizations to be shown. (see TODO for input format)
+        folded: whether the table is folded when the page is shown
+        columnar: send the table as typed column buffers (see port.api.columnar) instead of JSON
+        search_index: send an index that lets the UI search without scanning every row (see port.search_index)
+        deleted_rows: row ids ([start, stop) ranges) shown as deleted, the participant can undo this
+
+    The data_frame gets a fresh RangeIndex: the position of a row is its row id,
+    the UI reports deleted rows by these ids (see port.consent)
     """
 
     id: str
@@ -100,16 +113,26 @@ class PropsUIPromptConsentFormTable:
     description: Optional[Translatable] = None
     visualizations: Optional[list] = None
     folded: Optional[bool] = False
+    columnar: Optional[bool] = False
+    search_index: Optional[bool] = False
+    deleted_rows: Optional[list[list[int]]] = None
+
+    def __post_init__(self):
+        self.data_frame = self.data_frame.reset_index(drop=True)
 
     def toDict(self):
         dict = {}
         dict["__type__"] = "PropsUIPromptConsentFormTable"
         dict["id"] = self.id
         dict["title"] = self.title.toDict()
-        dict["data_frame"] = self.data_frame.to_json()
+        dict["data_frame"] = encode_table(self.data_frame) if self.columnar else self.data_frame.to_json()
         dict["description"] = self.description.toDict() if self.description else None
         dict["visualizations"] = self.visualizations if self.visualizations else None
         dict["folded"] = self.folded
+        dict["search_index"] = (
+            build_search_index(self.data_frame, json_cells=not self.columnar) if self.search_index else None
+        )
+        dict["deleted_rows"] = self.deleted_rows
         return dict
 
 
@@ -151,6 +174,30 @@ class PropsUIPromptConsentForm:
         return dict
 
 
+@dataclass
+class PropsUIPromptProgress:
+    """Shows the progress of a long running step, like the extraction of a file
+    Rendering it resolves immediately with PayloadVoid, so the script can continue
+
+    Attributes:
+        description: text with an explanation
+        message: short text shown below the progress bar, example: "12000 rows"
+        percentage: progress between 0 and 100, None if unknown
+    """
+
+    description: Translatable
+    message: str
+    percentage: Optional[float] = None
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "PropsUIPromptProgress"
+        dict["description"] = self.description.toDict()
+        dict["message"] = self.message
+        dict["percentage"] = self.percentage
+        return dict
+
+
 @dataclass
 class PropsUIPromptFileInput:
     """Prompt the user to submit a file
@@ -158,16 +205,19 @@ class PropsUIPromptFileInput:
     Attributes:
         description: text with an explanation
         extensions: accepted mime types, example: "application/zip, text/plain"
+        multiple: whether several files can be selected, they are sent back as PayloadStringList
     """
 
     description: Translatable
     extensions: str
+    multiple: Optional[bool] = False
 
     def toDict(self):
         dict = {}
         dict["__type__"] = "PropsUIPromptFileInput"
         dict["description"] = self.description.toDict()
         dict["extensions"] = self.extensions
+        dict["multiple"] = self.multiple
         return dict
 
 
@@ -294,6 +344,7 @@ class PropsUIPageDonation:
         | PropsUIPromptFileInput
         | PropsUIPromptConfirm
         | PropsUIPromptQuestionnaire
+        | PropsUIPromptProgress
     )
     footer: Optional[PropsUIFooter] = None
 
@@ -0,0 +1,191 @@
+"""
+Batch runner: reprocesses a directory of exports without a browser
+
+Every input file is run through the donation flow by port.headless,
+files are distributed over a process pool, one process per core by default.
+
+Usage:
+
+    python -m port.batch <input_dir> <output_dir> [--workers N] [--pattern "*.csv"]
+
+Donations are written to <output_dir>/<name>/<donation key>.json, where name is
+the path of the input file relative to input_dir without the extension (made
+safe for a file name, and numbered if that makes it the same as the name of another file).
+The name is also the session id of the file.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+import argparse
+import logging
+import json
+import time
+import os
+import re
+
+from port.headless import run_headless, Donation
+import port.donation as donation
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of processing one input file
+    """
+    filename: str
+    seconds: float
+    donations: int = 0
+    exit_code: int | None = None
+    error: str | None = None
+
+
+def _safe_filename(key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", key)
+
+
+def _reassembled(donations: list[Donation]) -> dict[str, str]:
+    """
+    Decodes the donations and joins chunked donations using their manifest
+    Later donations under the same key replace earlier ones, as they would on the server
+    """
+    raw = {d.key: d for d in donations}
+    out = {}
+    chunk_keys = set()
+
+    for key, d in raw.items():
+        if not key.endswith(donation.manifest_key("")):
+            continue
+        manifest = json.loads(d.json_string)
+        if manifest.get("__type__") != donation.MANIFEST_TYPE:
+            continue
+        chunks = {
+            record["key"]: raw[record["key"]].json_string
+            for record in manifest["chunks"] if record["key"] in raw
+        }
+        out[manifest["key"]] = donation.reassemble(manifest, chunks)
+        chunk_keys.update(record["key"] for record in manifest["chunks"])
+        chunk_keys.add(key)
+
+    for key, d in raw.items():
+        if key not in chunk_keys:
+            out[key] = donation.decode(d.json_string, d.content_encoding)
+
+    return out
+
+
+def _unique_names(files: list[str], input_dir: str) -> list[str]:
+    """
+    Names of files for their session id and output directory: their safe path relative to input_dir
+    without the extension, numbered if the name is taken
+    """
+    names = []
+    taken = set()
+    for filename in files:
+        name = _safe_filename(Path(filename).relative_to(input_dir).with_suffix("").as_posix())
+        unique_name = name
+        number = 1
+        while unique_name in taken:
+            number += 1
+            unique_name = f"{name}-{number}"
+        taken.add(unique_name)
+        names.append(unique_name)
+    return names
+
+
+def process_file(filename: str, output_dir: str, name: str | None = None) -> BatchResult:
+    """
+    Runs the headless flow for one file and writes its donations to <output_dir>/<name>
+    name is also the session id, by default the name of the file without the extension
+    Runs inside a worker process
+    """
+    path = Path(filename)
+    name = _safe_filename(name or path.stem)
+    start_time = time.perf_counter()
+
+    try:
+        result = run_headless(str(path), name)
+        destination = Path(output_dir) / name
+        destination.mkdir(parents=True, exist_ok=True)
+
+        for key, json_string in _reassembled(result.donations).items():
+            donation_path = destination / f"{_safe_filename(key)}.json"
+            donation_path.write_text(json_string, encoding="utf8")
+
+        return BatchResult(
+            str(path),
+            time.perf_counter() - start_time,
+            donations=len(result.donations),
+            exit_code=result.exit_code,
+        )
+
+    except Exception as e:
+        logger.error("Could not process %s: %s", path, e)
+        return BatchResult(str(path), time.perf_counter() - start_time, error=str(e))
+
+
+def _init_worker(log_level: str) -> None:
+    logging.getLogger().setLevel(log_level)
+
+
+def run_batch(
+    input_dir: str,
+    output_dir: str,
+    pattern: str = "*",
+    workers: int | None = None,
+    log_level: str = "WARNING",
+) -> list[BatchResult]:
+    """
+    Processes every file in input_dir matching pattern in a pool of worker processes
+    Results are returned in order of completion
+    """
+    files = sorted(str(p) for p in Path(input_dir).glob(pattern) if p.is_file())
+    names = _unique_names(files, input_dir)
+    workers = workers or os.cpu_count() or 1
+    results = []
+
+    logger.info("Processing %s files with %s workers", len(files), workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_level,)) as executor:
+        futures = [executor.submit(process_file, f, output_dir, name) for f, name in zip(files, names)]
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    return results
+
+
+def print_report(results: list[BatchResult], wall_time: float) -> None:
+    for result in sorted(results, key=lambda r: r.filename):
+        status = f"error: {result.error}" if result.error else f"{result.donations} donations"
+        print(f"{result.seconds:9.3f}s  {result.filename}  ({status})")
+
+    failed = sum(1 for r in results if r.error)
+    cpu_time = sum(r.seconds for r in results)
+    throughput = len(results) / wall_time if wall_time > 0 else 0.0
+    print(
+        f"{len(results)} files ({failed} failed) in {wall_time:.3f}s wall time, "
+        f"{cpu_time:.3f}s summed per-file time, {throughput:.2f} files/s"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the donation flow headless over a directory of exports")
+    parser.add_argument("input_dir", help="directory containing the exports")
+    parser.add_argument("output_dir", help="directory the donations are written to")
+    parser.add_argument("--pattern", default="*", help="glob pattern selecting input files (default: *)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: cpu count)")
+    parser.add_argument("--log-level", default="WARNING", help="log level of the script (default: WARNING)")
+    args = parser.parse_args(argv)
+
+    log_level = args.log_level.upper()
+    logging.getLogger().setLevel(log_level)
+
+    start_time = time.perf_counter()
+    results = run_batch(args.input_dir, args.output_dir, args.pattern, args.workers, log_level)
+    print_report(results, time.perf_counter() - start_time)
+
+    return 1 if any(r.error for r in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
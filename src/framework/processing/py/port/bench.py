@@ -0,0 +1,99 @@
+"""
+Benchmarks the compiled Slack extraction plan against the row by row reference
+
+    python -m port.bench <access_logs.csv> [<access_logs.csv> ...] [--repeat 3]
+
+For every file the reference (slack.clean_df, add_device_columns and
+add_overlap_columns on the complete table) and slack.SLACK_PLAN are timed,
+and the tables they produce are checked to be equal.
+"""
+from dataclasses import dataclass
+import argparse
+import logging
+import time
+
+import pandas as pd
+
+import port.unzipddp as unzipddp
+import port.slack as slack
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchResult:
+    filename: str
+    rows: int
+    reference_seconds: float
+    plan_seconds: float
+    equal: bool
+    difference: str | None = None
+
+    @property
+    def speedup(self) -> float:
+        return self.reference_seconds / self.plan_seconds if self.plan_seconds > 0 else float("inf")
+
+
+def reference_slack_logins(filename: str) -> pd.DataFrame:
+    """
+    The Slack table of a single file, cleaned row by row
+    """
+    columns = [column.name for column in slack.SLACK_SPEC.columns if column.name != "IP Address"]
+    df = unzipddp.read_csv_from_file_to_df(filename, columns=columns, predicates=slack.SLACK_SPEC.filters)
+    if df.empty:
+        return df
+    df = slack.add_device_columns(slack.clean_df(df))
+    return slack.add_overlap_columns(df)
+
+
+def _best_of(repeat: int, function, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+
+def bench(filename: str, repeat: int = 3) -> BenchResult:
+    reference_seconds, expected = _best_of(repeat, reference_slack_logins, filename)
+    plan_seconds, actual = _best_of(repeat, slack.slack_logins_to_df, filename)
+
+    difference = None
+    try:
+        pd.testing.assert_frame_equal(expected, actual)
+    except AssertionError as e:
+        difference = str(e)
+
+    return BenchResult(filename, len(actual), reference_seconds, plan_seconds, difference is None, difference)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare the compiled Slack extraction plan with the row by row reference"
+    )
+    parser.add_argument("filenames", nargs="+", help="Slack access logs (csv)")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs per implementation, the fastest counts (default: 3)"
+    )
+    parser.add_argument("--log-level", default="WARNING", help="log level (default: WARNING)")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    print(f"{'file':<40} {'rows':>8} {'reference':>10} {'plan':>8} {'speedup':>8}  equal")
+    results = [bench(filename, args.repeat) for filename in args.filenames]
+    for r in results:
+        print(
+            f"{r.filename[-40:]:<40} {r.rows:>8} {r.reference_seconds:>9.3f}s {r.plan_seconds:>7.3f}s "
+            f"{r.speedup:>7.1f}x  {'yes' if r.equal else 'no'}"
+        )
+        if r.difference:
+            print(r.difference)
+
+    return 0 if all(r.equal for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
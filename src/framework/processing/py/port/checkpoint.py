@@ -0,0 +1,223 @@
+"""
+Checkpoints of extracted tables, so a restarted session resumes at the consent step
+
+After an extraction, the tables are written to a snapshot keyed by the
+session id, the platform and a fingerprint of the input files. When the
+worker restarts (page reload, crash), process() finds the snapshot for the
+session and shows the consent form again without asking for the file.
+Selecting the same files again also skips the extraction.
+The UI keeps the session id in sessionStorage (see assembly.ts), so a
+reloaded page starts the script with the same session id.
+
+Snapshots are pickles (protocol 5), which keep the DataFrames typed
+and load in about the time it takes to read them. They only hold what the
+consent form needs (the fields of the tables, as builtins and DataFrames),
+not the props classes themselves. Their version is derived from the fields
+of PropsUIPromptConsentFormTable, so snapshots written before those change
+are discarded, as are snapshots that cannot be read.
+
+Snapshots are removed as soon as the participant has decided on the donation.
+Abandoned sessions leave theirs behind: snapshots older than MAX_AGE are
+removed when a session starts (see expire).
+
+The directory is taken from the PORT_CHECKPOINT_DIR environment variable,
+or /checkpoints if it exists (py_worker.js mounts it on IndexedDB).
+Without either, checkpointing is off.
+"""
+from dataclasses import fields
+from pathlib import Path
+from typing import Any
+import hashlib
+import logging
+import pickle
+import time
+import os
+
+import port.api.props as props
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR_VARIABLE = "PORT_CHECKPOINT_DIR"
+PYODIDE_CHECKPOINT_DIR = "/checkpoints"
+
+# Increase when the contents of a snapshot change, older snapshots are ignored
+FORMAT_VERSION = 2
+
+# Snapshots are written as the fields of the tables, a change in those fields changes the version
+TABLE_FIELDS = [f.name for f in fields(props.PropsUIPromptConsentFormTable) if f.name != "deleted_rows"]
+SCHEMA_VERSION = f"{FORMAT_VERSION}-" + hashlib.sha256(",".join(TABLE_FIELDS).encode()).hexdigest()[:12]
+
+# Seconds a snapshot is kept, abandoned sessions are cleaned up when a session starts
+MAX_AGE = 24 * 60 * 60
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+def checkpoint_dir() -> Path | None:
+    directory = os.environ.get(CHECKPOINT_DIR_VARIABLE)
+    if directory:
+        return Path(directory)
+    if os.path.isdir(PYODIDE_CHECKPOINT_DIR):
+        return Path(PYODIDE_CHECKPOINT_DIR)
+    return None
+
+
+def enabled() -> bool:
+    return checkpoint_dir() is not None
+
+
+def fingerprint(filenames: list[str]) -> str:
+    """
+    sha256 over the contents of filenames, in order
+    """
+    digest = hashlib.sha256()
+    for filename in filenames:
+        with open(filename, "rb") as f:
+            while block := f.read(READ_BLOCK_SIZE):
+                digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def _session_dir(session_id: str) -> Path | None:
+    directory = checkpoint_dir()
+    if directory is None:
+        return None
+    safe_session_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(session_id))
+    return directory / safe_session_id
+
+
+def _table_to_dict(table: props.PropsUIPromptConsentFormTable) -> dict:
+    out = {name: getattr(table, name) for name in TABLE_FIELDS}
+    out["title"] = table.title.translations
+    out["description"] = table.description.translations if table.description else None
+    return out
+
+
+def _table_from_dict(table: dict) -> props.PropsUIPromptConsentFormTable:
+    table = dict(table)
+    table["title"] = props.Translatable(table["title"])
+    table["description"] = props.Translatable(table["description"]) if table["description"] else None
+    return props.PropsUIPromptConsentFormTable(**table)
+
+
+def save(session_id: str, platform: str, file_fingerprint: str, tables: Any) -> bool:
+    """
+    Writes tables, (table list, meta table list), to the snapshot of (session_id, platform, file_fingerprint)
+    Returns False if checkpointing is off or writing failed
+    """
+    session_dir = _session_dir(session_id)
+    if session_dir is None:
+        return False
+
+    table_list, meta_table_list = tables
+    snapshot = {
+        "version": SCHEMA_VERSION,
+        "platform": platform,
+        "fingerprint": file_fingerprint,
+        "tables": [_table_to_dict(table) for table in table_list],
+        "meta_tables": [_table_to_dict(table) for table in meta_table_list or []],
+    }
+    path = session_dir / f"{platform}-{file_fingerprint}.pickle"
+    try:
+        session_dir.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as f:
+            pickle.dump(snapshot, f, protocol=5)
+        os.replace(temporary, path)
+        logger.info("Saved checkpoint for %s (%s bytes)", platform, path.stat().st_size)
+        return True
+
+    except Exception as e:
+        logger.error("Could not save checkpoint: %s", e)
+        return False
+
+
+def load(session_id: str, platform: str, file_fingerprint: str | None = None) -> Any | None:
+    """
+    Returns the tables of the snapshot of (session_id, platform, file_fingerprint),
+    or of the most recent snapshot of the platform if file_fingerprint is None
+    Returns None if there is no (valid) snapshot
+    """
+    session_dir = _session_dir(session_id)
+    if session_dir is None or not session_dir.is_dir():
+        return None
+
+    pattern = f"{platform}-{file_fingerprint or '*'}.pickle"
+    paths = sorted(session_dir.glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in paths:
+        if _expired(path):
+            _unlink(path)
+            continue
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+            if snapshot.get("version") != SCHEMA_VERSION or snapshot.get("platform") != platform:
+                logger.info("Discarded checkpoint of another version")
+                _unlink(path)
+                continue
+            tables = [_table_from_dict(table) for table in snapshot["tables"]]
+            meta_tables = [_table_from_dict(table) for table in snapshot["meta_tables"]]
+            logger.info("Loaded checkpoint for %s", platform)
+            return tables, meta_tables
+        except Exception as e:
+            logger.error("Discarded checkpoint that could not be loaded: %s", e)
+            _unlink(path)
+
+    return None
+
+
+def remove(session_id: str, platform: str) -> None:
+    """
+    Removes all snapshots of platform in the session
+    """
+    session_dir = _session_dir(session_id)
+    if session_dir is None or not session_dir.is_dir():
+        return
+
+    for path in session_dir.glob(f"{platform}-*.pickle"):
+        _unlink(path)
+
+
+def expire(max_age: float = MAX_AGE) -> int:
+    """
+    Removes the snapshots of all sessions that are older than max_age seconds,
+    and the session directories that are empty after that
+    Returns the number of snapshots removed
+    """
+    directory = checkpoint_dir()
+    if directory is None or not directory.is_dir():
+        return 0
+
+    removed = 0
+    for session_dir in directory.iterdir():
+        if not session_dir.is_dir():
+            continue
+        for path in session_dir.glob("*.pickle"):
+            if _expired(path, max_age):
+                removed += _unlink(path)
+        try:
+            if not any(session_dir.iterdir()):
+                session_dir.rmdir()
+        except OSError as e:
+            logger.error("Could not remove checkpoint directory: %s", e)
+
+    if removed:
+        logger.info("Removed %s expired checkpoints", removed)
+    return removed
+
+
+def _expired(path: Path, max_age: float = MAX_AGE) -> bool:
+    try:
+        return time.time() - path.stat().st_mtime > max_age
+    except OSError:
+        return True
+
+
+def _unlink(path: Path) -> bool:
+    try:
+        path.unlink()
+        return True
+    except OSError as e:
+        logger.error("Could not remove checkpoint: %s", e)
+        return False
@@ -0,0 +1,163 @@
+"""
+Reconstructs the donation from the deletions a participant made in the consent form
+
+Every row of a PropsUIPromptConsentFormTable has a stable row id: its position
+in the table (the table gets a fresh RangeIndex when it is created). Instead of
+sending every remaining row back, the UI answers with a PayloadConsentDelta that
+only holds the deleted row ids, as half-open ranges per table:
+
+    {"deleted": {"<table id>": [[start, stop], ...]}}
+
+The script still holds the tables it rendered and rebuilds the donation from
+them with donation_json. The result is the same JSON the UI used to produce:
+
+    [{"<table id>": [{<column>: <text>, ...}, ...]}, ..., {"user_omissions": "[...]"}]
+
+with every cell turned into text the way String(value) does in the browser
+and the JSON as compact as JSON.stringify makes it. Columnar tables are
+donated with the texts the consent form shows for them (see port.api.columnar).
+"""
+from typing import Iterable
+import logging
+import json
+import re
+
+import pandas as pd
+import numpy as np
+
+import port.api.props as props
+from port.api.columnar import encode_table, table_texts
+from port.helpers import js_string
+
+logger = logging.getLogger(__name__)
+
+
+def table_to_rows(df: pd.DataFrame, columnar: bool = False) -> list[dict[str, str]]:
+    """
+    The rows of df as the consent form serializes them
+    columnar: df is sent as a ColumnarTable instead of DataFrame.to_json()
+    """
+    if not columnar:
+        return json_to_rows(df.to_json())
+
+    texts = table_texts(encode_table(df))
+    columns = js_key_order(list(texts.keys()))
+    return [{column: texts[column][row] for column in columns} for row in range(len(df))]
+
+
+def json_to_rows(data_frame_json: str) -> list[dict[str, str]]:
+    """
+    The rows of a table in DataFrame.to_json() format as the consent form serializes them
+    """
+    data_frame = json.loads(data_frame_json)
+    columns = js_key_order(list(data_frame.keys()))
+    row_ids = list(data_frame[columns[0]].keys()) if columns else []
+    return [{column: js_string(data_frame[column][row_id]) for column in columns} for row_id in row_ids]
+
+
+def js_key_order(keys: list[str]) -> list[str]:
+    """
+    The order of the keys of a JavaScript object (Object.keys, JSON.stringify):
+    integer keys first, in ascending order, then the other keys in the order they were added
+    """
+    def is_index(key: str) -> bool:
+        return re.fullmatch(r"0|[1-9][0-9]*", key) is not None and int(key) < 2 ** 32 - 1
+
+    return sorted((key for key in keys if is_index(key)), key=int) + [key for key in keys if not is_index(key)]
+
+
+def to_ranges(row_ids: Iterable[int]) -> list[list[int]]:
+    """
+    Compresses row ids into sorted half-open [start, stop) ranges
+    """
+    ranges: list[list[int]] = []
+    for row_id in sorted(set(row_ids)):
+        if ranges and ranges[-1][1] == row_id:
+            ranges[-1][1] = row_id + 1
+        else:
+            ranges.append([row_id, row_id + 1])
+    return ranges
+
+
+def keep_mask(row_count: int, ranges: list[list[int]]) -> np.ndarray:
+    """
+    Boolean mask of the rows that are not in any of the deleted ranges
+    Ranges outside of the table are clipped
+    """
+    mask = np.ones(row_count, dtype=bool)
+    for start, stop in ranges:
+        mask[max(int(start), 0):max(int(stop), 0)] = False
+    return mask
+
+
+def matching_row_ids(df: pd.DataFrame, rows: pd.DataFrame) -> list[int]:
+    """
+    Row ids of df with the same values as one of rows, in the columns of rows that df has
+    Used to carry deletions in a preview (a sample) over to the complete table
+    """
+    columns = [column for column in rows.columns if column in df.columns]
+    if not columns or rows.empty or df.empty:
+        return []
+
+    wanted = set(pd.util.hash_pandas_object(rows[columns].astype(str), index=False).tolist())
+    hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False).to_numpy()
+    return np.flatnonzero(np.isin(hashes, list(wanted))).tolist()
+
+
+def deleted_rows(
+    tables: list[props.PropsUIPromptConsentFormTable],
+    deleted: dict[str, list[list[int]]],
+) -> dict[str, pd.DataFrame]:
+    """
+    The rows deleted from every table, by table id
+    """
+    out = {}
+    for table in tables:
+        if deleted.get(table.id):
+            mask = keep_mask(len(table.data_frame), deleted[table.id])
+            out[table.id] = table.data_frame[~mask]
+    return out
+
+
+def parse_delta(value: str) -> dict[str, list[list[int]]]:
+    """
+    The deleted ranges per table id from the value of a PayloadConsentDelta
+    """
+    delta = json.loads(value)
+    return {str(table_id): [list(r) for r in ranges] for table_id, ranges in delta.get("deleted", {}).items()}
+
+
+def donation_json(
+    tables: list[props.PropsUIPromptConsentFormTable],
+    meta_tables: list[props.PropsUIPromptConsentFormTable],
+    deleted: dict[str, list[list[int]]],
+) -> str:
+    """
+    Applies the deleted ranges to the tables and serializes the donation
+    Meta tables cannot be edited by the participant and are donated as is
+    """
+    out = []
+    omissions = []
+    for table in tables:
+        mask = keep_mask(len(table.data_frame), deleted.get(table.id, []))
+        deleted_row_count = int(len(mask) - mask.sum())
+        if deleted_row_count > 0:
+            omissions.append(f"User deleted {deleted_row_count} rows from table: {table.id}")
+        out.append({table.id: table_to_rows(table.data_frame[mask], table.columnar)})
+
+    for table in meta_tables:
+        out.append({table.id: table_to_rows(table.data_frame, table.columnar)})
+
+    unknown = set(deleted) - {table.id for table in tables}
+    if unknown:
+        logger.error("Deletions for unknown tables: %s", sorted(unknown))
+
+    out.append({"user_omissions": _stringify(omissions)})
+    return _stringify(out)
+
+
+def _stringify(value) -> str:
+    """
+    json.dumps with the output of JSON.stringify
+    """
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
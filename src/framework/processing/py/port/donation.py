@@ -0,0 +1,180 @@
+"""
+Contains functions to encode donations before they leave the browser
+and the reference functions to decode them on the receiving end
+
+Donations travel as text inside CommandSystemDonate (json_string),
+so compressed data is framed as base64.
+Compression is opt-in (see DONATION_ENCODING in port.script), receivers
+need to decode it. The encoding that was used is stored in the command as
+content_encoding:
+
+* identity: json_string is the JSON as is
+* gzip+base64: base64 of the gzip compressed UTF-8 JSON
+* deflate+base64: base64 of the zlib (deflate) compressed UTF-8 JSON
+
+Large donations can be split into chunks, each donated under its own key
+(<key>-chunk-00000, <key>-chunk-00001, ...), followed by a manifest
+under <key>-manifest. The manifest lists the size and sha256 of every chunk,
+so the receiving end can tell which chunks are missing or corrupt
+and reassemble the donation once all of them arrived.
+Chunks are slices of the encoded string and cannot be decoded on their own,
+the content encoding of the joined chunks is stored in the manifest.
+"""
+from collections.abc import Iterator
+import hashlib
+import logging
+import base64
+import json
+import gzip
+import zlib
+
+from port.my_exceptions import ChunkVerificationError
+
+logger = logging.getLogger(__name__)
+
+IDENTITY = "identity"
+GZIP_BASE64 = "gzip+base64"
+DEFLATE_BASE64 = "deflate+base64"
+
+CONTENT_ENCODINGS = [IDENTITY, GZIP_BASE64, DEFLATE_BASE64]
+
+# Donations smaller than this (in bytes of UTF-8) are not worth compressing
+COMPRESSION_THRESHOLD = 64 * 1024
+COMPRESSION_LEVEL = 6
+
+# Suggested number of characters of the (encoded) json_string per chunk, chunking is opt-in (see port.script)
+CHUNK_SIZE = 1024 * 1024
+
+MANIFEST_TYPE = "DonationManifest"
+
+
+def encode(
+    json_string: str,
+    content_encoding: str = IDENTITY,
+    threshold: int = COMPRESSION_THRESHOLD,
+) -> tuple[str, str]:
+    """
+    Compresses json_string with content_encoding if it is at least threshold bytes
+
+    Returns the (possibly) encoded string and the content encoding that was applied
+    """
+    if content_encoding not in CONTENT_ENCODINGS:
+        raise ValueError(f"Unknown content encoding: {content_encoding}")
+
+    data = json_string.encode("utf8")
+    if content_encoding == IDENTITY or len(data) < threshold:
+        return json_string, IDENTITY
+
+    if content_encoding == GZIP_BASE64:
+        compressed = gzip.compress(data, compresslevel=COMPRESSION_LEVEL, mtime=0)
+    else:
+        compressed = zlib.compress(data, COMPRESSION_LEVEL)
+
+    encoded = base64.b64encode(compressed).decode("ascii")
+    logger.info("Compressed donation from %s to %s bytes (%s)", len(data), len(encoded), content_encoding)
+
+    return encoded, content_encoding
+
+
+def decode(data: str, content_encoding: str | None = IDENTITY) -> str:
+    """
+    Reference decoder: turns a donated json_string back into JSON
+
+    content_encoding None is treated as identity,
+    donations made before content encodings existed do not carry one
+    """
+    if content_encoding in (None, IDENTITY):
+        return data
+
+    compressed = base64.b64decode(data)
+    if content_encoding == GZIP_BASE64:
+        return gzip.decompress(compressed).decode("utf8")
+    if content_encoding == DEFLATE_BASE64:
+        return zlib.decompress(compressed).decode("utf8")
+
+    raise ValueError(f"Unknown content encoding: {content_encoding}")
+
+
+def chunk_key(key: str, index: int) -> str:
+    return f"{key}-chunk-{index:05d}"
+
+
+def manifest_key(key: str) -> str:
+    return f"{key}-manifest"
+
+
+def _sha256(data: str) -> str:
+    return hashlib.sha256(data.encode("utf8")).hexdigest()
+
+
+def iter_chunks(key: str, data: str, content_encoding: str, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, str]]:
+    """
+    Lazily splits data into (key, chunk) pairs
+    The manifest (as JSON) comes last, under manifest_key(key)
+
+    Only one chunk is sliced off data at a time
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size should be positive")
+
+    total_hash = hashlib.sha256()
+    chunks = []
+
+    for index, start in enumerate(range(0, len(data), chunk_size)):
+        chunk = data[start:start + chunk_size]
+        chunk_bytes = chunk.encode("utf8")
+        total_hash.update(chunk_bytes)
+        chunks.append({
+            "key": chunk_key(key, index),
+            "size": len(chunk_bytes),
+            "sha256": hashlib.sha256(chunk_bytes).hexdigest(),
+        })
+        yield chunks[-1]["key"], chunk
+
+    manifest = {
+        "__type__": MANIFEST_TYPE,
+        "key": key,
+        "content_encoding": content_encoding,
+        "chunk_count": len(chunks),
+        "total_size": sum(c["size"] for c in chunks),
+        "sha256": total_hash.hexdigest(),
+        "chunks": chunks,
+    }
+    logger.info("Donation %s split into %s chunks", key, len(chunks))
+    yield manifest_key(key), json.dumps(manifest)
+
+
+def missing_chunks(manifest: dict, chunks: dict[str, str]) -> list[str]:
+    """
+    Returns the keys of chunks that were not received or do not match the manifest
+    These are the chunks that need to be donated again
+    """
+    out = []
+    for record in manifest["chunks"]:
+        chunk = chunks.get(record["key"])
+        if chunk is None or len(chunk.encode("utf8")) != record["size"] or _sha256(chunk) != record["sha256"]:
+            out.append(record["key"])
+
+    return out
+
+
+def reassemble(manifest: dict, chunks: dict[str, str]) -> str:
+    """
+    Reference receiver: verifies all chunks against the manifest,
+    joins them and decodes the result back into the donated JSON
+
+    chunks maps donation keys to the donated json_strings
+    Raises ChunkVerificationError if chunks are missing or corrupt
+    """
+    if manifest.get("__type__") != MANIFEST_TYPE:
+        raise ValueError("Not a donation manifest")
+
+    missing = missing_chunks(manifest, chunks)
+    if missing:
+        raise ChunkVerificationError(f"Missing or corrupt chunks: {', '.join(missing)}")
+
+    data = "".join(chunks[record["key"]] for record in manifest["chunks"])
+    if _sha256(data) != manifest["sha256"]:
+        raise ChunkVerificationError("Reassembled donation does not match the manifest")
+
+    return decode(data, manifest["content_encoding"])
@@ -0,0 +1,161 @@
+"""
+Downsamples per-event time series, so a chart gets a bounded number of points
+
+Largest-Triangle-Three-Buckets (LTTB): the first and last point are kept,
+the points in between are divided in target - 2 buckets and from every
+bucket the point forming the largest triangle with the previously
+selected point and the average of the next bucket is kept. This keeps
+the shape of the series (peaks and dips) better than taking every n-th point.
+
+Every selected point also gets the minimum and maximum of its bucket
+(the envelope), so short spikes that LTTB leaves out remain visible.
+
+A chart visualization opts in with "downsample": {"target": <points>}.
+The points are added to the visualization as:
+
+    "downsampled": {
+        "rowCount": n,
+        "data": [
+            {<x column>: text, <value column>: y, "<value column>.min": .., "<value column>.max": .., "__rowId": id}
+        ]
+    }
+
+__rowId is the position of the selected row in the table, so the UI can
+leave out the points of rows that were deleted in the consent form. The
+envelope is computed from all rows, the UI leaves it out once rows are deleted.
+"""
+import logging
+
+import pandas as pd
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TARGET_POINTS = 500
+
+
+def _bucket_edges(n: int, target: int) -> np.ndarray:
+    """
+    Edges of the target - 2 buckets between the first and the last point,
+    followed by the bucket that only holds the last point
+    """
+    edges = np.linspace(1, n - 1, target - 1).astype(np.int64)
+    return np.append(edges, n)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, target: int) -> np.ndarray:
+    """
+    Returns the (sorted) positions of the target points selected from x, y
+    x should be sorted and neither x nor y can contain NaN
+    """
+    n = len(x)
+    if target >= n or target < 3:
+        return np.arange(n)
+
+    edges = _bucket_edges(n, target)
+    selected = np.empty(target, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(target - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = edges[i + 1], edges[i + 2]
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+
+        # twice the area of the triangles (a, candidate, average of the next bucket)
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def envelope(y: np.ndarray, target: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the minimum and maximum of y in each of the target buckets used by lttb
+    """
+    n = len(y)
+    if target >= n or target < 3:
+        return y.copy(), y.copy()
+
+    starts = np.concatenate(([0], _bucket_edges(n, target)[:-1]))
+    return np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+
+
+def _to_numeric_x(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+
+    dates = pd.to_datetime(series, errors="coerce")
+    milliseconds = dates.to_numpy().astype("datetime64[ms]").astype(np.int64)
+    return pd.Series(milliseconds, index=series.index).where(dates.notna())
+
+
+def downsample_series(
+    df: pd.DataFrame, x_column: str, value_columns: list[str], target: int = TARGET_POINTS
+) -> list[dict]:
+    """
+    Returns at most target points of value_columns against x_column,
+    selected with LTTB on the first value column
+    """
+    x = _to_numeric_x(df[x_column]).reset_index(drop=True)
+    values = [pd.to_numeric(df[column], errors="coerce").reset_index(drop=True) for column in value_columns]
+
+    valid = x.notna()
+    for value in values:
+        valid &= value.notna()
+
+    positions = np.flatnonzero(valid.to_numpy())
+    order = positions[np.argsort(x.to_numpy()[positions], kind="stable")]
+    if len(order) == 0:
+        return []
+
+    xs = x.to_numpy(dtype=float)[order]
+    ys = [value.to_numpy(dtype=float)[order] for value in values]
+    selected = lttb(xs, ys[0], target)
+
+    x_texts = df[x_column].astype(str).to_numpy()[order[selected]]
+    points = [{x_column: text, "__rowId": str(row)} for text, row in zip(x_texts, order[selected])]
+    for column, y in zip(value_columns, ys):
+        lower, upper = envelope(y, target)
+        for point, y_value, low, high in zip(points, y[selected], lower, upper):
+            point[column] = float(y_value)
+            point[f"{column}.min"] = float(low)
+            point[f"{column}.max"] = float(high)
+
+    logger.info("Downsampled %s points to %s", len(order), len(points))
+    return points
+
+
+def precompute_series(visualization: dict, df: pd.DataFrame) -> dict:
+    """
+    Adds the downsampled points to a line or area chart with a "downsample" setting
+
+    Only charts of raw events are downsampled: charts grouping x by a dateFormat,
+    or values split with group_by, are returned as is and aggregated in the browser
+    """
+    settings = visualization.get("downsample")
+    group = visualization.get("group", {})
+    values = visualization.get("values", [])
+    if (
+        settings is None
+        or visualization.get("type") not in ("line", "area")
+        or group.get("dateFormat") is not None
+        or any(value.get("group_by") is not None for value in values)
+    ):
+        return visualization
+
+    try:
+        points = downsample_series(
+            df,
+            group["column"],
+            [value["column"] for value in values],
+            settings.get("target", TARGET_POINTS),
+        )
+    except (KeyError, ValueError, TypeError) as e:
+        logger.error("Could not downsample %s: %s", group.get("column"), e)
+        return visualization
+
+    return {**visualization, "downsampled": {"rowCount": len(df), "data": points}}
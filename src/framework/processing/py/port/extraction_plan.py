@@ -0,0 +1,377 @@
+"""
+Declarative extraction specs, compiled into plans that extract csv files chunk by chunk
+
+A platform describes what it needs from its csv files in an ExtractionSpec:
+
+* columns: the columns to read, with an optional vectorized parser, dtype and output format
+* filters: rows to skip while parsing (unzipddp.Predicate)
+* derived: columns computed from other columns, per chunk or once on the complete table
+* visualizations: the charts of the table (precomputed where possible, see visualizations())
+
+compile_spec checks the spec once and returns an ExtractionPlan. The plan reads
+only the columns the spec uses, parses every column with one vectorized call
+per chunk and computes all per chunk derived columns in the same pass, without
+intermediate DataFrames. Parsed values (datetimes, numbers) are kept until the
+complete table is assembled; output formats are applied once at the end.
+
+    PLAN = compile_spec(SPEC)
+    df = yield from PLAN.iter_extract(filenames)   # inside an extraction generator
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Generator
+import logging
+import os
+import re
+
+import pandas as pd
+import numpy as np
+
+from dateutil import parser as dateutil_parser
+
+import port.unzipddp as unzipddp
+import port.memory_budget as memory_budget
+import port.progress as progress
+import port.term_frequency as term_frequency
+import port.downsample as downsample
+
+logger = logging.getLogger(__name__)
+
+# Number of rows transformed between two checks whether progress should be reported
+PART_ROWS = 5_000
+
+Parser = Callable[[pd.Series], pd.Series]
+
+
+# pandas 1.x only infers the format (and parses vectorized) when asked, pandas 2 always does
+INFER_DATETIME_FORMAT = {"infer_datetime_format": True} if int(pd.__version__.split(".")[0]) < 2 else {}
+
+
+@lru_cache(maxsize=4096)
+def _parse_with_dateutil(text: str) -> pd.Timestamp:
+    try:
+        return pd.Timestamp(dateutil_parser.parse(text))
+    except (ValueError, OverflowError):
+        return pd.NaT
+
+
+def datetime_parser(format: str | None = None, strip: str | None = None) -> Parser:
+    """
+    Parses text into naive datetimes: vectorized with format (None: inferred from the first cell),
+    cells in another format are parsed one distinct value at a time with dateutil. Unparseable cells become NaT
+
+    strip: regular expression for parts to remove first, for example a time zone name in brackets
+    """
+    strip_pattern = re.compile(strip) if strip else None
+
+    def parse(series: pd.Series) -> pd.Series:
+        text = series.astype("string")
+        if strip_pattern is not None:
+            text = text.str.replace(strip_pattern, "", regex=True)
+        text = text.str.strip()
+
+        if format is not None:
+            parsed = pd.to_datetime(text, format=format, errors="coerce")
+        else:
+            parsed = pd.to_datetime(text, errors="coerce", **INFER_DATETIME_FORMAT)
+        retry = parsed.isna() & text.notna()
+        if retry.any():
+            parsed[retry] = text[retry].map(_parse_with_dateutil).astype("datetime64[ns]")
+        return parsed
+
+    return parse
+
+
+PARSERS: dict[str, Parser] = {
+    "float": lambda series: pd.to_numeric(series, errors="coerce"),
+    "int": lambda series: pd.to_numeric(series, errors="coerce").astype("Int64"),
+    "datetime": datetime_parser(),
+}
+
+
+@dataclass
+class Column:
+    """
+    A column read from the csv
+
+    parse: a name in PARSERS or a vectorized function from text to values (default: keep the text)
+    dtype: dtype the parsed values are converted to
+    format: strftime format the (datetime) values are written in, in the output
+    keep: whether the column is in the output, columns only used by filters or derived columns are not
+    """
+    name: str
+    parse: str | Parser | None = None
+    dtype: str | None = None
+    format: str | None = None
+    keep: bool = True
+
+
+@dataclass
+class Derived:
+    """
+    Columns computed from other columns
+
+    compute receives the input columns (parsed, not yet formatted) as Series,
+    and returns a Series, or a DataFrame with one column per name
+    table: compute once on the complete table instead of per chunk, for columns that depend on all rows
+    """
+    names: list[str]
+    inputs: list[str]
+    compute: Callable[..., pd.Series | pd.DataFrame]
+    table: bool = False
+
+
+@dataclass
+class ExtractionSpec:
+    columns: list[Column]
+    filters: list[unzipddp.Predicate] = field(default_factory=list)
+    derived: list[Derived] = field(default_factory=list)
+    visualizations: list[dict] = field(default_factory=list)
+
+
+class ExtractionPlan:
+    """
+    A compiled ExtractionSpec, see compile_spec
+    """
+
+    def __init__(self, spec: ExtractionSpec, columns_to_read: list[str], parsers: dict[str, Parser]):
+        self.spec = spec
+        self.columns_to_read = columns_to_read
+        self.parsers = parsers
+        self.chunk_derived = [derived for derived in spec.derived if not derived.table]
+        self.table_derived = [derived for derived in spec.derived if derived.table]
+        self.formats = {column.name: column.format for column in spec.columns if column.keep and column.format}
+        self.output_columns = [column.name for column in spec.columns if column.keep] + [
+            name for derived in spec.derived for name in derived.names
+        ]
+
+    def transform(self, raw: pd.DataFrame) -> pd.DataFrame:
+        """
+        Parses the columns of raw rows and adds the per chunk derived columns
+        The result has the kept columns, parsed but not formatted
+        """
+        values: dict[str, Any] = {}
+        for column in self.spec.columns:
+            series = raw[column.name].reset_index(drop=True)
+            parse = self.parsers.get(column.name)
+            if parse is not None:
+                series = parse(series)
+            if column.dtype is not None:
+                series = series.astype(column.dtype)
+            values[column.name] = series
+
+        for derived in self.chunk_derived:
+            _add_derived(values, derived)
+
+        return pd.DataFrame({name: values[name] for name in self._chunk_output_columns()})
+
+    def finish(self, df: pd.DataFrame, table: bool = True) -> pd.DataFrame:
+        """
+        Adds the table derived columns (unless table is False) and writes the columns in their output format
+        """
+        if table and self.table_derived:
+            values = {name: df[name] for name in df.columns}
+            for derived in self.table_derived:
+                try:
+                    _add_derived(values, derived)
+                except Exception as e:
+                    logger.error("Could not compute %s: %s", ", ".join(derived.names), e)
+            df = pd.DataFrame({name: values[name] for name in self.output_columns if name in values})
+
+        for name, format in self.formats.items():
+            if name in df and pd.api.types.is_datetime64_any_dtype(df[name]):
+                df[name] = df[name].dt.strftime(format).astype(object).where(df[name].notna(), None)
+        return df
+
+    def iter_extract(
+        self,
+        filenames: str | list[str],
+        budget: int | None = None,
+        interval: float = progress.PROGRESS_INTERVAL,
+        on_chunk: Callable[[pd.DataFrame, pd.DataFrame], None] | None = None,
+    ) -> Generator[progress.Progress, Any, pd.DataFrame]:
+        """
+        Extracts one or more csv files in chunks (see port.memory_budget),
+        yields a progress.Progress at most every interval seconds and returns the finished DataFrame
+        Use with: df = yield from plan.iter_extract(filenames)
+
+        Rows of several files are merged: rows that are also in an earlier file are dropped.
+        Duplicate rows within a file are kept, as they are when a single file is extracted.
+        on_chunk(raw, transformed) is called for every part of a chunk, for example to update a summary
+        """
+        filenames = [filenames] if isinstance(filenames, str) else list(filenames)
+        merge = len(filenames) > 1
+
+        sizes = [_file_size(filename) for filename in filenames]
+        total_size = max(sum(sizes), 1)
+        ticker = progress.Ticker(interval)
+        # hashes of the rows of the earlier files, and of the file being read
+        seen: set[int] = set()
+        current: set[int] = set()
+        transformed = []
+        rows = 0
+        for file_index, filename in enumerate(filenames):
+            offset = sum(sizes[:file_index]) / total_size
+            scale = sizes[file_index] / total_size
+
+            for chunk, fraction_before, fraction_after in self._read_chunks(filename, budget):
+                for start in range(0, len(chunk), PART_ROWS):
+                    part = chunk.iloc[start:start + PART_ROWS]
+                    rows += len(part)
+                    if merge:
+                        part = _drop_seen(part, seen, current)
+                    if not part.empty:
+                        transformed_part = self.transform(part)
+                        if on_chunk is not None:
+                            on_chunk(part, transformed_part)
+                        transformed.append(transformed_part)
+
+                    if ticker.due():
+                        done = min(start + PART_ROWS, len(chunk)) / len(chunk)
+                        fraction = fraction_before + done * (fraction_after - fraction_before)
+                        yield progress.Progress(rows, offset + scale * fraction)
+
+            seen |= current
+            current = set()
+
+        if not transformed:
+            return pd.DataFrame()
+
+        out = self.finish(pd.concat(transformed, ignore_index=True))
+        if merge:
+            logger.info("Merged %s files: %s rows, %s after removing duplicates", len(filenames), rows, len(out))
+        return out
+
+    def sample(self, filenames: str | list[str]) -> tuple[pd.DataFrame, int]:
+        """
+        Raw rows from blocks spread over the files (see unzipddp.sample_csv_from_file_to_df),
+        without the rows that are also in an earlier file (as in iter_extract),
+        and the estimated number of rows in the files
+        """
+        filenames = [filenames] if isinstance(filenames, str) else list(filenames)
+        samples = []
+        estimated_rows = 0
+        seen: set[int] = set()
+        for filename in filenames:
+            sample, file_rows = unzipddp.sample_csv_from_file_to_df(
+                filename, columns=self.columns_to_read, predicates=self.spec.filters
+            )
+            current: set[int] = set()
+            samples.append(_drop_seen(sample, seen, current))
+            seen |= current
+            estimated_rows += file_rows
+
+        return pd.concat(samples, ignore_index=True), estimated_rows
+
+    def visualizations(self, df: pd.DataFrame) -> list[dict]:
+        """
+        The visualizations of the spec for the finished table df:
+        values whose column is not in df are left out (and visualizations left without values),
+        wordclouds and downsampled series are precomputed
+        """
+        out = []
+        for visualization in self.spec.visualizations:
+            if "values" in visualization:
+                values = [value for value in visualization["values"] if value["column"] in df.columns]
+                if not values:
+                    continue
+                visualization = {**visualization, "values": values}
+
+            visualization = term_frequency.precompute_wordcloud(visualization, df)
+            visualization = downsample.precompute_series(visualization, df)
+            out.append(visualization)
+        return out
+
+    def _chunk_output_columns(self) -> list[str]:
+        table_names = {name for derived in self.table_derived for name in derived.names}
+        return [name for name in self.output_columns if name not in table_names]
+
+    def _read_chunks(self, filename: str, budget: int | None):
+        """
+        Yields (chunk, fraction of the file read before it, fraction read after it)
+        Files that fit in the memory budget are read at once, larger files in chunks
+        """
+        plan = memory_budget.plan_for_file(filename, budget)
+        if plan.mode == memory_budget.IN_MEMORY:
+            chunk = unzipddp.read_csv_from_file_to_df(
+                filename, columns=self.columns_to_read, predicates=self.spec.filters
+            )
+            yield chunk, 0.0, 1.0
+            return
+
+        position_before = 0
+        size = max(plan.input_size, 1)
+        chunks = unzipddp.iter_csv_from_file_to_df(
+            filename, columns=self.columns_to_read, predicates=self.spec.filters, chunk_rows=plan.chunk_rows
+        )
+        for chunk, position in chunks:
+            yield chunk, position_before / size, position / size
+            position_before = position
+
+
+def compile_spec(spec: ExtractionSpec) -> ExtractionPlan:
+    """
+    Checks spec and compiles it into an ExtractionPlan
+    Raises ValueError if a name is unknown, duplicated, or used before it is computed
+    """
+    parsers: dict[str, Parser] = {}
+    available: set[str] = set()
+    for column in spec.columns:
+        if column.name in available:
+            raise ValueError(f"Column listed twice: {column.name}")
+        available.add(column.name)
+
+        if isinstance(column.parse, str):
+            if column.parse not in PARSERS:
+                raise ValueError(f"Unknown parser for {column.name}: {column.parse}")
+            parsers[column.name] = PARSERS[column.parse]
+        elif column.parse is not None:
+            parsers[column.name] = column.parse
+
+    for predicate in spec.filters:
+        if predicate.column not in available:
+            raise ValueError(f"Filter on a column that is not read: {predicate.column}")
+
+    kept = {column.name for column in spec.columns if column.keep}
+    for derived in spec.derived:
+        # table derived columns see the kept columns only, these are what is left after the chunks
+        inputs_available = kept if derived.table else available
+        missing = [name for name in derived.inputs if name not in inputs_available]
+        if missing:
+            raise ValueError(f"Inputs of {', '.join(derived.names)} not available: {', '.join(missing)}")
+        for name in derived.names:
+            if name in available:
+                raise ValueError(f"Derived column already exists: {name}")
+            available.add(name)
+            kept.add(name)
+
+    columns_to_read = [column.name for column in spec.columns]
+    return ExtractionPlan(spec, columns_to_read, parsers)
+
+
+def _add_derived(values: dict[str, Any], derived: Derived) -> None:
+    result = derived.compute(*[values[name] for name in derived.inputs])
+    if isinstance(result, pd.DataFrame):
+        for name in derived.names:
+            values[name] = result[name].reset_index(drop=True)
+    else:
+        values[derived.names[0]] = result if isinstance(result, pd.Series) else pd.Series(result)
+
+
+def _drop_seen(df: pd.DataFrame, seen: set[int], current: set[int]) -> pd.DataFrame:
+    """
+    Drops the rows whose hash is in seen (the earlier files), and adds the hashes of all rows to current
+    """
+    hashes = pd.util.hash_pandas_object(df, index=False).tolist()
+    current.update(hashes)
+    if not seen:
+        return df
+    keep = np.fromiter((row_hash not in seen for row_hash in hashes), dtype=bool, count=len(hashes))
+    return df[keep]
+
+
+def _file_size(filename: str) -> int:
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
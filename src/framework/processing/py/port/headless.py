@@ -0,0 +1,177 @@
+"""
+Drives the donation flow without a user interface
+
+The flow in script.process is normally answered by the React UI.
+The ScriptedResponder below plays the part of the participant:
+it submits a file, accepts the consent form as is and skips everything else.
+"""
+from dataclasses import dataclass, field
+import logging
+import json
+
+from port.main import start, start_async
+from port.api.payloads import (
+    PayloadVoid,
+    PayloadFalse,
+    PayloadString,
+    PayloadStringList,
+    PayloadConsentDelta,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Donation:
+    """
+    A single CommandSystemDonate as emitted by the script
+    """
+    key: str
+    json_string: str
+    content_encoding: str | None = None
+
+
+@dataclass
+class HeadlessResult:
+    """
+    Everything the script donated during a headless run
+    payloads holds the responses sent to the script, in order,
+    and can be saved as a recording for port.replay.
+    Responses to progress pages are left out: how many progress pages are rendered
+    depends on timing, port.replay answers them itself (see shows_progress)
+    """
+    session_id: str
+    donations: list[Donation] = field(default_factory=list)
+    exit_code: int | None = None
+    exit_info: str | None = None
+    cycles: int = 0
+    payloads: list[dict] = field(default_factory=list)
+
+
+def shows_progress(command: dict) -> bool:
+    """
+    Whether command renders a progress page (PropsUIPromptProgress), also inside a CommandBatch
+    The UI answers these with a PayloadVoid without user input
+    """
+    if command["__type__"] == "CommandBatch":
+        return any(shows_progress(c) for c in command["commands"])
+    if command["__type__"] != "CommandUIRender":
+        return False
+    body = command["page"].get("body") or {}
+    return body.get("__type__") == "PropsUIPromptProgress"
+
+
+class ScriptedResponder:
+    """
+    Answers render commands the way a cooperative participant would:
+
+    * the first file prompt receives `filename` (a list of filenames for a multiple file prompt),
+      later file prompts are skipped
+    * retry confirmations are answered with "Continue" (skip)
+    * consent forms are donated without deleting rows (rows shown as deleted stay deleted)
+    """
+
+    def __init__(self, filename: str | list[str]):
+        self.filename = filename
+        self.files_submitted = 0
+
+    def respond(self, command: dict):
+        body = command["page"].get("body") or {}
+        body_type = body.get("__type__")
+
+        if body_type == "PropsUIPromptFileInput":
+            if self.files_submitted == 0:
+                self.files_submitted += 1
+                if isinstance(self.filename, list):
+                    return PayloadStringList(self.filename)
+                return PayloadString(self.filename)
+            return PayloadFalse()
+
+        if body_type == "PropsUIPromptConsentForm":
+            # rows shown as deleted stay deleted
+            deleted = {table["id"]: table["deleted_rows"] for table in body["tables"] if table.get("deleted_rows")}
+            return PayloadConsentDelta(json.dumps({"deleted": deleted}))
+
+        if body_type == "PropsUIPromptConfirm":
+            return PayloadFalse()
+
+        return PayloadVoid()
+
+
+def run_headless(
+    filename: str | list[str],
+    session_id: str,
+    responder: ScriptedResponder | None = None,
+    coalesce: bool = False,
+) -> HeadlessResult:
+    """
+    Runs the donation flow for filename until the script exits
+    and collects the donations it produced
+    """
+    responder = responder or ScriptedResponder(filename)
+    result = HeadlessResult(session_id)
+
+    script = start(session_id, coalesce)
+    payload = None
+    while result.exit_code is None:
+        command = script.send(payload)
+        result.cycles += 1
+        payload = _handle(command, responder, result)
+        if not shows_progress(command):
+            result.payloads.append(payload.toDict())
+
+    return result
+
+
+async def run_headless_async(
+    filename: str | list[str],
+    session_id: str,
+    responder: ScriptedResponder | None = None,
+    coalesce: bool = False,
+) -> HeadlessResult:
+    """
+    Like run_headless, for the async script (port.main.start_async)
+    Use with: asyncio.run(run_headless_async(filename, session_id))
+    """
+    responder = responder or ScriptedResponder(filename)
+    result = HeadlessResult(session_id)
+
+    script = start_async(session_id, coalesce)
+    payload = None
+    while result.exit_code is None:
+        command = await script.send(payload)
+        result.cycles += 1
+        payload = _handle(command, responder, result)
+        if not shows_progress(command):
+            result.payloads.append(payload.toDict())
+
+    return result
+
+
+def _handle(command: dict, responder: ScriptedResponder, result: HeadlessResult):
+    """
+    Handles a command like the command router in the UI does, returns the response payload
+    """
+    command_type = command["__type__"]
+
+    if command_type == "CommandBatch":
+        payload = PayloadVoid()
+        for batched_command in command["commands"]:
+            payload = _handle(batched_command, responder, result)
+        return payload
+
+    if command_type == "CommandSystemDonate":
+        result.donations.append(
+            Donation(command["key"], command["json_string"], command.get("content_encoding"))
+        )
+        return PayloadVoid()
+
+    if command_type == "CommandUIRender":
+        return responder.respond(command)
+
+    if command_type == "CommandSystemExit":
+        result.exit_code = command["code"]
+        result.exit_info = command["info"]
+        return PayloadVoid()
+
+    raise TypeError(f"Unknown command: {command_type}")
@@ -301,4 +301,57 @@ def replace_months(input_string):
     return input_string
 
 
+# Integers above this are not exact as JavaScript numbers
+MAX_SAFE_INTEGER = 2 ** 53 - 1
 
+
+def js_string(value) -> str:
+    """
+    Mimics String(value) in the browser for values parsed from DataFrame.to_json()
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int) and abs(value) <= MAX_SAFE_INTEGER:
+        return str(value)
+    if isinstance(value, (int, float)):
+        return js_number(float(value))
+    return str(value)
+
+
+def js_number(number: float) -> str:
+    """
+    Mimics Number.prototype.toString(): the shortest digits that give back number (like repr),
+    written without exponent from 1e-6 up to 1e21
+    """
+    if math.isnan(number):
+        return "NaN"
+    if math.isinf(number):
+        return "Infinity" if number > 0 else "-Infinity"
+    if number == 0:
+        return "0"
+    if number < 0:
+        return "-" + js_number(-number)
+
+    # number is 0.<digits> * 10 ** point
+    mantissa, _, exponent = repr(number).partition("e")
+    whole, _, fraction = mantissa.partition(".")
+    all_digits = whole + fraction
+    digits = all_digits.lstrip("0")
+    point = len(whole) + int(exponent or 0) - (len(all_digits) - len(digits))
+    digits = digits.rstrip("0")
+    k = len(digits)
+
+    if k <= point <= 21:
+        return digits + "0" * (point - k)
+    if 0 < point <= 21:
+        return digits[:point] + "." + digits[point:]
+    if -6 < point <= 0:
+        return "0." + "0" * -point + digits
+
+    e = point - 1
+    sign = "+" if e >= 0 else "-"
+    if k == 1:
+        return f"{digits}e{sign}{abs(e)}"
+    return f"{digits[0]}.{digits[1:]}e{sign}{abs(e)}"
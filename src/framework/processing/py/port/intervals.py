@@ -0,0 +1,76 @@
+"""
+Sweep-line computations over sessions (start, end)
+
+Sessions on several devices overlap, summing their durations counts the
+overlapping time more than once. After sorting the sessions by start
+time once (O(n log n)):
+
+* distinct_durations: the part of every session not covered by a session
+  that started before it; these sum to the length of the union of all
+  sessions, so summing them per group gives distinct logged-in time
+* concurrent_sessions: the number of sessions active when every session starts
+* peak_concurrency: the largest number of sessions active at the same time
+
+Times are numeric (for example seconds since the epoch), NaN marks a missing time.
+"""
+import numpy as np
+
+
+def _valid(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    return ~np.isnan(starts) & ~np.isnan(ends) & (ends >= starts)
+
+
+def distinct_durations(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Returns for every session the time between its start and end that no earlier starting
+    session covers (NaN for invalid sessions). Of sessions with the same start, the longest counts first
+    """
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    out = np.full(len(starts), np.nan)
+
+    valid = np.flatnonzero(_valid(starts, ends))
+    if len(valid) == 0:
+        return out
+
+    order = valid[np.lexsort((-ends[valid], starts[valid]))]
+    s, e = starts[order], ends[order]
+    covered_until = np.concatenate(([-np.inf], np.maximum.accumulate(e)[:-1]))
+    out[order] = np.clip(e - np.maximum(s, covered_until), 0, None)
+    return out
+
+
+def concurrent_sessions(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Returns for every session the number of sessions active at its start, itself included
+    (NaN for invalid sessions). A session ending at the moment another starts is not active anymore
+    """
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    out = np.full(len(starts), np.nan)
+
+    valid = _valid(starts, ends)
+    if not valid.any():
+        return out
+
+    sorted_starts = np.sort(starts[valid])
+    sorted_ends = np.sort(ends[valid])
+    started = np.searchsorted(sorted_starts, starts[valid], side="right")
+    ended = np.searchsorted(sorted_ends, starts[valid], side="right")
+    out[valid] = np.maximum(started - ended, 1)
+    return out
+
+
+def union_length(starts: np.ndarray, ends: np.ndarray) -> float:
+    """
+    Total time covered by at least one session
+    """
+    return float(np.nansum(distinct_durations(starts, ends)))
+
+
+def peak_concurrency(starts: np.ndarray, ends: np.ndarray) -> int:
+    """
+    The largest number of sessions active at the same time
+    """
+    concurrent = concurrent_sessions(starts, ends)
+    return 0 if np.isnan(concurrent).all() else int(np.nanmax(concurrent))
@@ -0,0 +1,105 @@
+"""
+Bounded in-memory log handler for the donation flow
+
+Log records are kept in a ring buffer of fixed size and only formatted
+when the logs are donated. Messages that repeat (same logger, level and
+message template) are kept the first max_repeats times, after that they
+are counted and summarized instead. Memory use therefore does not grow
+with the amount of data that is processed.
+
+Modules that log per value (port.helpers) get their own, stricter level,
+so their debug calls return before a LogRecord is even created.
+"""
+from collections import deque
+import logging
+
+# Levels for modules on the hot path of an extraction
+HOT_PATH_LEVELS = {
+    "port.helpers": logging.WARNING,
+    "port.unzipddp": logging.INFO,
+    "port.useragent": logging.INFO,
+}
+
+LOG_FORMAT = "%(asctime)s --- %(name)s --- %(levelname)s --- %(message)s"
+LOG_DATEFMT = "%Y-%m-%dT%H:%M:%S%z"
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the last capacity log records, unformatted
+
+    capacity: maximum number of records kept, older records are dropped
+    max_repeats: number of times the same message template is kept, later ones are only counted
+    max_templates: maximum number of distinct templates that are counted
+    """
+
+    def __init__(self, capacity: int = 1000, max_repeats: int = 20, max_templates: int = 1000, level=logging.NOTSET):
+        super().__init__(level)
+        self.records: deque[logging.LogRecord] = deque(maxlen=capacity)
+        self.max_repeats = max_repeats
+        self.max_templates = max_templates
+        self.counts: dict[tuple, int] = {}
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        key = (record.name, record.levelno, str(record.msg))
+        count = self.counts.get(key, 0) + 1
+        if count > 1 or len(self.counts) < self.max_templates:
+            self.counts[key] = count
+
+        if count > self.max_repeats:
+            return
+
+        if len(self.records) == self.records.maxlen:
+            self.dropped += 1
+        self.records.append(record)
+
+    def suppressed(self) -> list[tuple[tuple, int]]:
+        """
+        Message templates that were not kept every time, with the number of times they were left out
+        """
+        return [(key, count - self.max_repeats) for key, count in self.counts.items() if count > self.max_repeats]
+
+    def getvalue(self) -> list[str]:
+        """
+        Formats the buffered records, followed by a summary of what was left out
+        """
+        self.acquire()
+        try:
+            lines = [self.format(record) for record in self.records]
+            for (name, levelno, msg), count in self.suppressed():
+                lines.append(f"{name} --- {logging.getLevelName(levelno)} --- {count} more messages like: {msg}")
+            if self.dropped:
+                lines.append(f"{self.dropped} older log messages were dropped")
+        finally:
+            self.release()
+
+        return lines
+
+    def clear(self) -> None:
+        self.acquire()
+        try:
+            self.records.clear()
+            self.counts.clear()
+            self.dropped = 0
+        finally:
+            self.release()
+
+
+def configure(
+    handler: logging.Handler,
+    level: int = logging.INFO,
+    module_levels: dict[str, int] | None = None,
+    logger: logging.Logger | None = None,
+) -> None:
+    """
+    Attaches handler to logger (default: the root logger) and sets the levels
+    module_levels defaults to HOT_PATH_LEVELS
+    """
+    logger = logger or logging.getLogger()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATEFMT))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+    for name, module_level in (HOT_PATH_LEVELS if module_levels is None else module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
@@ -1,24 +1,114 @@
 from collections.abc import Generator
-from port.script import process
-from port.api.commands import CommandSystemExit
+from port.script import process, process_async
+from port.session import Session, activate
+from port.api.commands import CommandBatch, CommandSystemDonate, CommandSystemExit
+from port.api.payloads import PayloadVoid
+
+# Commands the UI answers right away with PayloadVoid
+FIRE_AND_FORGET = (CommandSystemDonate,)
 
 
 class ScriptWrapper(Generator):
-    def __init__(self, script):
+    """
+    Drives the script for py_worker.js
+
+    With coalesce=True consecutive fire-and-forget commands are answered
+    in Python and sent to the UI together with the next command as one CommandBatch.
+    Note that this runs the script ahead: a donation is only sent
+    once the script yields its next command, however long that takes.
+
+    session (see port.session) is active while the script runs
+    """
+    def __init__(self, script, coalesce=False, session=None):
         self.script = script
+        self.coalesce = coalesce
+        self.session = session
 
-    def send(self, data):
+    def next_command(self, data):
         try:
-            command = self.script.send(data)
+            return self.script.send(data)
         except StopIteration:
-            return CommandSystemExit(0, "End of script").toDict()
-        else:
+            return CommandSystemExit(0, "End of script")
+
+    def send(self, data):
+        with activate(self.session):
+            return self._send(data)
+
+    def _send(self, data):
+        command = self.next_command(data)
+        if not self.coalesce:
             return command.toDict()
 
+        commands = []
+        while True:
+            if isinstance(command, CommandBatch):
+                commands.extend(command.commands)
+            else:
+                commands.append(command)
+
+            if not isinstance(commands[-1], FIRE_AND_FORGET):
+                break
+            command = self.next_command(PayloadVoid())
+
+        if len(commands) == 1:
+            return commands[0].toDict()
+        return CommandBatch(commands).toDict()
+
     def throw(self, type=None, value=None, traceback=None):
         raise StopIteration
 
 
-def start(sessionId):
+class AsyncScriptWrapper:
+    """
+    Drives process_async, send is a coroutine
+
+    Under Pyodide the webloop runs the coroutine, py_worker.js awaits the Promise
+    send returns. Elsewhere await send from an asyncio event loop.
+    Background work of the script (the extraction) keeps running between two sends,
+    tasks it starts inherit the session.
+    Coalescing works as in ScriptWrapper.
+    """
+    def __init__(self, script, coalesce=False, session=None):
+        self.script = script
+        self.coalesce = coalesce
+        self.session = session
+
+    async def next_command(self, data):
+        try:
+            return await self.script.asend(data)
+        except StopAsyncIteration:
+            return CommandSystemExit(0, "End of script")
+
+    async def send(self, data):
+        with activate(self.session):
+            return await self._send(data)
+
+    async def _send(self, data):
+        command = await self.next_command(data)
+        if not self.coalesce:
+            return command.toDict()
+
+        commands = []
+        while True:
+            if isinstance(command, CommandBatch):
+                commands.extend(command.commands)
+            else:
+                commands.append(command)
+
+            if not isinstance(commands[-1], FIRE_AND_FORGET):
+                break
+            command = await self.next_command(PayloadVoid())
+
+        if len(commands) == 1:
+            return commands[0].toDict()
+        return CommandBatch(commands).toDict()
+
+
+def start(sessionId, coalesce=False):
     script = process(sessionId)
-    return ScriptWrapper(script)
+    return ScriptWrapper(script, coalesce, Session(sessionId))
+
+
+def start_async(sessionId, coalesce=False):
+    script = process_async(sessionId)
+    return AsyncScriptWrapper(script, coalesce, Session(sessionId))
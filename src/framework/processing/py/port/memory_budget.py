@@ -0,0 +1,81 @@
+"""
+Chooses between processing a DDP in memory or in chunks
+
+Pyodide runs in wasm memory that cannot grow beyond a hard limit; a
+worker that runs out of it crashes and the donation is lost. Parsing a
+csv into Python objects takes many times the size of the file, so before
+an extraction the expected peak memory is compared to a budget:
+
+* in_memory: the whole file is parsed at once (fastest)
+* chunked: the file is parsed and cleaned chunk_rows rows at a time,
+  only the cleaned columns of earlier chunks are kept
+
+The chosen plan is logged, so it ends up in the tracking logs.
+"""
+from dataclasses import dataclass
+from typing import Literal
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+IN_MEMORY = "in_memory"
+CHUNKED = "chunked"
+
+# Memory the extraction may use, well below the 2 GiB wasm32 limit of Pyodide
+MEMORY_BUDGET = 512 * 1024 * 1024
+
+# Peak memory of parsing a csv in memory, as a multiple of the file size
+# (about 2.7 for a Slack access log, measured with tracemalloc)
+EXPANSION_FACTOR = 4
+
+CHUNK_ROWS = 10_000
+
+
+@dataclass
+class ExecutionPlan:
+    """
+    How a DDP of input_size bytes is processed
+    """
+    mode: Literal["in_memory", "chunked"]
+    input_size: int
+    estimated_peak: int
+    budget: int
+    chunk_rows: int | None = None
+
+
+def choose_plan(
+    input_size: int,
+    budget: int | None = None,
+    expansion_factor: float = EXPANSION_FACTOR,
+    chunk_rows: int = CHUNK_ROWS,
+) -> ExecutionPlan:
+    """
+    Returns an in memory plan if the estimated peak memory fits in budget (default: MEMORY_BUDGET)
+    """
+    budget = MEMORY_BUDGET if budget is None else budget
+    estimated_peak = int(input_size * expansion_factor)
+
+    if estimated_peak <= budget:
+        plan = ExecutionPlan(IN_MEMORY, input_size, estimated_peak, budget)
+    else:
+        plan = ExecutionPlan(CHUNKED, input_size, estimated_peak, budget, chunk_rows)
+
+    logger.info(
+        "Processing mode: %s (input: %s bytes, estimated peak: %s bytes, budget: %s bytes)",
+        plan.mode, input_size, estimated_peak, budget,
+    )
+    return plan
+
+
+def plan_for_file(filename: str, budget: int | None = None) -> ExecutionPlan:
+    """
+    choose_plan for the size of filename
+    """
+    try:
+        input_size = os.path.getsize(filename)
+    except OSError as e:
+        logger.error("Could not determine the size of the input: %s", e)
+        input_size = 0
+
+    return choose_plan(input_size, budget)
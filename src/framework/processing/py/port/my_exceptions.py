@@ -6,3 +6,9 @@ class FileNotFoundInZipError(Exception):
     """
     The File you are looking for is not present in a zipfile
     """
+
+
+class ChunkVerificationError(Exception):
+    """
+    Chunks of a donation are missing or do not match their manifest
+    """
@@ -0,0 +1,102 @@
+"""
+Progress reporting for long running extractions
+
+Extractions that take long are written as generators: they yield a
+Progress between batches of work and return their result. The script
+turns every Progress into a progress page, so the participant sees how
+far the extraction is while it runs.
+
+    df = yield from extraction(filename)    # inside another generator
+    df = progress.run(extraction(filename)) # ignoring the progress
+
+BackgroundExtraction runs an extraction as an asyncio task instead
+(for port.script.process_async).
+"""
+from dataclasses import dataclass
+from typing import Any, Generator
+import asyncio
+import time
+
+# Minimum number of seconds between two progress updates
+PROGRESS_INTERVAL = 0.5
+
+
+@dataclass
+class Progress:
+    """
+    rows: number of rows processed so far
+    fraction: estimated part of the work that is done, between 0 and 1
+    """
+    rows: int
+    fraction: float
+
+    @property
+    def percentage(self) -> float:
+        return round(100 * min(max(self.fraction, 0.0), 1.0), 1)
+
+
+class Ticker:
+    """
+    Tells when interval seconds have passed since the last progress update
+    """
+
+    def __init__(self, interval: float = PROGRESS_INTERVAL):
+        self.interval = interval
+        self.last = time.monotonic()
+
+    def due(self) -> bool:
+        now = time.monotonic()
+        if now - self.last < self.interval:
+            return False
+        self.last = now
+        return True
+
+
+def run(extraction: Generator[Progress, Any, Any]) -> Any:
+    """
+    Runs an extraction to completion, ignoring its progress, and returns its result
+    """
+    while True:
+        try:
+            next(extraction)
+        except StopIteration as stop:
+            return stop.value
+
+
+class BackgroundExtraction:
+    """
+    Runs an extraction as an asyncio task, between two steps the event loop handles other work
+    A step lasts until the extraction yields its next Progress (at most about PROGRESS_INTERVAL)
+
+    latest: the most recent Progress, None before the first one
+    """
+
+    def __init__(self, extraction: Generator[Progress, Any, Any]):
+        self.latest: Progress | None = None
+        self.task = asyncio.ensure_future(self._run(extraction))
+
+    async def _run(self, extraction: Generator[Progress, Any, Any]) -> Any:
+        while True:
+            try:
+                self.latest = next(extraction)
+            except StopIteration as stop:
+                return stop.value
+            await asyncio.sleep(0)
+
+    def done(self) -> bool:
+        return self.task.done()
+
+    async def wait(self, timeout: float | None = None) -> None:
+        """
+        Waits until the extraction is done, or at most timeout seconds
+        """
+        await asyncio.wait({self.task}, timeout=timeout)
+
+    async def result(self) -> Any:
+        return await self.task
+
+    def cancel(self) -> None:
+        """
+        Stops the extraction at its next step
+        """
+        self.task.cancel()
@@ -0,0 +1,170 @@
+"""
+Registry of the platforms a participant can donate data from
+
+Every platform declares a cheap signature of its DDP (magic bytes,
+CSV header columns, zip member names). A single sniff pass reads the
+start of the uploaded file once (and the zip directory, if it is a zip)
+and returns the platform whose signature matches, so only that
+platform's validator and extractor are run.
+
+Extractors and validators are given as "module:function" paths and are
+only imported when a platform is actually used.
+"""
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from typing import Callable
+import importlib
+import logging
+import zipfile
+import csv
+import io
+
+import port.unzipddp as unzipddp
+
+logger = logging.getLogger(__name__)
+
+# Number of bytes read to sniff a file
+SNIFF_BYTES = 64 * 1024
+
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+@dataclass
+class Sniffed:
+    """
+    What is known about a file after reading its start
+    """
+    head: bytes
+    csv_header: list[str] = field(default_factory=list)
+    zip_members: list[str] = field(default_factory=list)
+
+
+@dataclass
+class Signature:
+    """
+    Cheap checks that recognize a DDP, all checks that are set must match
+
+    magic: bytes the file starts with
+    csv_columns: columns that must all be in the CSV header
+    zip_members: glob patterns, each must match a member of the zip
+    """
+    magic: bytes | None = None
+    csv_columns: list[str] | None = None
+    zip_members: list[str] | None = None
+
+    def matches(self, sniffed: Sniffed) -> bool:
+        if self.magic is not None and not sniffed.head.startswith(self.magic):
+            return False
+
+        if self.csv_columns is not None and not set(self.csv_columns).issubset(sniffed.csv_header):
+            return False
+
+        if self.zip_members is not None:
+            for pattern in self.zip_members:
+                if not any(fnmatch(member, pattern) for member in sniffed.zip_members):
+                    return False
+
+        return True
+
+
+def _load(path: str) -> Callable:
+    module_name, function_name = path.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+@dataclass
+class Platform:
+    """
+    A platform with its signature, extractor and validator
+    extract and validate are "module:function" paths,
+    extract is an extraction generator (see port.progress) returning (tables, meta tables)
+    multiple: participants can select several files, extract then receives a list of filenames
+    preview: optional "module:function" path, called with the same arguments as extract,
+    that quickly returns (tables, estimated number of rows) from a sample of the files.
+    The async flow (script.process_async) shows these while the extraction runs
+    """
+    name: str
+    signature: Signature
+    extract: str
+    validate: str
+    extensions: str = "text/csv"
+    multiple: bool = False
+    preview: str | None = None
+
+    def load(self) -> tuple[Callable, Callable]:
+        """
+        Imports and returns (extraction_fun, validation_fun)
+        """
+        return _load(self.extract), _load(self.validate)
+
+    def load_preview(self) -> Callable | None:
+        return _load(self.preview) if self.preview else None
+
+
+PLATFORMS = [
+    Platform(
+        name="Slack",
+        signature=Signature(
+            csv_columns=[
+                "Date Accessed",
+                "User Agent - Simple",
+                "User Agent - Full",
+                "IP Address",
+                "Number of Logins",
+                "Last Date Accessed",
+            ],
+        ),
+        extract="port.script:extract_slack",
+        validate="port.slack:validate",
+        multiple=True,
+        preview="port.script:preview_slack",
+    ),
+]
+
+
+def _csv_header(head: bytes) -> list[str]:
+    text = head.decode(unzipddp.CSV_ENCODING, errors="replace")
+    try:
+        return unzipddp.csv_column_names(next(csv.reader(io.StringIO(text))))
+    except (StopIteration, csv.Error):
+        return []
+
+
+def read_signature(filename: str, sniff_bytes: int = SNIFF_BYTES) -> Sniffed:
+    """
+    Reads the start of filename, and the member names if it is a zip
+    """
+    with open(filename, "rb") as f:
+        head = f.read(sniff_bytes)
+
+    sniffed = Sniffed(head)
+    if head.startswith(ZIP_MAGIC):
+        try:
+            with zipfile.ZipFile(filename) as zf:
+                sniffed.zip_members = zf.namelist()
+        except zipfile.BadZipFile as e:
+            logger.error("Could not read zip: %s", e)
+    else:
+        sniffed.csv_header = _csv_header(head)
+
+    return sniffed
+
+
+def sniff(filename: str, platforms: list[Platform] | None = None) -> Platform | None:
+    """
+    Returns the first platform whose signature matches filename, None if none matches
+    """
+    platforms = PLATFORMS if platforms is None else platforms
+    try:
+        sniffed = read_signature(filename)
+    except OSError as e:
+        logger.error("Could not sniff file: %s", e)
+        return None
+
+    for platform in platforms:
+        if platform.signature.matches(sniffed):
+            logger.info("File recognized as %s", platform.name)
+            return platform
+
+    logger.info("File not recognized")
+    return None
@@ -0,0 +1,280 @@
+"""
+Replays recorded payload sequences against port.start and measures each round-trip
+
+A recording is a JSON list of payloads in wire format, in the order
+py_worker.js would send them after the first (empty) runCycle:
+
+    [{"__type__": "PayloadVoid", "value": null},
+     {"__type__": "PayloadString", "value": "/file-input/access_logs.csv"},
+     ...]
+
+Recordings can be created from an export with:
+
+    python -m port.replay record <export file> <recording.json>
+
+and replayed by many concurrent sessions with:
+
+    python -m port.replay run <recording.json> --sessions 100 --concurrency 8
+
+For every send the latency, the size of the serialized command
+and (with --trace-memory) the change in traced Python memory is recorded.
+tracemalloc traces the whole process, so memory can only be traced with
+a concurrency of 1.
+
+Progress pages are not in a recording: how many the script renders depends
+on timing. They are answered with a PayloadVoid, like the UI does, without
+using up a recorded payload.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import argparse
+import tracemalloc
+import logging
+import json
+import time
+
+from port.main import start
+from port.headless import run_headless, shows_progress
+from port.api.payloads import PayloadVoid, payload_from_dict
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CycleStats:
+    """
+    Measurements for a single send() on the ScriptWrapper
+    """
+    index: int
+    command_type: str
+    seconds: float
+    command_bytes: int
+    memory_delta: int | None = None
+
+
+@dataclass
+class SessionStats:
+    """
+    Measurements for a single replayed session
+    """
+    session_id: str
+    cycles: list[CycleStats] = field(default_factory=list)
+    error: str | None = None
+
+
+def load_recording(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf8") as f:
+        recording = json.load(f)
+
+    if not isinstance(recording, list):
+        raise ValueError("A recording should be a list of payloads")
+
+    return recording
+
+
+def record(filename: str, path: str, coalesce: bool = False) -> list[dict]:
+    """
+    Runs the headless flow for filename and saves the payloads it sent as a recording
+    Replay a recording with the same coalesce setting it was recorded with
+    """
+    result = run_headless(filename, "record", coalesce=coalesce)
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(result.payloads, f, indent=2)
+
+    return result.payloads
+
+
+def _command_bytes(command: dict) -> int:
+    """
+    Size of the command as it crosses to the main thread:
+    JSON for text, the raw size for buffers (columnar tables)
+    """
+    buffer_bytes = 0
+
+    def measure_buffer(value):
+        nonlocal buffer_bytes
+        if isinstance(value, memoryview):
+            buffer_bytes += value.nbytes
+            return None
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    return len(json.dumps(command, default=measure_buffer).encode("utf8")) + buffer_bytes
+
+
+def _exits(command: dict) -> bool:
+    if command["__type__"] == "CommandBatch":
+        return any(_exits(c) for c in command["commands"])
+    return command["__type__"] == "CommandSystemExit"
+
+
+def replay_session(
+    session_id: str,
+    recording: list[dict],
+    trace_memory: bool = False,
+    coalesce: bool = False,
+) -> SessionStats:
+    """
+    Replays recording against a fresh port.start(session_id)
+
+    The first send is always None, just like the first runCycle in py_worker.js
+    Progress pages are answered with a PayloadVoid, every other command with the next recorded payload
+    Stops when the script exits, a recording that runs out before that is an error
+    """
+    stats = SessionStats(session_id)
+    payloads = iter([payload_from_dict(p) for p in recording])
+
+    try:
+        script = start(session_id, coalesce)
+        payload = None
+        index = 0
+        while True:
+            memory_before = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+            start_time = time.perf_counter()
+            command = script.send(payload)
+            seconds = time.perf_counter() - start_time
+            memory_delta = tracemalloc.get_traced_memory()[0] - memory_before if trace_memory else None
+
+            command_bytes = _command_bytes(command)
+            stats.cycles.append(CycleStats(index, command["__type__"], seconds, command_bytes, memory_delta))
+
+            if _exits(command):
+                break
+
+            index += 1
+            payload = PayloadVoid() if shows_progress(command) else next(payloads, None)
+            if payload is None:
+                # the flow did not finish, the session is not measured completely
+                raise RuntimeError(f"Recording ran out after {index} cycles before the script exited")
+
+    except Exception as e:
+        logger.error("Session %s failed: %s", session_id, e)
+        stats.error = str(e)
+
+    return stats
+
+
+def run_load(
+    recording: list[dict],
+    sessions: int = 1,
+    concurrency: int = 1,
+    trace_memory: bool = False,
+    coalesce: bool = False,
+) -> list[SessionStats]:
+    """
+    Replays recording in `sessions` sessions, `concurrency` of them at the same time,
+    all inside this interpreter
+    """
+    if trace_memory and concurrency > 1:
+        raise ValueError("Memory can only be traced with a concurrency of 1")
+
+    if trace_memory:
+        tracemalloc.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(replay_session, str(i), recording, trace_memory, coalesce)
+                for i in range(sessions)
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    return results
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(results: list[SessionStats]) -> dict:
+    """
+    Aggregates the cycles of all sessions per command type
+    """
+    per_type: dict[str, list[CycleStats]] = {}
+    for session in results:
+        for cycle in session.cycles:
+            per_type.setdefault(cycle.command_type, []).append(cycle)
+
+    summary = {}
+    for command_type, cycles in sorted(per_type.items()):
+        latencies = sorted(c.seconds for c in cycles)
+        sizes = [c.command_bytes for c in cycles]
+        memory = [c.memory_delta for c in cycles if c.memory_delta is not None]
+        summary[command_type] = {
+            "count": len(cycles),
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p95_ms": _percentile(latencies, 95) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "mean_bytes": sum(sizes) / len(sizes),
+            "max_bytes": max(sizes),
+            "memory_delta_bytes": sum(memory) if memory else None,
+        }
+
+    return summary
+
+
+def print_report(results: list[SessionStats], wall_time: float) -> None:
+    summary = summarize(results)
+    print(
+        f"{'command':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        f"{'mean B':>12}{'max B':>12}{'mem B':>12}"
+    )
+    for command_type, s in summary.items():
+        memory = "-" if s["memory_delta_bytes"] is None else str(s["memory_delta_bytes"])
+        print(
+            f"{command_type:<22}{s['count']:>8}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['p99_ms']:>10.3f}"
+            f"{s['max_ms']:>10.3f}{s['mean_bytes']:>12.0f}{s['max_bytes']:>12}{memory:>12}"
+        )
+
+    failed = sum(1 for r in results if r.error)
+    cycles = sum(len(r.cycles) for r in results)
+    print(f"{len(results)} sessions ({failed} failed), {cycles} cycles in {wall_time:.3f}s")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Record and replay payload sequences against port.start")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    record_parser = subparsers.add_parser("record", help="record the payloads of a headless run")
+    record_parser.add_argument("filename", help="export to run the flow with")
+    record_parser.add_argument("recording", help="path the recording is written to")
+    record_parser.add_argument("--coalesce", action="store_true", help="coalesce fire-and-forget commands")
+
+    run_parser = subparsers.add_parser("run", help="replay a recording")
+    run_parser.add_argument("recording", help="path to a recording")
+    run_parser.add_argument("--sessions", type=int, default=1, help="number of sessions to replay (default: 1)")
+    run_parser.add_argument("--concurrency", type=int, default=1, help="sessions running at the same time (default: 1)")
+    run_parser.add_argument(
+        "--trace-memory", action="store_true", help="record memory growth per send (slow, needs --concurrency 1)"
+    )
+    run_parser.add_argument("--coalesce", action="store_true", help="coalesce fire-and-forget commands")
+
+    parser.add_argument("--log-level", default="WARNING", help="log level of the script (default: WARNING)")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    if args.action == "record":
+        payloads = record(args.filename, args.recording, args.coalesce)
+        print(f"Recorded {len(payloads)} payloads to {args.recording}")
+        return 0
+
+    if args.trace_memory and args.concurrency > 1:
+        parser.error("--trace-memory needs --concurrency 1")
+
+    recording = load_recording(args.recording)
+    start_time = time.perf_counter()
+    results = run_load(recording, args.sessions, args.concurrency, args.trace_memory, args.coalesce)
+    print_report(results, time.perf_counter() - start_time)
+
+    return 1 if any(r.error for r in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,129 +1,359 @@
 import logging
 import json
-import io
-from typing import Optional, Literal
 
 
 import pandas as pd
 
 import port.api.props as props
 import port.slack as slack
+import port.donation as donation
+import port.logbuffer as logbuffer
+import port.session as session
+import port.registry as registry
+import port.checkpoint as checkpoint
+import port.consent as consent
+import port.progress as progress
 
-from port.api.commands import (CommandSystemDonate, CommandUIRender, CommandSystemExit)
+from port.api.commands import (CommandBatch, CommandSystemDonate, CommandUIRender, CommandSystemExit)
 
-LOG_STREAM = io.StringIO()
+# Logs are buffered (unformatted) per session (see port.session) and donated with donate_logs
+# Only warnings and errors go to the browser console
+LOG_SESSIONS = session.SessionLogHandler()
+LOG_CONSOLE = logging.StreamHandler()
+LOG_CONSOLE.setLevel(logging.WARNING)
 
-logging.basicConfig(
-    #stream=LOG_STREAM,
-    level=logging.DEBUG,
-    format="%(asctime)s --- %(name)s --- %(levelname)s --- %(message)s",
-    datefmt="%Y-%m-%dT%H:%M:%S%z",
-)
+logbuffer.configure(LOG_SESSIONS, level=logging.INFO)
+logbuffer.configure(LOG_CONSOLE, level=logging.INFO)
 
 LOGGER = logging.getLogger("script")
 
+# Donations are sent as is. Set to donation.GZIP_BASE64 (or DEFLATE_BASE64) to compress large donations,
+# only when the receiving end decodes them (see port.donation.decode)
+DONATION_ENCODING = donation.IDENTITY
 
-def process(session_id):
-    LOGGER.info("Starting the donation flow")
-    yield donate_logs(f"{session_id}-tracking")
+# Donations are sent whole. Set to a number of characters (e.g. donation.CHUNK_SIZE) to split larger donations
+# into chunks and a manifest, only when the receiving end reassembles them (see port.donation.reassemble)
+DONATION_CHUNK_SIZE = None
 
-    platforms = [ 
-        ("Slack", extract_slack, slack.validate), 
-    ]
 
+def process(session_id):
+    # Logs are donated together with the first file prompt
+    LOGGER.info("Starting the donation flow")
+    # snapshots of abandoned sessions are not kept in the browser
+    checkpoint.expire()
 
     # For each platform
     # 1. Prompt file extraction loop
     # 2. In case of succes render data on screen
-    for platform in platforms:
-        platform_name, extraction_fun, validation_fun = platform
+    for platform in registry.PLATFORMS:
+        platform_name = platform.name
 
         table_list = None
+        meta_table_list = []
+
+        # A restarted session resumes at the consent step
+        checkpointed = checkpoint.load(session_id, platform_name)
+        if checkpointed is not None:
+            LOGGER.info("Resuming %s from checkpoint", platform_name)
+            table_list, meta_table_list = checkpointed
 
         # Prompt file extraction loop
-        while True:
+        while table_list is None:
             LOGGER.info("Prompt for file for %s", platform_name)
-            yield donate_logs(f"{session_id}-tracking")
 
             # Render the propmt file page
-            promptFile = prompt_file("text/csv", platform_name)
-            file_result = yield render_page(
-                props.Translatable({"en": "Select your Slack file", "nl": "Selecteer uw Slack bestand"}),
-                promptFile
-            )
+            file_result = yield render_file_prompt(session_id, platform)
 
-            if file_result.__type__ == "PayloadString":
-                validation = validation_fun(file_result.value)
+            if file_result.__type__ in ("PayloadString", "PayloadStringList"):
+                filenames = payload_filenames(file_result)
+                extraction_fun, validation, valid_filenames = validate_files(platform, filenames)
 
                 # DDP is recognized: Status code zero
-                if validation.status_code.id == 0: 
-                    LOGGER.info("Payload for %s", platform_name)
+                if validation is not None and validation.status_code.id == 0: 
+                    LOGGER.info("Payload for %s (%s of %s files)", platform_name, len(valid_filenames), len(filenames))
                     yield donate_logs(f"{session_id}-tracking")
 
-                    table_list = extraction_fun(file_result.value, validation)
+                    # The same files were extracted before in this session
+                    file_fingerprint = checkpoint.fingerprint(valid_filenames) if checkpoint.enabled() else None
+                    tables = checkpoint.load(session_id, platform_name, file_fingerprint) if file_fingerprint else None
+
+                    if tables is None:
+                        extraction_input = valid_filenames if platform.multiple else valid_filenames[0]
+                        tables = yield from render_progress(
+                            extraction_fun(extraction_input, validation), platform_name
+                        )
+                        if file_fingerprint is not None:
+                            checkpoint.save(session_id, platform_name, file_fingerprint, tables)
+
+                    table_list, meta_table_list = tables
                     break
 
                 # DDP is not recognized: Different status code
-                if validation.status_code.id != 0: 
-                    LOGGER.info("Not a valid %s zip; No payload; prompt retry_confirmation", platform_name)
+                LOGGER.info("Not a valid %s zip; No payload; prompt retry_confirmation", platform_name)
+                retry_result = yield render_retry_confirmation(session_id, platform_name)
+
+                if retry_result.__type__ == "PayloadTrue":
+                    continue
+                else:
+                    LOGGER.info("Skipped during retry %s", platform_name)
                     yield donate_logs(f"{session_id}-tracking")
-                    retry_result = yield render_page(
-                        props.Translatable({"en": "Slack", "nl": "Slack"}),
-                        retry_confirmation(platform_name)
-                    )
-
-                    if retry_result.__type__ == "PayloadTrue":
-                        continue
-                    else:
-                        LOGGER.info("Skipped during retry %s", platform_name)
-                        yield donate_logs(f"{session_id}-tracking")
-                        break
+                    break
             else:
                 LOGGER.info("Skipped %s", platform_name)
                 yield donate_logs(f"{session_id}-tracking")
                 break
 
-
         # Render data on screen
         if table_list is not None:
-            LOGGER.info("Prompt consent; %s", platform_name)
-            yield donate_logs(f"{session_id}-tracking")
+            yield from prompt_consent(session_id, platform_name, table_list, meta_table_list)
 
-            # Check if extract something got extracted
-            if len(table_list) == 0:
-                table_list.append(create_empty_table(platform_name))
+    yield batch(
+        exit(0, "Success"),
+        render_end_page(),
+    )
 
-            prompt = assemble_tables_into_form(table_list)
-            consent_result = yield render_page(
-                props.Translatable({"en": "Your Slack data", "nl": "Uw Slack gegevens"}),
-                prompt
-            )
 
-            if consent_result.__type__ == "PayloadJSON":
-                LOGGER.info("Data donated; %s", platform_name)
+async def process_async(session_id):
+    """
+    The flow of process as an async generator, see port.main.AsyncScriptWrapper
+
+    The extraction starts as an asyncio task as soon as a valid file arrives.
+    It runs while the logs are donated, a preview is shown (if the platform has one)
+    and the progress pages are rendered, and is awaited only when the tables are needed for the consent form.
+    The donation always comes from the complete tables.
+    """
+    LOGGER.info("Starting the donation flow")
+    # snapshots of abandoned sessions are not kept in the browser
+    checkpoint.expire()
+
+    for platform in registry.PLATFORMS:
+        platform_name = platform.name
+
+        tables = checkpoint.load(session_id, platform_name)
+        if tables is not None:
+            LOGGER.info("Resuming %s from checkpoint", platform_name)
+
+        background = None
+        file_fingerprint = None
+        while tables is None and background is None:
+            LOGGER.info("Prompt for file for %s", platform_name)
+            file_result = yield render_file_prompt(session_id, platform)
+
+            if file_result.__type__ not in ("PayloadString", "PayloadStringList"):
+                LOGGER.info("Skipped %s", platform_name)
                 yield donate_logs(f"{session_id}-tracking")
-                yield donate(platform_name, consent_result.value)
-            else:
-                LOGGER.info("Skipped ater reviewing consent: %s", platform_name)
+                break
+
+            filenames = payload_filenames(file_result)
+            extraction_fun, validation, valid_filenames = validate_files(platform, filenames)
+            if validation is not None and validation.status_code.id == 0:
+                LOGGER.info("Payload for %s (%s of %s files)", platform_name, len(valid_filenames), len(filenames))
+                file_fingerprint = checkpoint.fingerprint(valid_filenames) if checkpoint.enabled() else None
+                tables = checkpoint.load(session_id, platform_name, file_fingerprint) if file_fingerprint else None
+
+                if tables is None:
+                    extraction_input = valid_filenames if platform.multiple else valid_filenames[0]
+                    background = progress.BackgroundExtraction(extraction_fun(extraction_input, validation))
+
                 yield donate_logs(f"{session_id}-tracking")
+                continue
 
-    yield exit(0, "Success")
-    yield render_end_page()
+            LOGGER.info("Not a valid %s zip; No payload; prompt retry_confirmation", platform_name)
+            retry_result = yield render_retry_confirmation(session_id, platform_name)
+            if retry_result.__type__ != "PayloadTrue":
+                LOGGER.info("Skipped during retry %s", platform_name)
+                yield donate_logs(f"{session_id}-tracking")
+                break
 
+        # A preview from a sample of the files is shown while the extraction runs
+        preview_deleted = {}
+        if background is not None and platform.preview is not None:
+            preview_tables, estimated_rows = platform.load_preview()(extraction_input, validation)
+            if preview_tables:
+                preview_result = yield render_preview(session_id, platform_name, preview_tables, estimated_rows)
+                if preview_result.__type__ == "PayloadConsentDelta":
+                    preview_deleted = consent.deleted_rows(preview_tables, consent.parse_delta(preview_result.value))
+                else:
+                    LOGGER.info("Skipped after preview: %s", platform_name)
+                    background.cancel()
+                    background = None
+                    yield donate_logs(f"{session_id}-tracking")
+
+        if background is not None:
+            while not background.done():
+                await background.wait(progress.PROGRESS_INTERVAL)
+                if background.latest is not None and not background.done():
+                    yield render_progress_page(platform_name, background.latest)
+
+            tables = await background.result()
+            if file_fingerprint is not None:
+                checkpoint.save(session_id, platform_name, file_fingerprint, tables)
+
+        # Rows deleted in the preview are shown as deleted in the complete table
+        if tables is not None and preview_deleted:
+            for table in tables[0]:
+                if table.id in preview_deleted:
+                    row_ids = consent.matching_row_ids(table.data_frame, preview_deleted[table.id])
+                    table.deleted_rows = consent.to_ranges(row_ids)
+                    LOGGER.info("Deleted %s rows of %s after the preview", len(row_ids), table.id)
+
+        # An async generator cannot delegate with yield from
+        if tables is not None:
+            table_list, meta_table_list = tables
+            consent_step = prompt_consent(session_id, platform_name, table_list, meta_table_list)
+            payload = None
+            while True:
+                try:
+                    command = consent_step.send(payload)
+                except StopIteration:
+                    break
+                payload = yield command
+
+    yield batch(
+        exit(0, "Success"),
+        render_end_page(),
+    )
+
+
+def payload_filenames(file_result) -> list[str]:
+    """
+    The filenames in a PayloadString or PayloadStringList
+    """
+    if file_result.__type__ == "PayloadString":
+        return [file_result.value]
+    return [str(filename) for filename in file_result.value]
+
+
+def validate_files(platform, filenames):
+    """
+    Returns (extraction function, validation, valid filenames)
+    Only the validator of the platform the files are recognized as is run
+    validation is the first successful validation, or the last one if none succeeded
+    """
+    extraction_fun = None
+    validation = None
+    valid_filenames = []
+    for filename in filenames:
+        detected = registry.sniff(filename)
+        if detected is None or detected.name != platform.name:
+            continue
+
+        extraction_fun, validation_fun = platform.load()
+        file_validation = validation_fun(filename)
+        if file_validation.status_code.id == 0:
+            valid_filenames.append(filename)
+        if validation is None or file_validation.status_code.id == 0:
+            validation = file_validation
+
+    return extraction_fun, validation, valid_filenames
 
 
-def assemble_tables_into_form(table_list: list[props.PropsUIPromptConsentFormTable]) -> props.PropsUIPromptConsentForm:
+def render_preview(session_id, platform_name, tables, estimated_rows):
+    """
+    Consent form with preview tables, continuing (PayloadConsentDelta) leads to the complete tables
+    """
+    preview_rows = sum(len(table.data_frame) for table in tables)
+    description = props.Translatable(
+        {
+            "en": f"While we process your complete {platform_name} file (about {estimated_rows} rows), you can look at a preview of {preview_rows} rows from across the file. Rows you delete here are also deleted from the complete data. When you continue, you can check the complete data before you decide to share it.",
+            "nl": f"Terwijl we uw volledige {platform_name} bestand verwerken (ongeveer {estimated_rows} rijen), kunt u een voorbeeld van {preview_rows} rijen uit het hele bestand bekijken. Rijen die u hier verwijdert, worden ook uit de volledige gegevens verwijderd. Als u verder gaat, kunt u de volledige gegevens controleren voordat u besluit ze te delen."
+        }
+    )
+    donate_question = props.Translatable(
+        {
+            "en": "Do you want to continue with the complete data?",
+            "nl": "Wilt u verder gaan met de volledige gegevens?"
+        }
+    )
+    donate_button = props.Translatable({"en": "Continue", "nl": "Verder"})
+    prompt = props.PropsUIPromptConsentForm(tables, [], description, donate_question, donate_button)
+    return batch(
+        donate_logs(f"{session_id}-tracking"),
+        render_page(
+            props.Translatable({
+                "en": f"A preview of your {platform_name} data",
+                "nl": f"Een voorbeeld van uw {platform_name} gegevens",
+            }),
+            prompt
+        ),
+    )
+
+
+def render_file_prompt(session_id, platform):
+    return batch(
+        donate_logs(f"{session_id}-tracking"),
+        render_page(
+            props.Translatable({
+                "en": f"Select your {platform.name} file",
+                "nl": f"Selecteer uw {platform.name} bestand",
+            }),
+            prompt_file(platform.extensions, platform.name, platform.multiple)
+        ),
+    )
+
+
+def render_retry_confirmation(session_id, platform_name):
+    return batch(
+        donate_logs(f"{session_id}-tracking"),
+        render_page(
+            props.Translatable({"en": platform_name, "nl": platform_name}),
+            retry_confirmation(platform_name)
+        ),
+    )
+
+
+def prompt_consent(session_id, platform_name, table_list, meta_table_list):
+    """
+    Renders the consent form and donates what the participant agreed to
+    Use with: yield from prompt_consent(session_id, platform_name, table_list, meta_table_list)
+    """
+    LOGGER.info("Prompt consent; %s", platform_name)
+
+    # Check if extract something got extracted
+    if len(table_list) == 0:
+        table_list.append(create_empty_table(platform_name))
+
+    prompt = assemble_tables_into_form(table_list, meta_table_list)
+    consent_result = yield batch(
+        donate_logs(f"{session_id}-tracking"),
+        render_page(
+            props.Translatable({"en": f"Your {platform_name} data", "nl": f"Uw {platform_name} gegevens"}),
+            prompt
+        ),
+    )
+
+    if consent_result.__type__ == "PayloadConsentDelta":
+        LOGGER.info("Data donated; %s", platform_name)
+        yield donate_logs(f"{session_id}-tracking")
+        # The UI only sends the deleted rows back, the tables are still here
+        donation_json = consent.donation_json(
+            prompt.tables, prompt.meta_tables, consent.parse_delta(consent_result.value)
+        )
+        yield from donate_chunked(platform_name, donation_json)
+    elif consent_result.__type__ == "PayloadJSON":
+        LOGGER.info("Data donated; %s", platform_name)
+        yield donate_logs(f"{session_id}-tracking")
+        yield from donate_chunked(platform_name, consent_result.value)
+    else:
+        LOGGER.info("Skipped ater reviewing consent: %s", platform_name)
+        yield donate_logs(f"{session_id}-tracking")
+
+    checkpoint.remove(session_id, platform_name)
+
+
+def assemble_tables_into_form(
+    table_list: list[props.PropsUIPromptConsentFormTable],
+    meta_table_list: list[props.PropsUIPromptConsentFormTable] | None = None,
+) -> props.PropsUIPromptConsentForm:
     """
     Assembles all donated data in consent form to be displayed
     """
-    return props.PropsUIPromptConsentForm(table_list, [])
+    return props.PropsUIPromptConsentForm(table_list, meta_table_list or [])
 
 
 def donate_logs(key):
-    log_string = LOG_STREAM.getvalue()  # read the log stream
-    if log_string:
-        log_data = log_string.split("\n")
-    else:
+    log_data = session.current().logs.getvalue()
+    if not log_data:
         log_data = ["no logs"]
 
     return donate(key, json.dumps(log_data))
@@ -142,55 +372,64 @@ def create_empty_table(platform_name: str) -> props.PropsUIPromptConsentFormTabl
     return table
 
 
-def extract_slack(filename: str, _) -> list[props.PropsUIPromptConsentFormTable]:
+def extract_slack(filenames: list[str], _):
+    """
+    Extraction generator: yields progress.Progress while the files are read
+    and returns (tables, meta tables), both lists of PropsUIPromptConsentFormTable
+    """
     tables_to_render = []
+    meta_tables = []
 
-    df = slack.slack_logins_to_df(filename)
+    summary = slack.LoginSummary()
+    df = yield from slack.iter_slack_logins(filenames, summary=summary)
     if not df.empty:
-        wordcloud = {
-            "title": {"en": "User agent", "nl": "User agent"},
-            "type": "wordcloud",
-            "textColumn": "User Agent - Simple"
-        }
-        hours_logged_in = {
-            "title": {"en": "Hours logged in by month of the year", "nl": "Uren ingelogd per maand van het jaar"},
-            "type": "area",
-            "group": {
-                "column": "Date Accessed",
-                "dateFormat": "month"
-            },
-            "values": [{
-                "column": "Login duration in hours",
-                "aggregate": "sum",
-            }]
-        }
-        at_what_time = {
-            "title": {"en": "Total time logged in by hour", "nl": "Totaal ingelogde tijd per uur van de dag"},
-            "type": "bar",
-            "group": {
-                "column": "Date Accessed",
-                "dateFormat": "hour_cycle"
-            },
-            "values": [{
-                "column": "Login duration in hours",
-                "aggregate": "sum",
-            }]
-        }
+        tables_to_render.append(slack_table(df))
 
-        table_description = props.Translatable({
-            "en": "The table shows when you accessed slack from different devices, and for how long. In the first figure you can see how many hours you stayed logged in per month of the year. In the second figure you can see the hours when you are likely to be on slack. In the third figure you can see on which device you used Slack the most.",
-            "nl": "De tabel toont wanneer u Slack hebt geopend vanaf verschillende apparaten en voor hoelang dat was. In de eerste grafiek kunt u zien hoeveel uur u per maand van het jaar ingelogd bent geweest. In de tweede grafiek kunt u zien op welke uren u waarschijnlijk op Slack bent geweest. In de derde grafiek kunt u zien op welk apparaat u Slack het meest hebt gebruikt.",
-        })
-        table_title = props.Translatable(
+        summary_title = props.Translatable(
             {
-                "en": "Your Slack access logs",
-                "nl": "Uw Slack access logs"
+                "en": "Summary of your Slack access logs",
+                "nl": "Samenvatting van uw Slack access logs"
             }
         )
-        table =  props.PropsUIPromptConsentFormTable("slack", table_title, df, table_description, [hours_logged_in, at_what_time, wordcloud]) 
-        tables_to_render.append(table)
+        meta_tables.append(props.PropsUIPromptConsentFormTable("slack_summary", summary_title, summary.to_df()))
+
+    return tables_to_render, meta_tables
+
+
+def slack_table(df: pd.DataFrame) -> props.PropsUIPromptConsentFormTable:
+    """
+    The consent form table of the (cleaned) Slack access logs in df, with its visualizations (see slack.SLACK_SPEC)
+    """
+    table_description = props.Translatable({
+        "en": "The table shows when you accessed slack from different devices, and for how long. In the first figure you can see how many hours you stayed logged in per month of the year, once counting every session and once counting time you were logged in on several devices at the same time only once. The next figure shows the most sessions you had open at the same time in each month. In the third figure you can see the hours when you are likely to be on slack. In the fourth figure you can see on which device you used Slack the most. The next two figures show how long you were logged in per type of client (desktop app, browser or mobile app) and per operating system. The last figure shows how long every session lasted; for long periods it shows a selection of the sessions, together with the shortest and longest session around each point.",
+        "nl": "De tabel toont wanneer u Slack hebt geopend vanaf verschillende apparaten en voor hoelang dat was. In de eerste grafiek kunt u zien hoeveel uur u per maand van het jaar ingelogd bent geweest, een keer met elke sessie meegeteld en een keer waarbij tijd die u op meerdere apparaten tegelijk ingelogd was maar één keer telt. De volgende grafiek toont de meeste sessies die u per maand tegelijk open had. In de derde grafiek kunt u zien op welke uren u waarschijnlijk op Slack bent geweest. In de vierde grafiek kunt u zien op welk apparaat u Slack het meest hebt gebruikt. De volgende twee grafieken tonen hoe lang u ingelogd was per type client (desktop app, browser of mobiele app) en per besturingssysteem. De laatste grafiek toont hoe lang elke sessie duurde; voor lange perioden toont deze een selectie van de sessies, samen met de kortste en langste sessie rond elk punt.",
+    })
+    table_title = props.Translatable(
+        {
+            "en": "Your Slack access logs",
+            "nl": "Uw Slack access logs"
+        }
+    )
+    return props.PropsUIPromptConsentFormTable(
+        "slack",
+        table_title,
+        df,
+        table_description,
+        slack.SLACK_PLAN.visualizations(df),
+        columnar=True,
+        search_index=True,
+    )
+
 
-    return tables_to_render
+def preview_slack(filenames: list[str], _):
+    """
+    Preview for extract_slack, see Platform.preview in port.registry
+    Returns (tables, estimated number of rows) from a sample of the files
+    """
+    df, estimated_rows = slack.sample_slack_logins(filenames)
+    if df.empty:
+        return [], estimated_rows
+    return [slack_table(df)], estimated_rows
 
 
 def render_end_page():
@@ -198,9 +437,39 @@ def render_end_page():
     return CommandUIRender(page)
 
 
-def render_page(header_text, body):
+def render_progress(extraction, platform):
+    """
+    Runs an extraction generator, renders a progress page for every progress.Progress it yields
+    and returns the result of the extraction
+    Use with: result = yield from render_progress(extraction, platform)
+    """
+    while True:
+        try:
+            extraction_progress = next(extraction)
+        except StopIteration as stop:
+            return stop.value
+
+        yield render_progress_page(platform, extraction_progress)
+
+
+def render_progress_page(platform, extraction_progress):
+    header_text = props.Translatable(
+        {"en": f"Processing your {platform} file", "nl": f"Uw {platform} bestand wordt verwerkt"}
+    )
+    description = props.Translatable(
+        {
+            "en": "Please wait, this can take a while for large files.",
+            "nl": "Een ogenblik geduld, bij grote bestanden kan dit even duren."
+        }
+    )
+    percentage = extraction_progress.percentage
+    body = props.PropsUIPromptProgress(description, f"{extraction_progress.rows} rows", percentage)
+    return render_page(header_text, body, percentage)
+
+
+def render_page(header_text, body, progress_percentage=None):
     header = props.PropsUIHeader(header_text)
-    footer = props.PropsUIFooter()
+    footer = props.PropsUIFooter(progress_percentage)
     page = props.PropsUIPageDonation("slack", header, body, footer)
     return CommandUIRender(page)
 
@@ -217,19 +486,66 @@ def retry_confirmation(platform):
     return props.PropsUIPromptConfirm(text, ok, cancel)
 
 
-def prompt_file(extensions, platform):
+def prompt_file(extensions, platform, multiple=False):
     description = props.Translatable(
         {
             "en": f"Please follow the download instructions and choose the file that you stored on your device. Click “Skip” at the right bottom, if you do not have a file from {platform}.",
             "nl": f"Volg de download instructies en kies het bestand dat u opgeslagen heeft op uw apparaat. Als u geen {platform} bestand heeft klik dan op “Overslaan” rechts onder."
         }
     )
-    return props.PropsUIPromptFileInput(description, extensions)
+    if multiple:
+        description = props.Translatable(
+            {
+                "en": description.translations["en"]
+                + " If you have several files, for example one per workspace, you can select them all at once.",
+                "nl": description.translations["nl"]
+                + " Heeft u meerdere bestanden, bijvoorbeeld één per workspace, dan kunt u ze allemaal tegelijk kiezen."
+            }
+        )
+    return props.PropsUIPromptFileInput(description, extensions, multiple)
+
 
+def donate(key, json_string, content_encoding=None, threshold=donation.COMPRESSION_THRESHOLD):
+    """
+    Donations of at least threshold bytes are compressed with content_encoding,
+    by default DONATION_ENCODING (identity: the raw json_string)
+    """
+    content_encoding = content_encoding or DONATION_ENCODING
+    encoded, applied_encoding = donation.encode(json_string, content_encoding, threshold)
+    return CommandSystemDonate(key, encoded, applied_encoding)
+
+
+def donate_chunked(
+    key,
+    json_string,
+    chunk_size=None,
+    content_encoding=None,
+    threshold=donation.COMPRESSION_THRESHOLD,
+):
+    """
+    Like donate, but yields one command per chunk followed by a manifest
+    when the (encoded) donation is larger than chunk_size, by default DONATION_CHUNK_SIZE
+    (None: never split)
+    Use with: yield from donate_chunked(key, json_string)
+    """
+    content_encoding = content_encoding or DONATION_ENCODING
+    chunk_size = chunk_size or DONATION_CHUNK_SIZE
+    encoded, applied_encoding = donation.encode(json_string, content_encoding, threshold)
+    if chunk_size is None or len(encoded) <= chunk_size:
+        yield CommandSystemDonate(key, encoded, applied_encoding)
+        return
 
-def donate(key, json_string):
-    return CommandSystemDonate(key, json_string)
+    for chunk_key, chunk in donation.iter_chunks(key, encoded, applied_encoding, chunk_size):
+        yield CommandSystemDonate(chunk_key, chunk, donation.IDENTITY)
 
 
 def exit(code, info):
     return CommandSystemExit(code, info)
+
+
+def batch(*commands):
+    """
+    Sends commands to the UI in a single cycle
+    Yielding a batch returns the response to its last command
+    """
+    return CommandBatch(list(commands))
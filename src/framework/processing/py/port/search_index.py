@@ -0,0 +1,183 @@
+"""
+Inverted index that lets the consent form search a table without scanning every row
+
+The UI searches for a case insensitive substring in any cell.
+Columns with few distinct values (user agents, operating systems, ...)
+are indexed as: distinct cell text -> row ids containing it.
+A search then tests every distinct value once instead of every row,
+and takes the union of the row ids of the values that match.
+
+Columns with many distinct values (timestamps, durations, ...) are indexed
+by token: the cell texts are split into runs of ASCII letters and digits
+("2021-01-01 09:20:00" -> 2021, 01, 01, 09, 20, 00), and every token points
+to the distinct values containing it. The UI splits the query the same way,
+looks its tokens up in the (sorted) vocabulary, intersects their postings and
+only tests the remaining candidate values. Tokens inside the query must be
+whole tokens, the first token must end a token and the last must start one.
+valueRows lists the row ids per distinct value, valueOffsets[i] is
+where the rows of value i start.
+
+Row (and value) ids are sorted and stored either as ranges (flat int32 array of
+[start, stop) pairs) or as a bitmap (uint8, bit i % 8 of byte i // 8),
+whichever is smaller. Both are sent as memoryviews, see port.api.columnar.
+
+Cell texts are the texts the consent form shows: String(value) of the
+value in DataFrame.to_json(). For tables sent as typed column buffers
+(columnar) only columns of strings are indexed. Columns that cannot be
+indexed are listed in scanColumns; the UI scans those cells.
+
+Layout:
+
+    {
+        "__type__": "SearchIndex",
+        "rowCount": n,
+        "columns": [
+            {"column": position, "values": [str], "postings": [{"encoding": "ranges" | "bitmap", "data": ...}]}
+        ],
+        "tokenColumns": [
+            {
+                "column": position,
+                "values": [str],
+                "valueRows": int32,
+                "valueOffsets": int32,
+                "tokens": [str],
+                "postings": [{"encoding": "ranges" | "bitmap", "data": ...}]
+            }
+        ],
+        "scanColumns": [position]
+    }
+"""
+import logging
+import json
+import re
+
+import pandas as pd
+import numpy as np
+
+from port.helpers import js_string
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_TYPE = "SearchIndex"
+
+# Columns with more distinct values than this fraction of the rows are indexed by token
+MAX_DISTINCT_RATIO = 0.5
+
+# Separates the tokens of a cell text, must match TOKEN_SEPARATOR in search_index.ts
+TOKEN_SEPARATOR = re.compile(r"[^0-9a-z]+")
+
+
+def encode_posting(row_ids: np.ndarray, row_count: int) -> dict:
+    """
+    Compresses sorted row ids as ranges or as a bitmap, whichever is smaller
+    """
+    breaks = np.flatnonzero(np.diff(row_ids) != 1) + 1
+    starts = np.concatenate(([row_ids[0]], row_ids[breaks]))
+    stops = np.concatenate((row_ids[breaks - 1] + 1, [row_ids[-1] + 1]))
+
+    if len(starts) * 2 * 4 <= (row_count + 7) // 8:
+        ranges = np.empty(len(starts) * 2, dtype=np.int32)
+        ranges[0::2] = starts
+        ranges[1::2] = stops
+        return {"encoding": "ranges", "data": memoryview(ranges)}
+
+    bits = np.zeros(row_count, dtype=np.uint8)
+    bits[row_ids] = 1
+    return {"encoding": "bitmap", "data": memoryview(np.packbits(bits, bitorder="little"))}
+
+
+def decode_posting(posting: dict, row_count: int) -> np.ndarray:
+    """
+    Reference decoder, returns the sorted row ids of a posting
+    """
+    if posting["encoding"] == "ranges":
+        ranges = np.frombuffer(posting["data"], dtype=np.int32)
+        return np.concatenate([np.arange(start, stop) for start, stop in zip(ranges[0::2], ranges[1::2])])
+
+    bits = np.unpackbits(np.frombuffer(posting["data"], dtype=np.uint8), bitorder="little")[:row_count]
+    return np.flatnonzero(bits)
+
+
+def _cell_texts(series: pd.Series, json_cells: bool) -> pd.Series | None:
+    """
+    The texts of the cells of series as the consent form shows them, None if they are not known
+    """
+    if pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+        # missing values are shown as "null" in the consent form
+        return series.astype(object).where(series.notna(), "null")
+    if not json_cells:
+        return None
+    values = json.loads(series.to_json(orient="values"))
+    return pd.Series([js_string(value) for value in values], index=series.index, dtype=object)
+
+
+def _index_column(codes: np.ndarray, uniques: np.ndarray) -> list[dict]:
+    row_count = len(codes)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=len(uniques))
+    groups = np.split(order, np.cumsum(counts)[:-1])
+    return [encode_posting(row_ids, row_count) for row_ids in groups]
+
+
+def _index_tokens(column: int, codes: np.ndarray, uniques: np.ndarray) -> dict:
+    order = np.argsort(codes, kind="stable").astype(np.int32)
+    offsets = np.zeros(len(uniques) + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum(np.bincount(codes, minlength=len(uniques)))
+
+    value_ids: dict[str, list[int]] = {}
+    for value_id, value in enumerate(uniques):
+        for token in set(TOKEN_SEPARATOR.split(value.lower())):
+            if token:
+                value_ids.setdefault(token, []).append(value_id)
+
+    tokens = sorted(value_ids)
+    return {
+        "column": column,
+        "values": list(uniques),
+        "valueRows": memoryview(order),
+        "valueOffsets": memoryview(offsets),
+        "tokens": tokens,
+        "postings": [encode_posting(np.array(value_ids[token]), len(uniques)) for token in tokens],
+    }
+
+
+def build_search_index(
+    df: pd.DataFrame,
+    max_distinct_ratio: float = MAX_DISTINCT_RATIO,
+    json_cells: bool = True,
+) -> dict:
+    """
+    Builds the search index for df, see the module docstring for the layout
+    json_cells: the table is sent as DataFrame.to_json(), so the cell texts of all columns are known
+    """
+    columns = []
+    token_columns = []
+    scan_columns = []
+    row_count = len(df)
+
+    for position, name in enumerate(df.columns):
+        texts = _cell_texts(df[name], json_cells) if row_count > 0 else None
+        if texts is None:
+            scan_columns.append(position)
+            continue
+
+        codes, uniques = pd.factorize(texts, sort=True)
+        if len(uniques) <= max_distinct_ratio * row_count:
+            columns.append({"column": position, "values": list(uniques), "postings": _index_column(codes, uniques)})
+        elif all(value.isascii() for value in uniques):
+            # case folding of ASCII text is the same in Python and in the UI
+            token_columns.append(_index_tokens(position, codes, uniques))
+        else:
+            scan_columns.append(position)
+
+    logger.info(
+        "Search index: %s indexed columns, %s token indexed columns, %s scanned columns",
+        len(columns), len(token_columns), len(scan_columns),
+    )
+    return {
+        "__type__": SEARCH_INDEX_TYPE,
+        "rowCount": row_count,
+        "columns": columns,
+        "tokenColumns": token_columns,
+        "scanColumns": scan_columns,
+    }
@@ -0,0 +1,82 @@
+"""
+Per session state, so one interpreter can run many sessions at the same time
+
+port.start creates a Session for every session id, and the script wrapper
+activates it while the script runs. The active session is kept in a
+contextvars.ContextVar: every thread and every asyncio task sees its own,
+and tasks started by a session (the background extraction) inherit it.
+
+* Logs: SessionLogHandler, on the root logger, passes every record to the
+  log buffer of the active session, so donate_logs only donates the logs of
+  its own session. Records logged outside a session go to DEFAULT_SESSION.
+* Validation: ValidateInput is created per file; the status codes and DDP
+  categories it refers to are shared, but frozen.
+* Caches of pure functions (useragent.parse_user_agent, parsed timestamps
+  in port.extraction_plan) are shared on purpose: they are bounded and give
+  the same result for every session.
+
+A session costs one bounded log buffer (see port.logbuffer).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+import logging
+
+import port.logbuffer as logbuffer
+
+logger = logging.getLogger(__name__)
+
+# Number of log records kept per session
+LOG_CAPACITY = 1000
+
+
+class Session:
+    """
+    State of one donation session
+    """
+
+    def __init__(self, session_id: str, log_capacity: int = LOG_CAPACITY):
+        self.session_id = str(session_id)
+        self.logs = logbuffer.RingBufferHandler(capacity=log_capacity, max_repeats=20)
+        self.logs.setFormatter(logging.Formatter(logbuffer.LOG_FORMAT, logbuffer.LOG_DATEFMT))
+
+    def __repr__(self) -> str:
+        return f"Session({self.session_id!r})"
+
+
+DEFAULT_SESSION = Session("default")
+
+_CURRENT: ContextVar[Session | None] = ContextVar("port_session", default=None)
+
+
+def current() -> Session:
+    """
+    The active session, DEFAULT_SESSION if none is active
+    """
+    return _CURRENT.get() or DEFAULT_SESSION
+
+
+@contextmanager
+def activate(session: Session | None) -> Iterator[Session | None]:
+    """
+    Makes session the active session in the current context (thread or asyncio task)
+    With None the active session is left as is
+    """
+    if session is None:
+        yield current()
+        return
+
+    token = _CURRENT.set(session)
+    try:
+        yield session
+    finally:
+        _CURRENT.reset(token)
+
+
+class SessionLogHandler(logging.Handler):
+    """
+    Passes every record on to the log buffer of the active session
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        current().logs.handle(record)
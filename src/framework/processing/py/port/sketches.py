@@ -0,0 +1,121 @@
+"""
+Bounded memory summaries that are updated one chunk of data at a time
+
+* HyperLogLog: approximate number of distinct values (about 1.6% error with 4096 registers)
+* SpaceSaving: the k most frequent values with their (over)estimated counts
+* QuantileSketch: quantiles with a relative error of at most `relative_accuracy` (DDSketch)
+
+Memory does not grow with the number of values added.
+"""
+import math
+
+import pandas as pd
+import numpy as np
+
+
+class HyperLogLog:
+    """
+    Approximate distinct count, 2 ** precision registers of one byte
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values: pd.Series) -> None:
+        values = values.dropna()
+        if values.empty:
+            return
+
+        hashes = pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy()
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        # rank: position of the first 1 bit in the next 32 bits of the hash
+        rest = ((hashes >> np.uint64(32 - self.precision)) & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        rank = np.full(len(rest), 33, dtype=np.uint8)
+        nonzero = rest > 0
+        rank[nonzero] = 32 - np.floor(np.log2(rest[nonzero])).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """
+    Keeps counters for at most k values, a new value replaces the least frequent one
+    Every value occurring more than n / k times is guaranteed to be kept
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        self.counts: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+
+    def update(self, values: pd.Series) -> None:
+        for value, count in values.dropna().astype(str).value_counts(sort=False).items():
+            if value in self.counts:
+                self.counts[value] += count
+            elif len(self.counts) < self.k:
+                self.counts[value] = count
+                self.errors[value] = 0
+            else:
+                smallest = min(self.counts, key=self.counts.get)  # type: ignore
+                minimum = self.counts.pop(smallest)
+                self.errors.pop(smallest)
+                self.counts[value] = minimum + count
+                self.errors[value] = minimum
+
+    def top(self, n: int | None = None) -> list[tuple[str, int]]:
+        """
+        The n (default: k) most frequent values with their estimated counts
+        """
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+class QuantileSketch:
+    """
+    Logarithmically sized buckets: bucket i holds values in (gamma ** (i - 1), gamma ** i]
+    Values <= 0 are counted as 0
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, values: pd.Series) -> None:
+        values = pd.to_numeric(values, errors="coerce").dropna().to_numpy(dtype=np.float64)
+        self.count += len(values)
+
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+
+        indices, counts = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        for index, count in zip(indices.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q: float) -> float | None:
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
@@ -10,6 +10,12 @@ import pandas as pd
 
 from dateutil import parser
 import port.unzipddp as unzipddp
+import port.registry as registry
+import port.useragent as useragent
+import port.progress as progress
+import port.extraction_plan as extraction_plan
+import port.intervals as intervals
+import port.sketches as sketches
 
 from port.validate import (
     DDPCategory,
@@ -21,7 +27,13 @@ from port.validate import (
 
 logger = logging.getLogger(__name__)
 
-DDP_CATEGORIES = [
+# Number of rows in a preview (see sample_slack_logins)
+PREVIEW_ROWS = 500
+
+EPOCH = pd.Timestamp("1970-01-01")
+
+# Shared by all sessions (see port.session), so immutable
+DDP_CATEGORIES = (
     DDPCategory(
         id="csv_en",
         ddp_filetype=DDPFiletype.CSV,
@@ -29,12 +41,12 @@ DDP_CATEGORIES = [
         known_files=[
         ]
     ),
-]
+)
 
-STATUS_CODES = [
+STATUS_CODES = (
     StatusCode(id=0, description="Valid slack CSV", message=""),
     StatusCode(id=1, description="Not a slack CSV", message=""),
-]
+)
 
 
 def validate(filename: Path) -> ValidateInput:
@@ -50,9 +62,16 @@ def validate(filename: Path) -> ValidateInput:
     ]
 
     validation = ValidateInput(STATUS_CODES, DDP_CATEGORIES)
-    df = unzipddp.read_csv_from_file_to_df(filename)
+
+    # only the header is read, the file itself is read by the budgeted extraction
+    try:
+        header = registry.read_signature(str(filename)).csv_header
+    except OSError as e:
+        logger.error("Could not read file: %s", e)
+        header = []
+
     for known_col in known_colnames:
-        if known_col not in df.columns:
+        if known_col not in header:
             validation.set_status_code(1)
             return validation
 
@@ -60,6 +79,9 @@ def validate(filename: Path) -> ValidateInput:
     return validation
 
 
+# Row by row cleaning, the reference for SLACK_SPEC below
+# port.bench checks that the compiled plan gives the same table and compares the timings
+
 def format_timestamp(timestamp, to_string = True):
     pattern = r'\(.*?\)'
     timestamp = re.sub(pattern, '', timestamp)
@@ -80,37 +102,326 @@ def hour_diff(row):
 
 def clean_df(df) -> pd.DataFrame:
     try:
-        # remove rows containing 'Google Calendar' from "User Agent - Simple"
-        df = df[df["User Agent - Simple"] != "Google Calendar"].reset_index(drop=True)
-
         # Try to clean all timestamps
         df["Login duration in hours"] = df.apply(hour_diff, axis=1)
         df["Date Accessed"] = df["Date Accessed"].apply(lambda x: format_timestamp(x))
         df["Last Date Accessed"] = df["Last Date Accessed"].apply(lambda x: format_timestamp(x))
+    except Exception as e:
+        logger.error(e)
+
+    return df
+
+
+def add_device_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replaces "User Agent - Full" with the operating system, client type and client version derived from it
+    The full user agent itself is not kept
+    """
+    try:
+        devices = useragent.classify_user_agents(df["User Agent - Full"])
+        df = pd.concat([df.drop(columns=["User Agent - Full"]), devices], axis=1)
+
+    except Exception as e:
+        logger.error(e)
+
+    return df
 
 
+def add_overlap_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the overlap columns (see overlap_columns) to a table cleaned with clean_df
+    """
+    try:
+        starts = pd.to_datetime(df["Date Accessed"], format=DATE_FORMAT, errors="coerce")
+        ends = pd.to_datetime(df["Last Date Accessed"], format=DATE_FORMAT, errors="coerce")
+        overlap = overlap_columns(starts, ends)
+        for column in overlap.columns:
+            df[column] = overlap[column].set_axis(df.index)
+
     except Exception as e:
         logger.error(e)
-    
+
     return df
 
 
+class LoginSummary:
+    """
+    Summary statistics of the access log, updated chunk by chunk in iter_slack_logins
+    Memory stays bounded however long the log is (see port.sketches)
+    """
+
+    def __init__(self, top_k: int = 5):
+        self.top_k = top_k
+        self.rows = 0
+        self.first_session: pd.Timestamp | None = None
+        self.last_session: pd.Timestamp | None = None
+        self.ip_addresses = sketches.HyperLogLog()
+        self.user_agents = sketches.SpaceSaving(10 * top_k)
+        self.durations = sketches.QuantileSketch()
+
+    def update(self, raw: pd.DataFrame, cleaned: pd.DataFrame) -> None:
+        """
+        raw: the rows as read, cleaned: the same rows after SLACK_PLAN.transform (dates parsed)
+        """
+        self.rows += len(cleaned)
+        self.ip_addresses.update(raw["IP Address"])
+        self.user_agents.update(raw["User Agent - Simple"])
+        if "Login duration in hours" in cleaned:
+            self.durations.update(cleaned["Login duration in hours"])
+
+        dates = cleaned["Date Accessed"].dropna()
+        if not dates.empty:
+            self.first_session = min(filter(None, [self.first_session, dates.min()]))
+            self.last_session = max(filter(None, [self.last_session, dates.max()]))
+
+    def to_df(self) -> pd.DataFrame:
+        statistics = [
+            ("Number of sessions", self.rows),
+            ("First session", self.first_session),
+            ("Last session", self.last_session),
+            ("Distinct IP addresses (estimate)", self.ip_addresses.count()),
+        ]
+        for q in (0.5, 0.9, 0.99):
+            quantile = self.durations.quantile(q)
+            value = None if quantile is None else round(quantile, 2)
+            statistics.append((f"Login duration in hours, {round(q * 100)}th percentile", value))
+        for i, (user_agent, count) in enumerate(self.user_agents.top(self.top_k), start=1):
+            statistics.append((f"User agent {i}: {user_agent} (sessions, estimate)", count))
+
+        return pd.DataFrame(
+            [(name, "" if value is None else str(value)) for name, value in statistics],
+            columns=["Statistic", "Value"],
+        )
+
+
+def login_duration(starts: pd.Series, ends: pd.Series) -> pd.Series:
+    return (ends - starts).dt.total_seconds() / 3600
 
-def slack_logins_to_df(filename: str) -> pd.DataFrame:
+
+def overlap_columns(starts: pd.Series, ends: pd.Series) -> pd.DataFrame:
+    """
+    "Distinct login duration in hours": the part of a session not overlapping an earlier session
+    (on another device), summing it counts every hour logged in once.
+    "Concurrent sessions": the number of sessions active when the session started
+    Needs all sessions at once
+    """
+    start_seconds = (starts - EPOCH).dt.total_seconds().to_numpy()
+    end_seconds = (ends - EPOCH).dt.total_seconds().to_numpy()
+
+    out = pd.DataFrame({
+        "Distinct login duration in hours": intervals.distinct_durations(start_seconds, end_seconds) / 3600,
+        "Concurrent sessions": pd.array(intervals.concurrent_sessions(start_seconds, end_seconds), dtype="Int64"),
+    })
+    logger.info(
+        "Logged in for %.1f distinct hours, at most %s sessions at the same time",
+        out["Distinct login duration in hours"].sum(),
+        intervals.peak_concurrency(start_seconds, end_seconds),
+    )
+    return out
+
+
+# Timestamps look like "Jan 01, 2021 09:20:00 AM (CET)", the time zone is dropped
+parse_slack_timestamp = extraction_plan.datetime_parser("%b %d, %Y %I:%M:%S %p", strip=r"\(.*?\)")
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SLACK_SPEC = extraction_plan.ExtractionSpec(
+    columns=[
+        extraction_plan.Column("Date Accessed", parse=parse_slack_timestamp, format=DATE_FORMAT),
+        extraction_plan.Column("Last Date Accessed", parse=parse_slack_timestamp, format=DATE_FORMAT),
+        extraction_plan.Column("User Agent - Simple"),
+        # the full user agent is replaced by the operating system, client type and client version derived from it
+        extraction_plan.Column("User Agent - Full", keep=False),
+        extraction_plan.Column("Number of Logins"),
+        # two logins are only the same if they also came from the same IP address
+        # the IP address is only used for that and for the summary, it is not kept
+        extraction_plan.Column("IP Address", keep=False),
+    ],
+    filters=[
+        # rows containing 'Google Calendar' in "User Agent - Simple" are not logins
+        unzipddp.Predicate("User Agent - Simple", "!=", "Google Calendar"),
+    ],
+    derived=[
+        extraction_plan.Derived(
+            ["Login duration in hours"], ["Date Accessed", "Last Date Accessed"], login_duration
+        ),
+        extraction_plan.Derived(
+            ["Operating system", "Client type", "Client version"], ["User Agent - Full"], useragent.classify_user_agents
+        ),
+        extraction_plan.Derived(
+            ["Distinct login duration in hours", "Concurrent sessions"],
+            ["Date Accessed", "Last Date Accessed"],
+            overlap_columns,
+            table=True,
+        ),
+    ],
+    visualizations=[
+        {
+            "title": {"en": "Hours logged in by month of the year", "nl": "Uren ingelogd per maand van het jaar"},
+            "type": "area",
+            "group": {
+                "column": "Date Accessed",
+                "dateFormat": "month"
+            },
+            "values": [{
+                "label": {"en": "All sessions", "nl": "Alle sessies"},
+                "column": "Login duration in hours",
+                "aggregate": "sum",
+            }, {
+                "label": {"en": "Without overlap between devices", "nl": "Zonder overlap tussen apparaten"},
+                "column": "Distinct login duration in hours",
+                "aggregate": "sum",
+            }]
+        },
+        {
+            "title": {"en": "Most sessions at the same time by month", "nl": "Meeste sessies tegelijk per maand"},
+            "type": "bar",
+            "group": {
+                "column": "Date Accessed",
+                "dateFormat": "month"
+            },
+            "values": [{
+                "column": "Concurrent sessions",
+                "aggregate": "max",
+            }]
+        },
+        {
+            "title": {"en": "Total time logged in by hour", "nl": "Totaal ingelogde tijd per uur van de dag"},
+            "type": "bar",
+            "group": {
+                "column": "Date Accessed",
+                "dateFormat": "hour_cycle"
+            },
+            "values": [{
+                "column": "Login duration in hours",
+                "aggregate": "sum",
+            }]
+        },
+        {
+            "title": {"en": "User agent", "nl": "User agent"},
+            "type": "wordcloud",
+            "textColumn": "User Agent - Simple"
+        },
+        {
+            "title": {"en": "Total time logged in by type of client", "nl": "Totaal ingelogde tijd per type client"},
+            "type": "bar",
+            "group": {
+                "column": "Client type",
+            },
+            "values": [{
+                "column": "Login duration in hours",
+                "aggregate": "sum",
+            }]
+        },
+        {
+            "title": {
+                "en": "Total time logged in by operating system",
+                "nl": "Totaal ingelogde tijd per besturingssysteem",
+            },
+            "type": "bar",
+            "group": {
+                "column": "Operating system",
+            },
+            "values": [{
+                "column": "Login duration in hours",
+                "aggregate": "sum",
+            }]
+        },
+        {
+            "title": {"en": "Login duration of every session", "nl": "Duur van elke sessie"},
+            "type": "line",
+            "group": {
+                "column": "Date Accessed",
+            },
+            "values": [{
+                "column": "Login duration in hours",
+            }],
+            "downsample": {"target": 500},
+        },
+    ],
+)
+
+SLACK_PLAN = extraction_plan.compile_spec(SLACK_SPEC)
+
+
+def iter_slack_logins(
+    filenames: str | list[str],
+    budget: int | None = None,
+    interval: float = progress.PROGRESS_INTERVAL,
+    summary: LoginSummary | None = None,
+):
+    """
+    Reads and cleans one or more Slack access logs in chunks (see SLACK_SPEC),
+    yields a progress.Progress at most every interval seconds and returns the DataFrame
+    Use with: df = yield from iter_slack_logins(filenames)
+
+    Several files (workspaces, or exports with overlapping periods) are merged into one log:
+    rows are hashed before they are cleaned and rows seen before, in any of the files, are dropped.
+    Memory grows with the merged log, not with the sum of the files
+
+    If given, summary is updated in the same pass
+    """
     out = pd.DataFrame()
-    cols_to_keep = [
-         "Date Accessed", 
-         "Last Date Accessed",
-         "User Agent - Simple",
-         "Number of Logins",
-    ]
     try:
-        out = unzipddp.read_csv_from_file_to_df(filename)
-        out = out[cols_to_keep]
-        out = clean_df(out)
+        on_chunk = summary.update if summary is not None else None
+        out = yield from SLACK_PLAN.iter_extract(filenames, budget, interval, on_chunk)
 
     except Exception as e:
         logger.error(e)
 
     return out
 
+
+def slack_logins_to_df(filenames: str | list[str], budget: int | None = None) -> pd.DataFrame:
+    return progress.run(iter_slack_logins(filenames, budget))
+
+
+def _month(timestamps: pd.Series) -> pd.Series:
+    """
+    Month of raw timestamps like "Jan 01, 2021 09:20:00 AM (CET)", without parsing every cell with dateutil
+    Timestamps in another format get month NaT
+    """
+    stripped = timestamps.astype(str).str.replace(r"\s*\(.*?\)", "", regex=True).str.strip()
+    dates = pd.to_datetime(stripped, format="%b %d, %Y %I:%M:%S %p", errors="coerce")
+    return dates.dt.to_period("M")
+
+
+def _stratified_sample(df: pd.DataFrame, strata: pd.Series, n: int) -> pd.DataFrame:
+    """
+    A sample of about n rows, every stratum gets a share proportional to its size and at least one row
+    """
+    if len(df) <= n:
+        return df
+
+    parts = []
+    for _, group in df.groupby(strata, dropna=False, sort=False):
+        quota = max(1, round(n * len(group) / len(df)))
+        parts.append(group.sample(min(quota, len(group)), random_state=0))
+    return pd.concat(parts).sort_index()
+
+
+def sample_slack_logins(filenames: str | list[str], sample_rows: int = PREVIEW_ROWS) -> tuple[pd.DataFrame, int]:
+    """
+    Returns a cleaned sample of at most about sample_rows logins, stratified by month,
+    and the estimated number of logins in the files
+
+    Only blocks spread over the files are read (see unzipddp.sample_csv_from_file_to_df),
+    so this takes about the same time for every file size.
+    The sample has no overlap columns: these depend on all sessions
+    """
+    out = pd.DataFrame()
+    estimated_rows = 0
+
+    try:
+        sample, estimated_rows = SLACK_PLAN.sample(filenames)
+        if sample.empty:
+            return out, estimated_rows
+
+        sample = _stratified_sample(sample, _month(sample["Date Accessed"]), sample_rows)
+        out = SLACK_PLAN.finish(SLACK_PLAN.transform(sample), table=False)
+        logger.info("Sampled %s of about %s logins", len(out), estimated_rows)
+
+    except Exception as e:
+        logger.error(e)
+
+    return out, estimated_rows
@@ -0,0 +1,111 @@
+"""
+Computes wordcloud terms in Python, so the browser does not have to
+
+Mirrors prepareTextData.ts in the visualization plugin:
+
+* a term is a whole cell, or with tokenize=True every space separated token containing a letter
+* value: sum of the value column (or 1 per occurrence), doc_freq: number of rows containing the term
+* importance: value * log(number of rows / doc_freq)
+
+Stopwords are removed before the top N terms are selected.
+"""
+import logging
+import math
+
+import pandas as pd
+import numpy as np
+
+from port.stopwords import STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+TOP_N = 200
+
+# A token needs at least one letter, like /\p{L}/u in util.ts
+LETTER_PATTERN = r"[^\W\d_]"
+
+
+def _tokens(texts: pd.Series, tokenize: bool, bigrams: bool) -> pd.Series:
+    """
+    Returns one term per row, indexed by the position of the row it came from
+    """
+    if not tokenize:
+        return texts
+
+    tokens = texts.str.split(" ").explode()
+    tokens = tokens[tokens.notna() & tokens.str.contains(LETTER_PATTERN, regex=True)]
+    is_stopword = tokens.str.lower().isin(STOPWORDS)
+    terms = tokens[~is_stopword]
+
+    if bigrams:
+        # pairs of adjacent tokens from the same row, neither of them a stopword
+        same_row = tokens.index[:-1] == tokens.index[1:]
+        keep = same_row & ~is_stopword.to_numpy()[:-1] & ~is_stopword.to_numpy()[1:]
+        pairs = pd.Series(
+            tokens.to_numpy()[:-1][keep] + " " + tokens.to_numpy()[1:][keep],
+            index=tokens.index[:-1][keep],
+            dtype=object,
+        )
+        terms = pd.concat([terms, pairs])
+
+    return terms
+
+
+def term_frequencies(
+    texts: pd.Series,
+    values: pd.Series | None = None,
+    tokenize: bool = False,
+    bigrams: bool = False,
+    top_n: int = TOP_N,
+) -> list[dict]:
+    """
+    Returns the top_n terms of texts as [{"text": ..., "value": ..., "importance": ...}]
+    ordered by importance
+    """
+    texts = texts.reset_index(drop=True)
+    n_docs = len(texts)
+    if n_docs == 0:
+        return []
+
+    terms = _tokens(texts[texts.notna()].astype(str), tokenize, bigrams)
+    if not tokenize:
+        terms = terms[~terms.str.lower().isin(STOPWORDS)]
+
+    if values is None:
+        weights = pd.Series(1.0, index=terms.index)
+    else:
+        numeric = pd.to_numeric(values.reset_index(drop=True), errors="coerce")
+        weights = numeric.reindex(terms.index)
+
+    frame = pd.DataFrame({"text": terms.to_numpy(), "row": terms.index, "weight": weights.to_numpy()})
+    grouped = frame.groupby("text", sort=False).agg(value=("weight", "sum"), doc_freq=("row", "nunique"))
+    grouped["importance"] = grouped["value"] * np.log(n_docs / grouped["doc_freq"])
+    grouped = grouped.sort_values("importance", ascending=False, kind="stable").head(top_n)
+
+    logger.info("Computed %s wordcloud terms from %s rows", len(grouped), n_docs)
+    return [
+        {"text": text, "value": float(row.value), "importance": float(row.importance)}
+        for text, row in grouped.iterrows()
+        if not math.isnan(row.importance)
+    ]
+
+
+def precompute_wordcloud(visualization: dict, df: pd.DataFrame, bigrams: bool = False, top_n: int = TOP_N) -> dict:
+    """
+    Adds the top terms to a wordcloud visualization, the UI uses these
+    as long as no rows are removed from the table (it needs rowCount to tell)
+
+    Visualizations using "extract" are returned as is and computed in the browser
+    """
+    if visualization.get("type") != "wordcloud" or visualization.get("extract") is not None:
+        return visualization
+
+    value_column = visualization.get("valueColumn")
+    top_terms = term_frequencies(
+        df[visualization["textColumn"]],
+        df[value_column] if value_column is not None else None,
+        tokenize=bool(visualization.get("tokenize")),
+        bigrams=bigrams,
+        top_n=top_n,
+    )
+    return {**visualization, "topTerms": top_terms, "rowCount": len(df)}
@@ -2,9 +2,11 @@
 Contains functions to deal with zipfiles
 """
 
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Iterator
 import logging
+import os
 import zipfile
 import json
 import csv
@@ -16,6 +18,10 @@ from port.my_exceptions import FileNotFoundInZipError
 
 logger = logging.getLogger(__name__)
 
+# Encoding of csv files: UTF-8, with or without a byte order mark
+CSV_ENCODING = "utf-8-sig"
+
+
 def extract_file_from_zip(zfile: str, file_to_extract: str) -> io.BytesIO:
     """
     Extracts a specific file from a zipfile buffer
@@ -126,17 +132,140 @@ def read_json_from_file(json_file: str) -> dict[Any, Any] | list[Any]:
     return out
 
 
-def read_csv_from_file(csv_file_path: str) -> list[dict[Any, Any]]:
+@dataclass
+class Predicate:
+    """
+    Simple row filter that is applied while a csv is being parsed
+
+    op is one of:
+    "==", "!=": cell equals / does not equal value
+    "in", "not in": cell is / is not one of the values in value
+    "between": value is a (low, high) tuple, bounds are inclusive, None is unbounded
+
+    If parse is given, the cell is parsed with it before comparing
+    (for example to compare dates). Rows where parse fails are dropped.
+    """
+    column: str
+    op: str
+    value: Any
+    parse: Callable[[str], Any] | None = None
+
+    def __post_init__(self) -> None:
+        if self.op not in ("==", "!=", "in", "not in", "between"):
+            raise ValueError(f"Unknown predicate operator: {self.op}")
+        if self.op in ("in", "not in"):
+            self.value = set(self.value)
+
+    def matches(self, cell: Any) -> bool:
+        if self.parse is not None:
+            try:
+                cell = self.parse(cell)
+            except Exception:
+                return False
+
+        if self.op == "==":
+            return cell == self.value
+        if self.op == "!=":
+            return cell != self.value
+        if self.op == "in":
+            return cell in self.value
+        if self.op == "not in":
+            return cell not in self.value
+
+        low, high = self.value
+        if cell is None:
+            return False
+        return (low is None or low <= cell) and (high is None or cell <= high)
+
+
+def csv_column_names(header: list[str]) -> list[str]:
+    """
+    The column names in the header row of a csv, without surrounding whitespace
+    port.registry recognizes files by these names, so they must match what the readers use
+    """
+    return [name.strip() for name in header]
+
+
+def _iter_csv_columns(
+    stream: io.TextIOBase,
+    columns: list[str] | None = None,
+    predicates: list[Predicate] | None = None,
+    chunk_rows: int | None = None,
+) -> Iterator[dict[str, list[Any]]]:
+    """
+    Parses a csv stream into dicts of columns of at most chunk_rows rows each
+    (default: one dict with all rows)
+
+    Only the cells of columns (default: all columns) are kept,
+    rows not matching all predicates are skipped before any cell is stored.
+    Missing cells are None, just like csv.DictReader
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    header = csv_column_names(header)
+    index = {name: i for i, name in enumerate(header)}
+    columns = header if columns is None else columns
+    for name in columns + [p.column for p in predicates or []]:
+        if name not in index:
+            raise KeyError(f"Column not found in csv: {name}")
+
+    positions = [index[name] for name in columns]
+    checks = [(index[p.column], p) for p in predicates or []]
+
+    selected: list[list[Any]] = [[] for _ in positions]
+    n_rows = 0
+    for row in reader:
+        if not row:
+            continue
+        n = len(row)
+        if not all(p.matches(row[i] if i < n else None) for i, p in checks):
+            continue
+        for i, values in zip(positions, selected):
+            values.append(row[i] if i < n else None)
+        n_rows += 1
+
+        if chunk_rows is not None and n_rows == chunk_rows:
+            yield dict(zip(columns, selected))
+            selected = [[] for _ in positions]
+            n_rows = 0
+
+    if n_rows > 0 or chunk_rows is None:
+        yield dict(zip(columns, selected))
+
+
+def _read_csv_columns(
+    stream: io.TextIOBase,
+    columns: list[str] | None = None,
+    predicates: list[Predicate] | None = None,
+) -> dict[str, list[Any]]:
+    """
+    Parses a csv stream into a dict of columns, see _iter_csv_columns
+    """
+    return next(_iter_csv_columns(stream, columns, predicates), {})
+
+
+def _columns_to_rows(data: dict[str, list[Any]]) -> list[dict[Any, Any]]:
+    columns = list(data.keys())
+    return [dict(zip(columns, values)) for values in zip(*data.values())]
+
+
+def read_csv_from_file(
+    csv_file_path: str,
+    columns: list[str] | None = None,
+    predicates: list[Predicate] | None = None,
+) -> list[dict[Any, Any]]:
     """
     Reads csv from a file path.
+    Optionally keeps only columns and rows matching predicates
     """
     out: list[dict[Any, Any]] = []
 
     try:
-        with open(csv_file_path, 'r', encoding="utf8") as csv_file:
-            reader = csv.DictReader(csv_file)
-            for row in reader:
-                out.append(row)
+        with open(csv_file_path, 'r', encoding=CSV_ENCODING, newline="") as csv_file:
+            out = _columns_to_rows(_read_csv_columns(csv_file, columns, predicates))
             logger.debug("successfully read csv file: %s", csv_file_path)
 
     except Exception as e:
@@ -145,21 +274,24 @@ def read_csv_from_file(csv_file_path: str) -> list[dict[Any, Any]]:
     return out
 
 
-def read_csv_from_bytes(csv_bytes: io.BytesIO) -> list[dict[Any, Any]]:
+def read_csv_from_bytes(
+    csv_bytes: io.BytesIO,
+    columns: list[str] | None = None,
+    predicates: list[Predicate] | None = None,
+) -> list[dict[Any, Any]]:
     """
     Reads csv from io.Bytes()
     Expects input from extract_file_from_zip
+    Optionally keeps only columns and rows matching predicates
     """
     out: list[dict[Any, Any]] = []
 
     b = csv_bytes.read()
 
     try:
-        stream = io.TextIOWrapper(io.BytesIO(b), encoding="utf8")
-        reader = csv.DictReader(stream)
-        for row in reader:
-            out.append(row)
-        logger.debug("succesfully converted csv bytes with encoding utf8")
+        stream = io.TextIOWrapper(io.BytesIO(b), encoding=CSV_ENCODING, newline="")
+        out = _columns_to_rows(_read_csv_columns(stream, columns, predicates))
+        logger.debug("succesfully converted csv bytes with encoding %s", CSV_ENCODING)
 
     except Exception as e:
         logger.error("%s, could not convert csv bytes", e)
@@ -168,18 +300,141 @@ def read_csv_from_bytes(csv_bytes: io.BytesIO) -> list[dict[Any, Any]]:
         return out
 
 
-def read_csv_from_bytes_to_df(csv_bytes: io.BytesIO) -> pd.DataFrame:
+def read_csv_from_bytes_to_df(
+    csv_bytes: io.BytesIO,
+    columns: list[str] | None = None,
+    predicates: list[Predicate] | None = None,
+) -> pd.DataFrame:
     """
     csv to pd.DataFrame
     expects io.BytesIO as input (from extract_file_from_zip)
+    Only columns and rows matching predicates are parsed into the DataFrame
     """
-    return pd.DataFrame(read_csv_from_bytes(csv_bytes))
+    out = pd.DataFrame()
+    b = csv_bytes.read()
+
+    try:
+        stream = io.TextIOWrapper(io.BytesIO(b), encoding=CSV_ENCODING, newline="")
+        out = pd.DataFrame(_read_csv_columns(stream, columns, predicates))
+        logger.debug("succesfully converted csv bytes with encoding %s", CSV_ENCODING)
 
+    except Exception as e:
+        logger.error("%s, could not convert csv bytes", e)
 
-def read_csv_from_file_to_df(filename: str) -> pd.DataFrame:
+    return out
+
+
+def read_csv_from_file_to_df(
+    filename: str,
+    columns: list[str] | None = None,
+    predicates: list[Predicate] | None = None,
+) -> pd.DataFrame:
     """
     csv to pd.DataFrame
-    expects io.BytesIO as input (from extract_file_from_zip)
+    expects a path to a csv file as input
+    Only columns and rows matching predicates are parsed into the DataFrame
     """
-    return pd.DataFrame(read_csv_from_file(filename))
+    out = pd.DataFrame()
+
+    try:
+        with open(filename, 'r', encoding=CSV_ENCODING, newline="") as csv_file:
+            out = pd.DataFrame(_read_csv_columns(csv_file, columns, predicates))
+            logger.debug("successfully read csv file: %s", filename)
+
+    except Exception as e:
+        logger.error("%s, could not read csv file: %s", e, filename)
+
+    return out
+
+
+def iter_csv_from_file_to_df(
+    filename: str,
+    columns: list[str] | None = None,
+    predicates: list[Predicate] | None = None,
+    chunk_rows: int = 10_000,
+) -> Iterator[tuple[pd.DataFrame, int]]:
+    """
+    csv to pd.DataFrames of at most chunk_rows rows
+    expects a path to a csv file as input
+    Only one chunk of the csv is held in memory at a time
+
+    Yields (chunk, number of bytes of the file read so far)
+    Yields nothing in case of failure
+    """
+    try:
+        with open(filename, 'r', encoding=CSV_ENCODING, newline="") as csv_file:
+            for chunk in _iter_csv_columns(csv_file, columns, predicates, chunk_rows):
+                yield pd.DataFrame(chunk), csv_file.buffer.tell()
+            logger.debug("successfully read csv file: %s", filename)
+
+    except Exception as e:
+        logger.error("%s, could not read csv file: %s", e, filename)
+
+
+def _sample_lines(
+    csv_file: io.BufferedIOBase, size: int, blocks: int, block_size: int
+) -> tuple[bytes, list[bytes], bool]:
+    """
+    Returns the header line, the complete lines in blocks of block_size bytes spread evenly over the file
+    and whether these are all lines: a file smaller than blocks * block_size is read completely
+    """
+    header = csv_file.readline()
+    body_start = len(header)
+    if size - body_start <= blocks * block_size:
+        return header, csv_file.read().splitlines(), True
+
+    lines: list[bytes] = []
+    step = (size - body_start) // blocks
+    for i in range(blocks):
+        position = body_start + i * step
+        csv_file.seek(position)
+        block = csv_file.read(block_size)
+        block_lines = block.split(b"\n")[:-1]  # the last line is cut off by the end of the block
+        if position > body_start:
+            block_lines = block_lines[1:]  # and the first line by the start
+        lines.extend(block_lines)
+
+    return header, lines, False
+
+
+def sample_csv_from_file_to_df(
+    filename: str,
+    columns: list[str] | None = None,
+    predicates: list[Predicate] | None = None,
+    blocks: int = 64,
+    block_size: int = 16 * 1024,
+) -> tuple[pd.DataFrame, int]:
+    """
+    Reads a sample of a csv file without reading the whole file
+    Returns the sampled rows matching predicates and the estimated number of matching rows in the file
+
+    At most blocks * block_size bytes are read, whatever the size of the file.
+    Assumes every row is on one line (no line breaks within quoted cells)
+    """
+    out = pd.DataFrame()
+    estimated_rows = 0
+
+    try:
+        size = os.path.getsize(filename)
+        with open(filename, "rb") as csv_file:
+            header, lines, complete = _sample_lines(csv_file, size, blocks, block_size)
+
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return out, estimated_rows
+
+        text = b"\n".join([header.rstrip(b"\r\n")] + lines).decode(CSV_ENCODING, errors="replace")
+        out = pd.DataFrame(_read_csv_columns(io.StringIO(text, newline=""), columns, predicates))
+
+        if complete:
+            estimated_rows = len(out)
+        else:
+            bytes_per_line = sum(len(line) + 1 for line in lines) / len(lines)
+            estimated_lines = (size - len(header)) / bytes_per_line
+            estimated_rows = round(estimated_lines * len(out) / len(lines))
+        logger.debug("sampled %s of about %s rows from csv file: %s", len(out), estimated_rows, filename)
+
+    except Exception as e:
+        logger.error("%s, could not sample csv file: %s", e, filename)
 
+    return out, estimated_rows
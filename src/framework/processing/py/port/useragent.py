@@ -0,0 +1,100 @@
+"""
+Derives operating system, client type and client version from user agent strings
+
+Access logs contain the same handful of user agents over and over.
+Parsing is therefore done once per distinct user agent (and cached),
+the results are mapped back onto the rows using the codes from pd.factorize.
+"""
+from functools import lru_cache
+import logging
+import re
+
+import pandas as pd
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = "Unknown"
+
+DESKTOP_APP = "Desktop app"
+MOBILE_APP = "Mobile app"
+BROWSER = "Browser"
+OTHER = "Other"
+
+# (pattern, operating system), first match wins
+OS_PATTERNS = [
+    (re.compile(r"iPhone|iPad|iPod|\biOS\b"), "iOS"),
+    (re.compile(r"Android"), "Android"),
+    (re.compile(r"Windows"), "Windows"),
+    (re.compile(r"CrOS"), "ChromeOS"),
+    (re.compile(r"Macintosh|Mac OS X|macOS|Darwin"), "macOS"),
+    (re.compile(r"Linux|X11"), "Linux"),
+]
+
+# (pattern with the version as first group, client type), first match wins
+CLIENT_PATTERNS = [
+    (re.compile(r"Slack_SSB/([\d.]+)"), DESKTOP_APP),
+    (re.compile(r"\bSlack/([\d.]+).*Electron"), DESKTOP_APP),
+    (re.compile(r"com\.tinyspeck\.chatlyio/([\d.]+)"), MOBILE_APP),
+    (re.compile(r"com\.Slack/([\d.]+)"), MOBILE_APP),
+    (re.compile(r"\bEdg(?:e|A|iOS)?/([\d.]+)"), BROWSER),
+    (re.compile(r"\bOPR/([\d.]+)"), BROWSER),
+    (re.compile(r"\bFirefox/([\d.]+)"), BROWSER),
+    (re.compile(r"\bFxiOS/([\d.]+)"), BROWSER),
+    (re.compile(r"\bCriOS/([\d.]+)"), BROWSER),
+    (re.compile(r"\bChrome/([\d.]+)"), BROWSER),
+    (re.compile(r"\bVersion/([\d.]+).*Safari"), BROWSER),
+]
+
+
+def _short_version(version: str, parts: int = 2) -> str:
+    return ".".join(version.split(".")[:parts])
+
+
+@lru_cache(maxsize=1024)
+def parse_user_agent(user_agent: str) -> tuple[str, str, str]:
+    """
+    Returns (operating system, client type, client version) for a full user agent string
+    Parts that cannot be determined are "Unknown"
+    """
+    operating_system = UNKNOWN
+    for pattern, name in OS_PATTERNS:
+        if pattern.search(user_agent):
+            operating_system = name
+            break
+
+    client_type, version = OTHER, UNKNOWN
+    for pattern, name in CLIENT_PATTERNS:
+        match = pattern.search(user_agent)
+        if match:
+            client_type, version = name, _short_version(match.group(1))
+            break
+    else:
+        if user_agent.startswith("Mozilla/"):
+            client_type = BROWSER
+
+    return operating_system, client_type, version
+
+
+def classify_user_agents(
+    user_agents: pd.Series,
+    columns: tuple[str, str, str] = ("Operating system", "Client type", "Client version"),
+) -> pd.DataFrame:
+    """
+    Classifies a column of user agents, returns a DataFrame with three columns
+    and the same index as user_agents
+
+    Only the distinct values are parsed, the cost is proportional
+    to the number of distinct user agents, not to the number of rows
+    """
+    codes, uniques = pd.factorize(user_agents)
+    logger.info("Classifying %s distinct user agents", len(uniques))
+
+    parsed = np.array(
+        [parse_user_agent(str(user_agent)) for user_agent in uniques] + [(UNKNOWN, UNKNOWN, UNKNOWN)],
+        dtype=object,
+    ).reshape(-1, 3)
+
+    # code -1 (missing user agent) picks the last, all unknown, row
+    out = parsed[codes]
+    return pd.DataFrame(out, columns=list(columns), index=user_agents.index)
@@ -2,6 +2,7 @@
 Contains classes to deal with input validation of DDPs
 """
 from dataclasses import dataclass, field
+from typing import Sequence
 from enum import Enum
 
 import logging
@@ -23,10 +24,11 @@ class DDPFiletype(Enum):
     TXT = 4
 
 
-@dataclass
+@dataclass(frozen=True)
 class DDPCategory:
     """
     Characteristics that characterize a DDP
+    Frozen, categories are shared by all sessions
     """
     id: str | None = None
     ddp_filetype: DDPFiletype | None = None
@@ -34,10 +36,11 @@ class DDPCategory:
     known_files: list[str] | None = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class StatusCode:
     """
     Can be used to set a DDP status
+    Frozen, status codes are shared by all sessions
     """
     id: int
     description: str
@@ -50,8 +53,8 @@ class ValidateInput:
     Class containing the results of input validation
     """
 
-    status_codes: list[StatusCode]
-    ddp_categories: list[DDPCategory]
+    status_codes: Sequence[StatusCode]
+    ddp_categories: Sequence[DDPCategory]
     status_code: StatusCode | None = None
     ddp_category: DDPCategory | None = None
 
@@ -0,0 +1,121 @@
+import os
+import pickle
+import time
+
+import pandas as pd
+import pytest
+
+import port.api.props as props
+import port.checkpoint as checkpoint
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(checkpoint.CHECKPOINT_DIR_VARIABLE, str(tmp_path))
+    return tmp_path
+
+
+def make_tables():
+    table = props.PropsUIPromptConsentFormTable(
+        "slack",
+        props.Translatable({"en": "Logins", "nl": "Logins"}),
+        pd.DataFrame({"device": ["mac", "ios"], "hours": [1.5, 2.0]}),
+        props.Translatable({"en": "description", "nl": "beschrijving"}),
+        [{"type": "bar"}],
+        search_index=True,
+    )
+    summary = props.PropsUIPromptConsentFormTable(
+        "summary", props.Translatable({"en": "Summary", "nl": "Samenvatting"}), pd.DataFrame({"rows": [2]})
+    )
+    return [table], [summary]
+
+
+def snapshot_paths(checkpoint_dir):
+    return sorted(checkpoint_dir.glob("*/*.pickle"))
+
+
+def test_save_and_load():
+    assert checkpoint.save("1", "Slack", "abc", make_tables())
+
+    tables, meta_tables = checkpoint.load("1", "Slack", "abc")
+    [table], [summary] = make_tables()
+    assert tables[0].id == table.id
+    assert tables[0].title.translations == table.title.translations
+    assert tables[0].description.translations == table.description.translations
+    assert tables[0].visualizations == table.visualizations and tables[0].search_index
+    pd.testing.assert_frame_equal(tables[0].data_frame, table.data_frame)
+    pd.testing.assert_frame_equal(meta_tables[0].data_frame, summary.data_frame)
+
+    # without a fingerprint the most recent snapshot of the platform
+    assert checkpoint.load("1", "Slack") is not None
+
+
+def test_load_needs_same_session_platform_and_fingerprint():
+    checkpoint.save("1", "Slack", "abc", make_tables())
+
+    assert checkpoint.load("1", "Slack", "def") is None
+    assert checkpoint.load("2", "Slack", "abc") is None
+    assert checkpoint.load("1", "Other", "abc") is None
+
+
+def test_fingerprint_follows_file_contents(tmp_path):
+    a = tmp_path / "a.csv"
+    b = tmp_path / "b.csv"
+    a.write_text("x\n1\n")
+    b.write_text("x\n1\n")
+    assert checkpoint.fingerprint([str(a)]) == checkpoint.fingerprint([str(b)])
+
+    b.write_text("x\n2\n")
+    assert checkpoint.fingerprint([str(a)]) != checkpoint.fingerprint([str(b)])
+    assert checkpoint.fingerprint([str(a), str(b)]) != checkpoint.fingerprint([str(b), str(a)])
+
+
+def test_snapshots_of_another_version_or_unreadable_are_discarded(checkpoint_dir):
+    checkpoint.save("1", "Slack", "abc", make_tables())
+    checkpoint.save("1", "Slack", "def", make_tables())
+    old, broken = snapshot_paths(checkpoint_dir)
+
+    with open(old, "rb") as f:
+        snapshot = pickle.load(f)
+    with open(old, "wb") as f:
+        pickle.dump({**snapshot, "version": "1"}, f)
+    broken.write_bytes(b"not a pickle")
+
+    assert checkpoint.load("1", "Slack", "abc") is None
+    assert checkpoint.load("1", "Slack", "def") is None
+    assert snapshot_paths(checkpoint_dir) == []
+
+
+def test_expire_removes_old_snapshots_and_empty_sessions(checkpoint_dir):
+    checkpoint.save("1", "Slack", "abc", make_tables())
+    checkpoint.save("2", "Slack", "abc", make_tables())
+    [old, recent] = snapshot_paths(checkpoint_dir)
+    an_hour_ago = time.time() - 3600
+    os.utime(old, (an_hour_ago, an_hour_ago))
+
+    assert checkpoint.expire(max_age=60) == 1
+    assert snapshot_paths(checkpoint_dir) == [recent]
+    assert not old.parent.exists()
+
+    # load skips (and removes) snapshots older than MAX_AGE
+    assert checkpoint.load("2", "Slack", "abc") is not None
+    too_old = time.time() - checkpoint.MAX_AGE - 60
+    os.utime(recent, (too_old, too_old))
+    assert checkpoint.load("2", "Slack", "abc") is None
+    assert snapshot_paths(checkpoint_dir) == []
+
+
+def test_remove():
+    checkpoint.save("1", "Slack", "abc", make_tables())
+    checkpoint.remove("1", "Slack")
+    assert checkpoint.load("1", "Slack") is None
+
+
+def test_checkpointing_off(monkeypatch):
+    monkeypatch.delenv(checkpoint.CHECKPOINT_DIR_VARIABLE)
+    monkeypatch.setattr(checkpoint, "PYODIDE_CHECKPOINT_DIR", "/does/not/exist")
+
+    assert not checkpoint.enabled()
+    assert not checkpoint.save("1", "Slack", "abc", make_tables())
+    assert checkpoint.load("1", "Slack") is None
+    assert checkpoint.expire() == 0
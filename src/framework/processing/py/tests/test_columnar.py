@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import port.slack as slack
+from port.api.columnar import decode_table, encode_table, table_texts
+from port.consent import json_to_rows, table_to_rows
+
+FIXTURE = Path(__file__).parent / "fixtures" / "access_logs.csv"
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "hours": [0.5, np.nan, 1 / 3, -2.25, np.inf],
+        "count": [1, 2, 3, 4, 5],
+        "big": [1, 2, 3, 4, 2 ** 40],
+        "sessions": pd.array([1, None, 3, 4, None], dtype="Int64"),
+        "active": [True, False, True, True, False],
+        "seen": pd.array([True, None, False, True, None], dtype="boolean"),
+        "date": pd.to_datetime(["2021-03-01 09:00", None, "2021-03-03 10:30:15", "1969-12-31", "2021-03-05"]),
+        "client": ["Slack Desktop (Mac)", None, "naïve 😀", "", "Firefox"],
+    })
+
+
+def test_every_dtype_has_its_own_buffer(df):
+    table = encode_table(df)
+
+    assert table["__type__"] == "ColumnarTable" and table["rowCount"] == 5
+    assert [(column["name"], column["type"]) for column in table["columns"]] == [
+        ("hours", "float64"),
+        ("count", "int32"),
+        ("big", "float64"),  # does not fit in int32
+        ("sessions", "int32"),
+        ("active", "bool"),
+        ("seen", "bool"),
+        ("date", "datetime"),
+        ("client", "string"),
+    ]
+    validity = {column["name"]: column.get("validity") for column in table["columns"]}
+    assert validity["count"] is None and validity["active"] is None
+    assert np.frombuffer(validity["sessions"], dtype=np.uint8).tolist() == [1, 0, 1, 1, 0]
+
+
+def test_round_trip(df):
+    out = decode_table(encode_table(df))
+
+    np.testing.assert_array_equal(out["hours"], [0.5, np.nan, 0.3333333333, -2.25, np.nan])
+    assert out["count"].tolist() == df["count"].tolist()
+    assert out["big"].tolist() == df["big"].astype(float).tolist()
+    assert out["sessions"].tolist() == [1, pd.NA, 3, 4, pd.NA]
+    assert out["active"].tolist() == df["active"].tolist()
+    assert out["seen"].tolist() == [True, pd.NA, False, True, pd.NA]
+    pd.testing.assert_series_equal(out["date"], df["date"])
+    assert out["client"].tolist() == df["client"].tolist()
+
+
+def test_floats_keep_the_decimals_of_to_json():
+    table = encode_table(pd.DataFrame({"hours": [9.716666666666667, 2.5e-5, 1e-12]}))
+
+    assert decode_table(table)["hours"].tolist() == [9.7166666667, 2.5e-5, 0.0]
+    assert table_texts(table) == {"hours": ["9.7166666667", "0.000025", "0"]}
+
+
+def test_cell_texts_are_the_texts_of_the_json_table(df):
+    texts = table_texts(encode_table(df))
+
+    assert texts["hours"] == ["0.5", "null", "0.3333333333", "-2.25", "null"]
+    assert texts["sessions"] == ["1", "null", "3", "4", "null"]
+    assert texts["seen"] == ["true", "null", "false", "true", "null"]
+    assert texts["date"] == ["1614589200000", "null", "1614767415000", "-86400000", "1614902400000"]
+    assert texts["client"] == ["Slack Desktop (Mac)", "null", "naïve 😀", "", "Firefox"]
+
+    # to_json writes infinity as null too
+    assert table_to_rows(df, columnar=True) == json_to_rows(df.to_json())
+
+
+def test_empty_tables():
+    no_rows = pd.DataFrame({"hours": pd.Series([], dtype=float), "client": pd.Series([], dtype=object)})
+    table = encode_table(no_rows)
+
+    assert table["rowCount"] == 0
+    assert [len(column["data"]) for column in table["columns"]] == [0, 0]
+    assert table_texts(table) == {"hours": [], "client": []}
+    assert decode_table(table).columns.tolist() == ["hours", "client"]
+    assert table_to_rows(no_rows, columnar=True) == []
+
+    assert encode_table(pd.DataFrame()) == {"__type__": "ColumnarTable", "rowCount": 0, "columns": []}
+    assert decode_table(encode_table(pd.DataFrame())).empty
+
+
+def test_slack_table_is_donated_the_same_in_both_formats():
+    df = slack.slack_logins_to_df(str(FIXTURE))
+
+    assert table_to_rows(df, columnar=True) == table_to_rows(df)
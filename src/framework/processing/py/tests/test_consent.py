@@ -0,0 +1,167 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import port.api.props as props
+from port.consent import (
+    deleted_rows,
+    donation_json,
+    js_key_order,
+    keep_mask,
+    parse_delta,
+    to_ranges,
+)
+from port.helpers import js_string
+
+
+def table(table_id, df):
+    return props.PropsUIPromptConsentFormTable(table_id, props.Translatable({"en": table_id, "nl": table_id}), df)
+
+
+def consent_form_donation(tables, meta_tables, deleted_ids):
+    """
+    The donation as consent_form.tsx serialized it before PayloadConsentDelta:
+    the UI parsed DataFrame.to_json() of every table, dropped the rows the
+    participant deleted and serialized the rest with serializeConsentData
+    """
+    def rows(t, deleted):
+        data_frame = json.loads(t.toDict()["data_frame"])
+        head = js_key_order(list(data_frame.keys()))  # Object.keys of the parsed JSON
+        row_count = len(data_frame[head[0]]) if head else 0
+        return [
+            dict(zip(head, [js_string(data_frame[column][str(row)]) for column in head]))
+            for row in range(row_count) if row not in deleted
+        ]
+
+    out = []
+    omissions = []
+    for t in tables:
+        deleted = {row for row in deleted_ids.get(t.id, ()) if 0 <= row < len(t.data_frame)}
+        out.append({t.id: rows(t, deleted)})
+        if deleted:
+            omissions.append(f"User deleted {len(deleted)} rows from table: {t.id}")
+    out.extend({t.id: rows(t, set())} for t in meta_tables)
+    out.append({"user_omissions": json.dumps(omissions, separators=(",", ":"), ensure_ascii=False)})
+    return json.dumps(out, separators=(",", ":"), ensure_ascii=False)
+
+
+@pytest.fixture
+def logins():
+    return table("logins", pd.DataFrame({
+        "date": pd.to_datetime(["2021-03-01 09:00", "2021-03-02 10:30", None, "2021-03-04 08:15", "2021-03-05 23:59"]),
+        "ip": ["10.0.0.1", "10.0.0.2", "10.0.0.1", None, "10.0.0.3"],
+        "user agent": ["Slack/4.0 \"Mac\"", "Slack/4.1 (iOS)", "naïve 😀", "", "Slack\n4.2"],
+        "count": [1, 2, 3, 4, 5],
+        "hours": [0.5, np.nan, 2.5e-5, 1e21, 1 / 3],
+        "active": [True, False, True, True, None],
+    }))
+
+
+@pytest.fixture
+def channels():
+    return table("channels", pd.DataFrame({"name": ["general", "random", "dev"], "members": [10, 3, 7]}))
+
+
+def test_to_ranges_merges_consecutive_row_ids():
+    assert to_ranges([]) == []
+    assert to_ranges([4, 0, 1, 2, 7, 5, 1]) == [[0, 3], [4, 6], [7, 8]]
+
+
+def test_keep_mask_clips_ranges_outside_of_the_table():
+    assert keep_mask(5, [[1, 3]]).tolist() == [True, False, False, True, True]
+    assert keep_mask(5, [[-2, 1], [4, 10], [20, 30]]).tolist() == [False, True, True, True, False]
+    assert keep_mask(0, [[0, 3]]).tolist() == []
+
+
+def test_parse_delta():
+    assert parse_delta('{"deleted": {"logins": [[0, 2], [5, 6]], "1": [[3, 4]]}}') == {
+        "logins": [[0, 2], [5, 6]],
+        "1": [[3, 4]],
+    }
+    assert parse_delta('{"deleted": {}}') == {}
+    assert parse_delta("{}") == {}
+
+
+def test_deleted_rows(logins, channels):
+    out = deleted_rows([logins, channels], {"logins": [[1, 3], [4, 9]], "channels": []})
+
+    assert list(out) == ["logins"]
+    assert out["logins"].index.tolist() == [1, 2, 4]
+    assert out["logins"]["count"].tolist() == [2, 3, 5]
+
+
+def test_donation_without_deletions_matches_consent_form(logins, channels):
+    assert donation_json([logins, channels], [], {}) == consent_form_donation([logins, channels], [], {})
+
+    donation = json.loads(donation_json([logins, channels], [], {}))
+    assert donation[1] == {"channels": [
+        {"name": "general", "members": "10"},
+        {"name": "random", "members": "3"},
+        {"name": "dev", "members": "7"},
+    ]}
+    assert donation[2] == {"user_omissions": "[]"}
+
+
+def test_donation_with_deletions_matches_consent_form(logins, channels):
+    deleted_ids = {"logins": [0, 1, 3], "channels": [2]}
+    deleted = {table_id: to_ranges(row_ids) for table_id, row_ids in deleted_ids.items()}
+    assert deleted == {"logins": [[0, 2], [3, 4]], "channels": [[2, 3]]}
+
+    expected = consent_form_donation([logins, channels], [], deleted_ids)
+    assert donation_json([logins, channels], [], deleted) == expected
+
+    donation = json.loads(expected)
+    assert [row["count"] for row in donation[0]["logins"]] == ["3", "5"]
+    assert json.loads(donation[2]["user_omissions"]) == [
+        "User deleted 3 rows from table: logins",
+        "User deleted 1 rows from table: channels",
+    ]
+
+
+def test_cells_are_serialized_like_the_browser(logins):
+    rows = json.loads(donation_json([logins], [], {}))[0]["logins"]
+
+    # to_json keeps 10 digits
+    assert [row["hours"] for row in rows] == ["0.5", "null", "0.000025", "1e+21", "0.3333333333"]
+    assert [row["active"] for row in rows] == ["true", "false", "true", "true", "null"]
+    assert [row["ip"] for row in rows][3] == "null"
+    assert rows[0]["date"] == "1614589200000"
+    assert rows[2]["date"] == "null"
+    assert rows[2]["user agent"] == "naïve 😀"
+
+
+def test_deleted_ids_outside_of_the_table_are_ignored(logins, channels):
+    deleted = {"logins": [[-3, 1], [4, 100]], "channels": [[3, 10]], "unknown": [[0, 1]]}
+
+    expected = consent_form_donation([logins, channels], [], {"logins": [0, 4], "channels": []})
+    assert donation_json([logins, channels], [], deleted) == expected
+    assert json.loads(json.loads(expected)[2]["user_omissions"]) == ["User deleted 2 rows from table: logins"]
+
+
+def test_meta_tables_are_donated_as_is(logins, channels):
+    deleted = {"logins": [[2, 3]], "channels": [[0, 3]]}
+
+    expected = consent_form_donation([logins], [channels], {"logins": [2]})
+    assert donation_json([logins], [channels], deleted) == expected
+    assert len(json.loads(expected)[1]["channels"]) == 3
+
+
+def test_empty_tables(channels):
+    empty = table("empty", pd.DataFrame({"name": pd.Series([], dtype=str)}))
+    no_columns = table("no columns", pd.DataFrame())
+    deleted = {"empty": [[0, 2]], "channels": [[0, 3]]}
+
+    expected = consent_form_donation([empty, no_columns, channels], [], {"empty": [], "channels": [0, 1, 2]})
+    assert donation_json([empty, no_columns, channels], [], deleted) == expected
+    assert json.loads(expected)[:3] == [{"empty": []}, {"no columns": []}, {"channels": []}]
+
+
+def test_integer_column_names_come_first_like_in_javascript():
+    years = table("years", pd.DataFrame({"name": ["a", "b"], "2021": [1, 2], "10": [3, 4], "01": [5, 6]}))
+
+    assert js_key_order(["name", "2021", "10", "01", "4294967295"]) == ["10", "2021", "name", "01", "4294967295"]
+    rows = json.loads(donation_json([years], [], {}))[0]["years"]
+    assert list(rows[0]) == ["10", "2021", "name", "01"]
+    assert donation_json([years], [], {}) == consent_form_donation([years], [], {})
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import port.donation as donation
+from port.my_exceptions import ChunkVerificationError
+
+DATA = json.dumps([{"row": i, "text": "some text " * 10} for i in range(2000)])
+
+
+def test_identity_is_the_default():
+    assert donation.encode(DATA) == (DATA, donation.IDENTITY)
+
+
+def test_small_donations_are_not_compressed():
+    assert donation.encode("[]", donation.GZIP_BASE64) == ("[]", donation.IDENTITY)
+
+
+@pytest.mark.parametrize("content_encoding", [donation.GZIP_BASE64, donation.DEFLATE_BASE64])
+def test_encode_decode_roundtrip(content_encoding):
+    encoded, applied = donation.encode(DATA, content_encoding, threshold=0)
+    assert applied == content_encoding
+    assert len(encoded) < len(DATA)
+    assert donation.decode(encoded, applied) == DATA
+
+
+def test_unknown_content_encoding():
+    with pytest.raises(ValueError):
+        donation.encode(DATA, "br")
+    with pytest.raises(ValueError):
+        donation.decode(DATA, "br")
+
+
+def test_decode_without_content_encoding():
+    assert donation.decode(DATA, None) == DATA
+
+
+def chunked(data, content_encoding=donation.IDENTITY, chunk_size=10_000):
+    chunks = dict(donation.iter_chunks("key", data, content_encoding, chunk_size))
+    manifest = json.loads(chunks.pop(donation.manifest_key("key")))
+    return manifest, chunks
+
+
+def test_reassemble_chunks():
+    encoded, content_encoding = donation.encode(DATA, donation.GZIP_BASE64, threshold=0)
+    manifest, chunks = chunked(encoded, content_encoding, chunk_size=1000)
+
+    assert manifest["chunk_count"] == len(chunks) > 1
+    assert list(chunks) == [donation.chunk_key("key", i) for i in range(len(chunks))]
+    assert donation.reassemble(manifest, chunks) == DATA
+
+
+def test_missing_and_corrupt_chunks():
+    manifest, chunks = chunked(DATA)
+    missing = donation.chunk_key("key", 1)
+    corrupt = donation.chunk_key("key", 2)
+    del chunks[missing]
+    chunks[corrupt] = chunks[corrupt][::-1]
+
+    assert donation.missing_chunks(manifest, chunks) == [missing, corrupt]
+    with pytest.raises(ChunkVerificationError):
+        donation.reassemble(manifest, chunks)
+
+
+def test_reassemble_needs_a_manifest():
+    with pytest.raises(ValueError):
+        donation.reassemble({"chunks": []}, {})
+
+
+def test_chunk_size_must_be_positive():
+    with pytest.raises(ValueError):
+        list(donation.iter_chunks("key", DATA, donation.IDENTITY, 0))
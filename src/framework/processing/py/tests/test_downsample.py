@@ -0,0 +1,37 @@
+import numpy as np
+
+from port.downsample import lttb, envelope
+
+
+def test_lttb_keeps_short_series():
+    x = np.arange(10, dtype=float)
+    np.testing.assert_array_equal(lttb(x, x, 10), np.arange(10))
+    np.testing.assert_array_equal(lttb(x, x, 2), np.arange(10))
+
+
+def test_lttb_selects_target_points():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    selected = lttb(x, y, 50)
+
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert (np.diff(selected) > 0).all()
+
+
+def test_lttb_keeps_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[537] = 100
+    assert 537 in lttb(x, y, 50)
+
+
+def test_envelope_has_bucket_extremes():
+    y = np.zeros(1000)
+    y[537] = 100
+    y[200] = -5
+    low, high = envelope(y, 50)
+
+    assert len(low) == len(high) == 50
+    assert high.max() == 100
+    assert low.min() == -5
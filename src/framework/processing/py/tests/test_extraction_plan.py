@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from port.extraction_plan import ExtractionSpec, Column, Derived, compile_spec
+from port.unzipddp import Predicate
+
+
+def duration(starts: pd.Series, ends: pd.Series) -> pd.Series:
+    return (ends - starts).dt.total_seconds() / 3600
+
+
+SPEC = ExtractionSpec(
+    columns=[
+        Column("start", parse="datetime", format="%Y-%m-%d %H:%M"),
+        Column("end", parse="datetime", keep=False),
+        Column("device"),
+        Column("logins", parse="int"),
+    ],
+    filters=[Predicate("device", "!=", "bot")],
+    derived=[
+        Derived(["hours"], ["start", "end"], duration),
+        Derived(["total"], ["hours"], lambda hours: pd.Series(hours.sum(), index=hours.index), table=True),
+    ],
+)
+
+
+def test_compile_spec():
+    plan = compile_spec(SPEC)
+    assert plan.columns_to_read == ["start", "end", "device", "logins"]
+    assert plan.output_columns == ["start", "device", "logins", "hours", "total"]
+    assert set(plan.parsers) == {"start", "end", "logins"}
+
+
+def test_plan_transforms_and_finishes():
+    plan = compile_spec(SPEC)
+    raw = pd.DataFrame({
+        "start": ["2021-01-01 09:00", "2021-01-02 10:00"],
+        "end": ["2021-01-01 10:30", "2021-01-02 11:00"],
+        "device": ["mac", "ios"],
+        "logins": ["3", "x"],
+    })
+
+    transformed = plan.transform(raw)
+    assert list(transformed.columns) == ["start", "device", "logins", "hours"]
+    assert transformed["hours"].tolist() == [1.5, 1.0]
+    assert transformed["logins"].isna().tolist() == [False, True]
+
+    df = plan.finish(transformed)
+    assert df["start"].tolist() == ["2021-01-01 09:00", "2021-01-02 10:00"]
+    assert df["total"].tolist() == [2.5, 2.5]
+
+
+@pytest.mark.parametrize("spec", [
+    # a column listed twice
+    ExtractionSpec(columns=[Column("a"), Column("a")]),
+    # an unknown parser
+    ExtractionSpec(columns=[Column("a", parse="date")]),
+    # a filter on a column that is not read
+    ExtractionSpec(columns=[Column("a")], filters=[Predicate("b", "==", "x")]),
+    # a derived column with an input that is not read
+    ExtractionSpec(columns=[Column("a")], derived=[Derived(["c"], ["b"], lambda b: b)]),
+    # a table derived column with an input that is not kept
+    ExtractionSpec(columns=[Column("a", keep=False)], derived=[Derived(["c"], ["a"], lambda a: a, table=True)]),
+    # a derived column that replaces a column
+    ExtractionSpec(columns=[Column("a")], derived=[Derived(["a"], ["a"], lambda a: a)]),
+])
+def test_compile_spec_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        compile_spec(spec)
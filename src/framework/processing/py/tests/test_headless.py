@@ -0,0 +1,62 @@
+import asyncio
+import json
+from pathlib import Path
+
+from port.headless import run_headless, run_headless_async
+from port.batch import run_batch
+
+FIXTURE = Path(__file__).parent / "fixtures" / "access_logs.csv"
+
+FIRST_LOGIN = {
+    "Date Accessed": "2021-01-01 09:20:00",
+    "Last Date Accessed": "2021-01-01 19:03:00",
+    "User Agent - Simple": "Slack Desktop (Mac)",
+    "Number of Logins": "8",
+    "Login duration in hours": "9.7166666667",
+    "Operating system": "macOS",
+    "Client type": "Desktop app",
+    "Client version": "4.33",
+    "Distinct login duration in hours": "9.7166666667",
+    "Concurrent sessions": "1",
+}
+
+
+def donated_tables(result) -> dict:
+    [slack] = [d for d in result.donations if d.key == "Slack"]
+    assert slack.content_encoding == "identity"
+    return {key: value for table in json.loads(slack.json_string) for key, value in table.items()}
+
+
+def test_headless_run_donates_the_slack_table():
+    result = run_headless(str(FIXTURE), "fixture")
+
+    assert result.exit_code == 0
+    assert all(d.key == "fixture-tracking" for d in result.donations if d.key != "Slack")
+
+    tables = donated_tables(result)
+    # 11 rows, 3 of them Google Calendar
+    assert len(tables["slack"]) == 8
+    assert tables["slack"][0] == FIRST_LOGIN
+    assert json.loads(tables["user_omissions"]) == []
+
+
+def test_async_run_donates_the_same():
+    result = asyncio.run(run_headless_async(str(FIXTURE), "fixture"))
+    assert result.exit_code == 0
+    assert donated_tables(result) == donated_tables(run_headless(str(FIXTURE), "fixture"))
+
+
+def test_batch_keeps_files_with_the_same_name_apart(tmp_path):
+    input_dir = tmp_path / "in"
+    for workspace in ("a", "b"):
+        (input_dir / workspace).mkdir(parents=True)
+        (input_dir / workspace / "access_logs.csv").write_bytes(FIXTURE.read_bytes())
+
+    results = run_batch(str(input_dir), str(tmp_path / "out"), pattern="**/*.csv", workers=2)
+
+    assert [r.error for r in results] == [None, None]
+    for name in ("a_access_logs", "b_access_logs"):
+        output = tmp_path / "out" / name
+        assert (output / f"{name}-tracking.json").exists()
+        slack = json.loads((output / "Slack.json").read_text())
+        assert slack[0]["slack"][0] == FIRST_LOGIN
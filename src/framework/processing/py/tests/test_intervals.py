@@ -0,0 +1,40 @@
+import numpy as np
+
+from port.intervals import distinct_durations, concurrent_sessions, union_length, peak_concurrency
+
+
+def test_distinct_durations_leave_out_overlap():
+    starts = np.array([0, 5, 20])
+    ends = np.array([10, 15, 25])
+    np.testing.assert_array_equal(distinct_durations(starts, ends), [10, 5, 5])
+    assert union_length(starts, ends) == 20
+
+
+def test_distinct_durations_of_nested_session_is_zero():
+    np.testing.assert_array_equal(distinct_durations(np.array([0, 2]), np.array([10, 4])), [10, 0])
+
+
+def test_longest_session_with_the_same_start_counts_first():
+    np.testing.assert_array_equal(distinct_durations(np.array([0, 0]), np.array([5, 10])), [0, 10])
+
+
+def test_invalid_sessions_are_nan():
+    starts = np.array([0, np.nan, 10])
+    ends = np.array([5, 3, 8])
+    out = distinct_durations(starts, ends)
+    assert out[0] == 5
+    assert np.isnan(out[1:]).all()
+    assert np.isnan(concurrent_sessions(starts, ends)[1:]).all()
+
+
+def test_concurrent_sessions_at_start():
+    starts = np.array([0, 5, 10])
+    ends = np.array([10, 15, 20])
+    # the first session ends when the third starts
+    np.testing.assert_array_equal(concurrent_sessions(starts, ends), [1, 2, 2])
+    assert peak_concurrency(starts, ends) == 2
+
+
+def test_no_sessions():
+    assert union_length(np.array([]), np.array([])) == 0
+    assert peak_concurrency(np.array([]), np.array([])) == 0
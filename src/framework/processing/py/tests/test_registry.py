@@ -0,0 +1,55 @@
+import dataclasses
+import zipfile
+
+import port.registry as registry
+import port.script as script
+from port.registry import Platform, Signature
+
+SLACK_HEADER = "Date Accessed,User Agent - Simple,User Agent - Full,IP Address,Number of Logins,Last Date Accessed\n"
+
+
+def test_sniff_recognizes_slack(tmp_path):
+    filename = tmp_path / "access_logs.csv"
+    filename.write_text(SLACK_HEADER + "Jan 01 2021,Chrome,Mozilla/5.0,10.0.0.1,1,Jan 01 2021\n")
+
+    platform = registry.sniff(str(filename))
+    assert platform is not None and platform.name == "Slack"
+
+
+def test_sniff_reads_header_with_bom(tmp_path):
+    filename = tmp_path / "access_logs.csv"
+    filename.write_bytes(b"\xef\xbb\xbf" + SLACK_HEADER.encode("utf8"))
+    assert registry.sniff(str(filename)) is not None
+
+
+def test_sniff_unknown_and_missing_files(tmp_path):
+    filename = tmp_path / "other.csv"
+    filename.write_text("Date Accessed,Something else\n")
+
+    assert registry.sniff(str(filename)) is None
+    assert registry.sniff(str(tmp_path / "missing.csv")) is None
+
+
+def test_sniff_zip_members(tmp_path):
+    filename = tmp_path / "export.zip"
+    with zipfile.ZipFile(filename, "w") as zf:
+        zf.writestr("export/messages/inbox.json", "[]")
+
+    messages = Platform("Messages", Signature(magic=registry.ZIP_MAGIC, zip_members=["*/messages/*.json"]), "", "")
+    photos = Platform("Photos", Signature(zip_members=["*/photos/*"]), "", "")
+
+    assert registry.sniff(str(filename), [photos, messages]) is messages
+    assert registry.sniff(str(filename), [photos]) is None
+
+
+def test_pages_are_titled_with_the_platform_name():
+    platform = dataclasses.replace(registry.PLATFORMS[0], name="Teams")
+    pages = [
+        script.render_file_prompt("1", platform),
+        script.render_retry_confirmation("1", platform.name),
+        script.render_preview("1", platform.name, [], 0),
+        next(script.prompt_consent("1", platform.name, [], [])),
+    ]
+
+    titles = [batch.commands[-1].page.header.title.translations["en"] for batch in pages]
+    assert titles == ["Select your Teams file", "Teams", "A preview of your Teams data", "Your Teams data"]
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from port.replay import main, record, run_load
+
+FIXTURE = Path(__file__).parent / "fixtures" / "access_logs.csv"
+
+
+@pytest.fixture
+def recording(tmp_path):
+    return record(str(FIXTURE), str(tmp_path / "recording.json"))
+
+
+def test_memory_is_traced_per_send(recording):
+    [session] = run_load(recording, trace_memory=True)
+
+    assert session.error is None
+    assert session.cycles and all(cycle.memory_delta is not None for cycle in session.cycles)
+
+
+def test_concurrent_sessions(recording):
+    results = run_load(recording, sessions=3, concurrency=2)
+
+    assert [session.error for session in results] == [None, None, None]
+    assert all(cycle.memory_delta is None for session in results for cycle in session.cycles)
+
+
+def test_memory_cannot_be_traced_with_concurrency(recording, tmp_path, capsys):
+    with pytest.raises(ValueError):
+        run_load(recording, sessions=2, concurrency=2, trace_memory=True)
+
+    with pytest.raises(SystemExit):
+        main(["run", str(tmp_path / "recording.json"), "--concurrency", "2", "--trace-memory"])
+    assert "--trace-memory needs --concurrency 1" in capsys.readouterr().err
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from port.search_index import build_search_index, decode_posting, TOKEN_SEPARATOR
+
+
+def test_low_cardinality_columns_map_values_to_rows():
+    df = pd.DataFrame({"os": ["Mac", "iOS", "Mac", None, "Mac"] * 2})
+    index = build_search_index(df)
+
+    [column] = index["columns"]
+    postings = zip(column["values"], column["postings"])
+    rows = {value: decode_posting(posting, len(df)).tolist() for value, posting in postings}
+    assert rows == {"Mac": [0, 2, 4, 5, 7, 9], "iOS": [1, 6], "null": [3, 8]}
+
+
+def test_high_cardinality_columns_are_indexed_by_token():
+    df = pd.DataFrame({
+        "date": [f"2021-01-{day:02d} 09:{minute:02d}" for day in range(1, 11) for minute in range(10)],
+        "hours": np.arange(100) / 4,
+    })
+    index = build_search_index(df)
+
+    assert index["columns"] == [] and index["scanColumns"] == []
+    date, hours = index["tokenColumns"]
+    assert hours["values"][:2] == ["0", "0.25"]  # cell texts as the consent form shows them
+
+    # every value is listed under each of its tokens, and maps back to its rows
+    value_rows = np.frombuffer(date["valueRows"], dtype=np.int32)
+    offsets = np.frombuffer(date["valueOffsets"], dtype=np.int32)
+    postings = dict(zip(date["tokens"], date["postings"]))
+    for value_id, value in enumerate(date["values"]):
+        for token in TOKEN_SEPARATOR.split(value.lower()):
+            assert value_id in decode_posting(postings[token], len(date["values"]))
+        rows = value_rows[offsets[value_id]:offsets[value_id + 1]]
+        assert (df["date"].iloc[rows] == value).all()
+
+
+def test_columns_that_cannot_be_indexed_are_scanned():
+    df = pd.DataFrame({"name": [f"naïve {i}" for i in range(10)], "count": range(10)})
+
+    index = build_search_index(df, json_cells=False)
+    assert index["scanColumns"] == [0, 1]
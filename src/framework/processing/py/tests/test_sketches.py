@@ -0,0 +1,51 @@
+import pandas as pd
+import numpy as np
+
+from port.sketches import HyperLogLog, SpaceSaving, QuantileSketch
+
+
+def test_hyperloglog_estimates_distinct_count():
+    sketch = HyperLogLog()
+    values = pd.Series([f"value {i}" for i in range(20_000)])
+    sketch.update(values[:12_000])
+    sketch.update(values[8_000:])
+    sketch.update(pd.Series([None, None]))
+    assert abs(sketch.count() - 20_000) / 20_000 < 0.05
+
+
+def test_hyperloglog_small_counts():
+    sketch = HyperLogLog()
+    sketch.update(pd.Series(["a", "b", "c", "a"]))
+    assert sketch.count() == 3
+
+
+def test_space_saving_keeps_frequent_values():
+    sketch = SpaceSaving(k=10)
+    sketch.update(pd.Series(["a"] * 500 + [f"rare {i}" for i in range(100)]))
+    sketch.update(pd.Series(["b"] * 300 + [f"other {i}" for i in range(100)]))
+
+    top = sketch.top(2)
+    assert [value for value, _ in top] == ["a", "b"]
+    # counts are overestimated, never underestimated
+    assert top[0][1] >= 500 and top[1][1] >= 300
+    assert len(sketch.top()) == 10
+
+
+def test_quantiles_within_relative_accuracy():
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    values = np.arange(1, 1001, dtype=float)
+    sketch.update(pd.Series(values[:500]))
+    sketch.update(pd.Series(values[500:]))
+
+    for q in (0.1, 0.5, 0.9):
+        expected = np.quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) / expected <= 0.02
+
+
+def test_quantiles_of_zeros_and_empty_sketch():
+    sketch = QuantileSketch()
+    assert sketch.quantile(0.5) is None
+
+    sketch.update(pd.Series([0, -1, "not a number", 0, 10]))
+    assert sketch.count == 4
+    assert sketch.quantile(0.5) == 0.0
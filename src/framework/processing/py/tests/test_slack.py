@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import port.slack as slack
+import port.registry as registry
+
+FIXTURE = Path(__file__).parent / "fixtures" / "access_logs.csv"
+
+
+@pytest.fixture
+def bom_file(tmp_path):
+    filename = tmp_path / "access_logs.csv"
+    filename.write_bytes(b"\xef\xbb\xbf" + FIXTURE.read_bytes())
+    return filename
+
+
+def test_fixture_validates_and_extracts():
+    assert slack.validate(FIXTURE).status_code.id == 0
+    df = slack.slack_logins_to_df(str(FIXTURE))
+    # 11 rows, 3 of them Google Calendar
+    assert len(df) == 8
+    assert df["Date Accessed"].iloc[0] == "2021-01-01 09:20:00"
+
+
+# budget 1 forces the chunked reader
+@pytest.mark.parametrize("budget", [None, 1])
+def test_file_with_byte_order_mark_validates_and_extracts(bom_file, budget):
+    assert registry.sniff(str(bom_file)).name == "Slack"
+    assert slack.validate(bom_file).status_code.id == 0
+
+    df = slack.slack_logins_to_df(str(bom_file), budget)
+    pd.testing.assert_frame_equal(df, slack.slack_logins_to_df(str(FIXTURE)))
+
+
+def test_sample_of_file_with_byte_order_mark(bom_file):
+    sample, estimated_rows = slack.sample_slack_logins(str(bom_file))
+    assert len(sample) == estimated_rows == 8
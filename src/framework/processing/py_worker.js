@@ -1,5 +1,9 @@
 let pyScript
 
+// By default the generator based script (port.start) is driven.
+// Set to true to opt in to the async script (port.start_async), which extracts in the background between cycles
+const useAsyncScript = false
+
 onmessage = (event) => {
   const { eventType } = event.data
   switch (eventType) {
@@ -10,7 +14,8 @@ onmessage = (event) => {
       break
 
     case 'firstRunCycle':
-      pyScript = self.pyodide.runPython(`port.start(${event.data.sessionId})`)
+      const start = useAsyncScript ? 'port.start_async' : 'port.start'
+      pyScript = self.pyodide.runPython(`${start}(${event.data.sessionId})`)
       runCycle(null)
       break
 
@@ -26,10 +31,11 @@ onmessage = (event) => {
   }
 }
 
-function runCycle(payload) {
+async function runCycle(payload) {
   console.log('[ProcessingWorker] runCycle ' + JSON.stringify(payload))
   try {
-    scriptEvent = pyScript.send(payload)
+    // send returns a Promise for the async script, await passes other values through
+    scriptEvent = await pyScript.send(payload)
     self.postMessage({
       eventType: 'runCycleDone',
       scriptEvent: scriptEvent.toJs({
@@ -37,6 +43,7 @@ function runCycle(payload) {
         dict_converter: Object.fromEntries
       })
     })
+    persistCheckpoints()
   } catch (error) {
     self.postMessage({
       eventType: 'runCycleDone',
@@ -53,6 +60,10 @@ function unwrap(response) {
         copyFileToPyFS(response.payload.value, resolve)
         break
 
+      case 'PayloadFiles':
+        copyFilesToPyFS(response.payload.value, resolve)
+        break
+
       default:
         resolve(response.payload)
     }
@@ -77,6 +88,28 @@ function copyFileToPyFS(file, resolve) {
   resolve({ __type__: 'PayloadString', value: directoryName + '/' + file.name })
 }
 
+// Every file gets its own directory, exports often share the same file name
+function copyFilesToPyFS(files, resolve) {
+  const paths = Array.from(files).map((file, i) => {
+    directoryName = `/file-input-${i}`
+    pathStats = self.pyodide.FS.analyzePath(directoryName)
+    if (!pathStats.exists) {
+      self.pyodide.FS.mkdir(directoryName)
+    } else {
+      self.pyodide.FS.unmount(directoryName)
+    }
+    self.pyodide.FS.mount(
+      self.pyodide.FS.filesystems.WORKERFS,
+      {
+        files: [file]
+      },
+      directoryName
+    )
+    return directoryName + '/' + file.name
+  })
+  resolve({ __type__: 'PayloadStringList', value: paths })
+}
+
 function initialise() {
   console.log('[ProcessingWorker] initialise')
   return startPyodide()
@@ -87,6 +120,9 @@ function initialise() {
     .then(() => {
       return installPortPackage()
     })
+    .then(() => {
+      return mountCheckpoints()
+    })
 }
 
 function startPyodide() {
@@ -112,6 +148,29 @@ function installPortPackage() {
   `);  
 }
 
+// Checkpoints of extracted tables (see port.checkpoint) are kept in IndexedDB,
+// so they survive a reload of the page
+function mountCheckpoints() {
+  console.log('[ProcessingWorker] mount checkpoints')
+  const directoryName = '/checkpoints'
+  if (!self.pyodide.FS.analyzePath(directoryName).exists) {
+    self.pyodide.FS.mkdir(directoryName)
+  }
+  self.pyodide.FS.mount(self.pyodide.FS.filesystems.IDBFS, {}, directoryName)
+  return new Promise((resolve) => {
+    self.pyodide.FS.syncfs(true, (error) => {
+      if (error) console.log('[ProcessingWorker] could not load checkpoints: ' + error)
+      resolve()
+    })
+  })
+}
+
+function persistCheckpoints() {
+  self.pyodide.FS.syncfs(false, (error) => {
+    if (error) console.log('[ProcessingWorker] could not persist checkpoints: ' + error)
+  })
+}
+
 function generateErrorMessage(stacktrace) {
   return {
     __type__: "CommandUIRender",
@@ -0,0 +1,166 @@
+import { isInstanceOf } from './helpers'
+import { PropsUITableRow } from './types/elements'
+
+// Search index as produced by port.search_index (Python)
+// Maps the distinct texts of low cardinality columns to the (positional) ids of the rows containing them,
+// and the tokens of high cardinality columns to the distinct texts containing them
+
+export interface SearchIndexPosting {
+  encoding: 'ranges' | 'bitmap'
+  data: Int32Array | Uint8Array
+}
+
+export interface SearchIndexColumn {
+  column: number
+  values: string[]
+  postings: SearchIndexPosting[]
+}
+
+export interface SearchIndexTokenColumn {
+  column: number
+  values: string[]
+  valueRows: Int32Array
+  valueOffsets: Int32Array
+  tokens: string[]
+  postings: SearchIndexPosting[]
+}
+
+export interface SearchIndex {
+  __type__: 'SearchIndex'
+  rowCount: number
+  columns: SearchIndexColumn[]
+  tokenColumns: SearchIndexTokenColumn[]
+  scanColumns: number[]
+}
+export function isSearchIndex (arg: any): arg is SearchIndex {
+  return isInstanceOf<SearchIndex>(arg, 'SearchIndex', ['rowCount', 'columns', 'tokenColumns', 'scanColumns'])
+}
+
+// Separates the tokens of a cell text, must match TOKEN_SEPARATOR in port/search_index.py
+const TOKEN_SEPARATOR = /[^0-9a-z]+/
+
+function forEachId (posting: SearchIndexPosting, callback: (id: number) => void): void {
+  const data = posting.data
+  if (posting.encoding === 'ranges') {
+    for (let i = 0; i < data.length; i += 2) {
+      for (let id = data[i]; id < data[i + 1]; id++) callback(id)
+    }
+  } else {
+    for (let byte = 0; byte < data.length; byte++) {
+      if (data[byte] === 0) continue
+      for (let bit = 0; bit < 8; bit++) {
+        if ((data[byte] & (1 << bit)) !== 0) callback(byte * 8 + bit)
+      }
+    }
+  }
+}
+
+function addPosting (posting: SearchIndexPosting, rows: PropsUITableRow[], ids: Set<string>): void {
+  forEachId(posting, (row) => ids.add(rows[row].id))
+}
+
+// Index of the first token not smaller than part
+function lowerBound (tokens: string[], part: string): number {
+  let low = 0
+  let high = tokens.length
+  while (low < high) {
+    const middle = (low + high) >> 1
+    if (tokens[middle] < part) low = middle + 1
+    else high = middle
+  }
+  return low
+}
+
+// Positions of the tokens that can contain part of the query
+// A part after a separator in the query must start a token, a part before one must end a token
+function matchingTokens (tokens: string[], part: string, starts: boolean, ends: boolean): number[] {
+  const matches: number[] = []
+  if (starts) {
+    for (let i = lowerBound(tokens, part); i < tokens.length && tokens[i].startsWith(part); i++) {
+      if (!ends || tokens[i] === part) matches.push(i)
+    }
+  } else {
+    tokens.forEach((token, i) => {
+      if (ends ? token.endsWith(part) : token.includes(part)) matches.push(i)
+    })
+  }
+  return matches
+}
+
+// Upper bound of the number of ids in a posting
+function postingSize (posting: SearchIndexPosting): number {
+  if (posting.encoding === 'bitmap') return posting.data.length * 8
+  let size = 0
+  for (let i = 0; i < posting.data.length; i += 2) size += posting.data[i + 1] - posting.data[i]
+  return size
+}
+
+// Ids of the values that can contain query, undefined if that cannot be told from the tokens
+// Only the part of the query with the fewest candidates is looked up, the regex checks the rest
+function candidateValues (column: SearchIndexTokenColumn, query: string): Set<number> | undefined {
+  // the values are ASCII, their case folding is the same in Python and here
+  for (let i = 0; i < query.length; i++) {
+    if (query.charCodeAt(i) > 0x7f) return undefined
+  }
+
+  const parts = query.toLowerCase().split(TOKEN_SEPARATOR)
+  const last = parts.length - 1
+  let best: number[] | undefined
+  let bestSize = Infinity
+  parts.forEach((part, i) => {
+    if (part === '') return
+    const tokens = matchingTokens(column.tokens, part, i > 0, i < last)
+    const size = tokens.reduce((total, token) => total + postingSize(column.postings[token]), 0)
+    if (size < bestSize) {
+      best = tokens
+      bestSize = size
+    }
+  })
+  if (best === undefined || bestSize >= column.values.length) return undefined
+
+  const candidates = new Set<number>()
+  for (const token of best) {
+    forEachId(column.postings[token], (value) => candidates.add(value))
+  }
+  return candidates
+}
+
+function addValueRows (column: SearchIndexTokenColumn, value: number, rows: PropsUITableRow[], ids: Set<string>): void {
+  for (let i = column.valueOffsets[value]; i < column.valueOffsets[value + 1]; i++) {
+    ids.add(rows[column.valueRows[i]].id)
+  }
+}
+
+// Returns the ids of the rows with a cell matching regex, the case insensitive search for query
+// rows should be the original rows of the table the index was built for
+export function searchWithIndex (index: SearchIndex, rows: PropsUITableRow[], regex: RegExp, query: string): Set<string> {
+  const ids = new Set<string>()
+
+  for (const column of index.columns) {
+    column.values.forEach((value, i) => {
+      if (regex.test(value)) addPosting(column.postings[i], rows, ids)
+    })
+  }
+
+  for (const column of index.tokenColumns) {
+    const candidates = candidateValues(column, query)
+    if (candidates === undefined) {
+      column.values.forEach((value, i) => {
+        if (regex.test(value)) addValueRows(column, i, rows, ids)
+      })
+    } else {
+      candidates.forEach((i) => {
+        if (regex.test(column.values[i])) addValueRows(column, i, rows, ids)
+      })
+    }
+  }
+
+  if (index.scanColumns.length > 0) {
+    for (const row of rows) {
+      if (ids.has(row.id)) continue
+      if (index.scanColumns.some((column) => regex.test(row.cells[column]))) ids.add(row.id)
+    }
+  }
+
+  return ids
+}
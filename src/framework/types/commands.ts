@@ -43,7 +43,9 @@ export type PayloadResolved =
   PayloadTrue |
   PayloadString |
   PayloadFile |
-  PayloadJSON
+  PayloadFiles |
+  PayloadJSON |
+  PayloadConsentDelta
 
 export interface PayloadVoid {
   __type__: 'PayloadVoid'
@@ -65,6 +67,12 @@ export interface PayloadFile {
   value: File
 }
 
+// Sent by a file input with multiple set, the worker passes the files on as a PayloadStringList
+export interface PayloadFiles {
+  __type__: 'PayloadFiles'
+  value: File[]
+}
+
 export interface PayloadJSON {
   __type__: 'PayloadJSON'
   value: string
@@ -73,12 +81,34 @@ export function isPayloadJSON (arg: any): arg is PayloadJSON {
   return isInstanceOf<PayloadJSON>(arg, 'PayloadJSON', ['value'])
 }
 
+// Row ids deleted in the consent form as half-open [start, stop) ranges per table id,
+// the script rebuilds the donation from the tables it rendered
+export interface PayloadConsentDelta {
+  __type__: 'PayloadConsentDelta'
+  value: string
+}
+export function isPayloadConsentDelta (arg: any): arg is PayloadConsentDelta {
+  return isInstanceOf<PayloadConsentDelta>(arg, 'PayloadConsentDelta', ['value'])
+}
+
 export type Command =
   CommandUI |
-  CommandSystem
+  CommandSystem |
+  CommandBatch
 
 export function isCommand (arg: any): arg is Command {
-  return isCommandUI(arg) || isCommandSystem(arg)
+  return isCommandUI(arg) || isCommandSystem(arg) || isCommandBatch(arg)
+}
+
+// Commands handled in order within one cycle, the response is the response to the last command
+export interface CommandBatch {
+  __type__: 'CommandBatch'
+  commands: Array<CommandUI | CommandSystem>
+}
+export function isCommandBatch (arg: any): arg is CommandBatch {
+  return isInstanceOf<CommandBatch>(arg, 'CommandBatch', ['commands']) &&
+    Array.isArray(arg.commands) &&
+    arg.commands.every((command: any) => isCommandUI(command) || isCommandSystem(command))
 }
 
 export type CommandSystem =
@@ -118,6 +148,7 @@ export interface CommandSystemDonate {
   __type__: 'CommandSystemDonate'
   key: string
   json_string: string
+  content_encoding?: 'identity' | 'gzip+base64' | 'deflate+base64'
 }
 export function isCommandSystemDonate (arg: any): arg is CommandSystemDonate {
   return isInstanceOf<CommandSystemDonate>(arg, 'CommandSystemDonate', ['key', 'json_string'])
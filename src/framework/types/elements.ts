@@ -2,6 +2,7 @@ import { isInstanceOf, isLike } from "../helpers"
 import {} from "./commands"
 import { isPropsUIPage, PropsUIPage } from "./pages"
 import { isPropsUIPrompt, PropsUIPrompt } from "./prompts"
+import { SearchIndex } from "../search_index"
 
 export type PropsUI =
   | PropsUIText
@@ -390,6 +391,7 @@ export interface TableContext {
   deletedRows: string[][]
   visualizations?: any[]
   folded: boolean
+  searchIndex?: SearchIndex
 }
 
 export type TableWithContext = TableContext & PropsUITable
@@ -430,6 +432,7 @@ export function isTranslatable(arg: any): arg is Translatable {
 
 export interface PropsUIFooter {
   __type__: 'PropsUIFooter'
+  progressPercentage?: number
 }
 export function isPropsUIFooter (arg: any): arg is PropsUIFooter {
   return isInstanceOf<PropsUIFooter>(arg, 'PropsUIFooter', [])
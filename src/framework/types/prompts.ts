@@ -10,13 +10,15 @@ export type PropsUIPrompt =
   | PropsUIPromptRadioInput
   | PropsUIPromptConsentForm
   | PropsUIPromptConfirm
+  | PropsUIPromptProgress
 
 export function isPropsUIPrompt(arg: any): arg is PropsUIPrompt {
   return (
     isPropsUIPromptFileInput(arg) ||
     isPropsUIPromptRadioInput(arg) ||
     isPropsUIPromptConsentForm(arg) ||
-    isPropsUIPromptQuestionnaire(arg)
+    isPropsUIPromptQuestionnaire(arg) ||
+    isPropsUIPromptProgress(arg)
   )
 }
 
@@ -30,10 +32,22 @@ export function isPropsUIPromptConfirm(arg: any): arg is PropsUIPromptConfirm {
   return isInstanceOf<PropsUIPromptConfirm>(arg, "PropsUIPromptConfirm", ["text", "ok", "cancel"])
 }
 
+// Rendering a progress prompt resolves immediately, so the script can continue
+export interface PropsUIPromptProgress {
+  __type__: "PropsUIPromptProgress"
+  description: Text
+  message: string
+  percentage?: number
+}
+export function isPropsUIPromptProgress(arg: any): arg is PropsUIPromptProgress {
+  return isInstanceOf<PropsUIPromptProgress>(arg, "PropsUIPromptProgress", ["description", "message"])
+}
+
 export interface PropsUIPromptFileInput {
   __type__: "PropsUIPromptFileInput"
   description: Text
   extensions: string
+  multiple?: boolean
 }
 export function isPropsUIPromptFileInput(arg: any): arg is PropsUIPromptFileInput {
   return isInstanceOf<PropsUIPromptFileInput>(arg, "PropsUIPromptFileInput", ["description", "extensions"])
@@ -65,9 +79,11 @@ export interface PropsUIPromptConsentFormTable {
   id: string
   title: Text
   description: Text
-  data_frame: any
+  data_frame: any // DataFrame.to_json() string or a ColumnarTable (see columnar.ts)
   visualizations: any
   folded: boolean
+  search_index?: any // SearchIndex (see search_index.ts)
+  deleted_rows?: number[][] // row ids shown as deleted, as [start, stop) ranges
 }
 export function isPropsUIPromptConsentFormTable(arg: any): arg is PropsUIPromptConsentFormTable {
   return isInstanceOf<PropsUIPromptConsentFormTable>(arg, "PropsUIPromptConsentFormTable", [
@@ -7,6 +7,7 @@ import { Title4 } from "./text"
 import TextBundle from "../../../../text_bundle"
 import { Translator } from "../../../../translator"
 import { Table } from "./table"
+import { SearchIndex, searchWithIndex } from "../../../../search_index"
 
 interface TableContainerProps {
   id: string
@@ -25,7 +26,7 @@ export const TableContainer = ({ id, table, updateTable, locale }: TableContaine
 
   useEffect(() => {
     const timer = setTimeout(() => {
-      const ids = searchRows(table.originalBody.rows, search)
+      const ids = searchRows(table.originalBody.rows, search, table.searchIndex)
       setSearchFilterIds(ids)
       if (search !== "" && lastSearch.current === "") {
         setTimeout(() => setShow(true), 10)
@@ -159,7 +160,7 @@ function deleteTableRows(table: TableWithContext, deletedRows: string[][]): Tabl
   }
 }
 
-function searchRows(rows: PropsUITableRow[], search: string): Set<string> | undefined {
+function searchRows(rows: PropsUITableRow[], search: string, index?: SearchIndex): Set<string> | undefined {
   if (search.trim() === "") return undefined
 
   // Not sure whether it's better to look for one of the words or exact string.
@@ -170,7 +171,16 @@ function searchRows(rows: PropsUITableRow[], search: string): Set<string> | unde
 
   const regexes: RegExp[] = []
   for (const q of query) {
-    regexes.push(new RegExp(q.replace(/[-/\\^$*+?.()|[\]{}]/, "\\$&"), "i"))
+    regexes.push(new RegExp(q.replace(/[-/\\^$*+?.()|[\]{}]/g, "\\$&"), "i"))
+  }
+
+  // With a search index only the distinct (candidate) values of indexed columns are tested
+  if (index !== undefined && index.rowCount === rows.length) {
+    const ids = new Set<string>()
+    query.forEach((q, i) => {
+      searchWithIndex(index, rows, regexes[i], q).forEach((id) => ids.add(id))
+    })
+    return ids
   }
 
   const ids = new Set<string>()
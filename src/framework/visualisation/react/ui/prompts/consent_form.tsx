@@ -1,4 +1,4 @@
-import { assert, Weak } from "../../../../helpers"
+import { Weak } from "../../../../helpers"
 import {
   PropsUITable,
   PropsUITableBody,
@@ -13,6 +13,8 @@ import { BodyLarge } from "../elements/text"
 import TextBundle from "../../../../text_bundle"
 import { Translator } from "../../../../translator"
 import { ReactFactoryContext } from "../../factory"
+import { columnTexts, isColumnarTable, ColumnarTable } from "../../../../columnar"
+import { isSearchIndex } from "../../../../search_index"
 import { useCallback, useEffect, useState } from "react"
 import _ from "lodash"
 
@@ -25,14 +27,12 @@ type Props = Weak<PropsUIPromptConsentForm> & ReactFactoryContext
 export const ConsentForm = (props: Props): JSX.Element => {
   useUnloadWarning()
   const [tables, setTables] = useState<TableWithContext[]>(() => parseTables(props.tables))
-  const [metaTables, setMetaTables] = useState<TableWithContext[]>(() => parseTables(props.metaTables))
   const { locale, resolve } = props
   const { description, donateQuestion, donateButton, cancelButton } = prepareCopy(props)
   const [isDonating, setIsDonating] = useState(false)
 
   useEffect(() => {
     setTables(parseTables(props.tables))
-    setMetaTables(parseTables(props.metaTables))
   }, [props.tables])
 
   const updateTable = useCallback((tableId: string, table: TableWithContext) => {
@@ -79,6 +79,15 @@ export const ConsentForm = (props: Props): JSX.Element => {
     return result
   }
 
+  function columnarRows(table: ColumnarTable): PropsUITableRow[] {
+    const texts = table.columns.map((column) => columnTexts(column, table.rowCount))
+    const result: PropsUITableRow[] = []
+    for (let row = 0; row < table.rowCount; row++) {
+      result.push({ id: `${row}`, cells: texts.map((column) => column[row]) })
+    }
+    return result
+  }
+
   function parseTables(tablesData: PropsUIPromptConsentFormTable[]): Array<PropsUITable & TableContext> {
     return tablesData.map((table) => parseTable(table))
   }
@@ -88,17 +97,31 @@ export const ConsentForm = (props: Props): JSX.Element => {
     const title = Translator.translate(tableData.title, props.locale)
     const description =
       tableData.description !== undefined ? Translator.translate(tableData.description, props.locale) : ""
-    const deletedRowCount = 0
-    const dataFrame = JSON.parse(tableData.data_frame)
-    const headCells = columnNames(dataFrame).map((column: string) => column)
+    let headCells: string[]
+    let bodyRows: PropsUITableRow[]
+    if (isColumnarTable(tableData.data_frame)) {
+      headCells = tableData.data_frame.columns.map((column) => column.name)
+      bodyRows = columnarRows(tableData.data_frame)
+    } else {
+      const dataFrame = JSON.parse(tableData.data_frame)
+      headCells = columnNames(dataFrame).map((column: string) => column)
+      bodyRows = rows(dataFrame)
+    }
     const head: PropsUITableHead = {
       __type__: "PropsUITableHead",
       cells: headCells,
     }
+    const originalBody: PropsUITableBody = {
+      __type__: "PropsUITableBody",
+      rows: bodyRows,
+    }
+    // Rows the script marks as deleted (for example in a preview) start out deleted, the participant can undo this
+    const deletedIds = new Set(fromRanges(tableData.deleted_rows ?? []))
     const body: PropsUITableBody = {
       __type__: "PropsUITableBody",
-      rows: rows(dataFrame),
+      rows: bodyRows.filter((row) => !deletedIds.has(row.id)),
     }
+    const deletedRowCount = originalBody.rows.length - body.rows.length
     return {
       __type__: "PropsUITable",
       id,
@@ -108,62 +131,51 @@ export const ConsentForm = (props: Props): JSX.Element => {
       description,
       deletedRowCount,
       annotations: [],
-      originalBody: body,
-      deletedRows: [],
+      originalBody,
+      deletedRows: deletedRowCount > 0 ? [Array.from(deletedIds)] : [],
       visualizations: tableData.visualizations,
       folded: tableData.folded || false,
+      searchIndex: isSearchIndex(tableData.search_index) ? tableData.search_index : undefined,
     }
   }
 
   function handleDonate(): void {
     setIsDonating(true)
-    const value = serializeConsentData()
-    resolve?.({ __type__: "PayloadJSON", value })
+    const value = serializeConsentDelta()
+    resolve?.({ __type__: "PayloadConsentDelta", value })
   }
 
   function handleCancel(): void {
     resolve?.({ __type__: "PayloadFalse", value: false })
   }
 
-  function serializeConsentData(): string {
-    const array = serializeTables().concat(serializeMetaData())
-    return JSON.stringify(array)
-  }
-
-  function serializeMetaData(): any[] {
-    return serializeMetaTables().concat(serializeDeletedMetaData())
-  }
-
-  function serializeTables(): any[] {
-    return tables.map((table) => serializeTable(table))
-  }
-
-  function serializeMetaTables(): any[] {
-    return metaTables.map((table) => serializeTable(table))
-  }
-
-  function serializeDeletedMetaData(): any {
-    const rawData = tables
-      .filter(({ deletedRowCount }) => deletedRowCount > 0)
-      .map(({ id, deletedRowCount }) => `User deleted ${deletedRowCount} rows from table: ${id}`)
-
-    const data = JSON.stringify(rawData)
-    return { user_omissions: data }
+  // Row ids are the positions of the rows in the table, only the deleted ones are sent back
+  function serializeConsentDelta(): string {
+    const deleted: Record<string, number[][]> = {}
+    for (const table of tables) {
+      if (table.deletedRowCount > 0) {
+        deleted[table.id] = toRanges(table.deletedRows.flat())
+      }
+    }
+    return JSON.stringify({ deleted })
   }
 
-  function serializeTable({ id, head, body: { rows } }: PropsUITable): any {
-    const data = rows.map((row) => serializeRow(row, head))
-    return { [id]: data }
+  function fromRanges(ranges: number[][]): string[] {
+    return ranges.flatMap(([start, stop]) => _.range(start, stop).map((id) => `${id}`))
   }
 
-  function serializeRow(row: PropsUITableRow, head: PropsUITableHead): any {
-    assert(
-      row.cells.length === head.cells.length,
-      `Number of cells in row (${row.cells.length}) should be equals to number of cells in head (${head.cells.length})`
-    )
-    const keys = head.cells.map((cell) => cell)
-    const values = row.cells.map((cell) => cell)
-    return _.fromPairs(_.zip(keys, values))
+  function toRanges(rowIds: string[]): number[][] {
+    const ids = _.sortedUniq(rowIds.map((id) => Number(id)).sort((a, b) => a - b))
+    const ranges: number[][] = []
+    for (const id of ids) {
+      const last = ranges[ranges.length - 1]
+      if (last !== undefined && last[1] === id) {
+        last[1] = id + 1
+      } else {
+        ranges.push([id, id + 1])
+      }
+    }
+    return ranges
   }
 
   return (
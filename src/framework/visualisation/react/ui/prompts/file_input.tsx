@@ -12,10 +12,10 @@ type Props = Weak<PropsUIPromptFileInput> & ReactFactoryContext
 
 export const FileInput = (props: Props): JSX.Element => {
   const [waiting, setWaiting] = React.useState<boolean>(false)
-  const [selectedFile, setSelectedFile] = React.useState<File>()
+  const [selectedFiles, setSelectedFiles] = React.useState<File[]>([])
   const input = React.useRef<HTMLInputElement>(null)
 
-  const { resolve } = props
+  const { resolve, multiple = false } = props
   const { description, note, placeholder, extensions, selectButton, continueButton } = prepareCopy(props)
 
   function handleClick (): void {
@@ -25,16 +25,20 @@ export const FileInput = (props: Props): JSX.Element => {
   function handleSelect (event: React.ChangeEvent<HTMLInputElement>): void {
     const files = event.target.files
     if (files != null && files.length > 0) {
-      setSelectedFile(files[0])
+      setSelectedFiles(multiple ? Array.from(files) : [files[0]])
     } else {
       console.log('[FileInput] Error selecting file: ' + JSON.stringify(files))
     }
   }
 
   function handleConfirm (): void {
-    if (selectedFile !== undefined && !waiting) {
+    if (selectedFiles.length > 0 && !waiting) {
       setWaiting(true)
-      resolve?.({ __type__: 'PayloadFile', value: selectedFile })
+      if (multiple) {
+        resolve?.({ __type__: 'PayloadFiles', value: selectedFiles })
+      } else {
+        resolve?.({ __type__: 'PayloadFile', value: selectedFiles[0] })
+      }
     }
   }
 
@@ -46,19 +50,19 @@ export const FileInput = (props: Props): JSX.Element => {
         </div>
         <div className='mt-8' />
         <div className='p-6 border-grey4 border-2 rounded'>
-          <input ref={input} id='input' type='file' className='hidden' accept={extensions} onChange={handleSelect} />
+          <input ref={input} id='input' type='file' className='hidden' accept={extensions} multiple={multiple} onChange={handleSelect} />
           <div className='flex flex-row gap-4 items-center'>
-            <BodyLarge text={selectedFile?.name ?? placeholder} margin='' color={selectedFile === undefined ? 'text-grey2' : 'textgrey1'} />
+            <BodyLarge text={selectedFiles.length > 0 ? selectedFiles.map((file) => file.name).join(', ') : placeholder} margin='' color={selectedFiles.length === 0 ? 'text-grey2' : 'textgrey1'} />
             <div className='flex-grow' />
             <PrimaryButton onClick={handleClick} label={selectButton} color='bg-tertiary text-grey1' />
           </div>
         </div>
         <div className='mt-4' />
-        <div className={`${selectedFile === undefined ? 'opacity-30' : 'opacity-100'}`}>
+        <div className={`${selectedFiles.length === 0 ? 'opacity-30' : 'opacity-100'}`}>
           <BodySmall text={note} margin='' />
           <div className='mt-8' />
           <div className='flex flex-row gap-4'>
-            <PrimaryButton label={continueButton} onClick={handleConfirm} enabled={selectedFile !== undefined} spinning={waiting} />
+            <PrimaryButton label={continueButton} onClick={handleConfirm} enabled={selectedFiles.length > 0} spinning={waiting} />
           </div>
         </div>
       </div>
@@ -0,0 +1,37 @@
+import { Weak } from '../../../../helpers'
+import * as React from 'react'
+import { ReactFactoryContext } from '../../factory'
+import { PropsUIPromptProgress } from '../../../../types/prompts'
+import { Translator } from '../../../../translator'
+import { BodyLarge, BodySmall } from '../elements/text'
+import { Progress } from '../elements/progress'
+
+type Props = Weak<PropsUIPromptProgress> & ReactFactoryContext
+
+export const ProgressPrompt = (props: Props): JSX.Element => {
+  const { resolve, message, percentage } = props
+  const { description } = prepareCopy(props)
+
+  // Nothing to wait for: let the script continue while this page is shown
+  React.useEffect(() => {
+    resolve?.({ __type__: 'PayloadVoid', value: undefined })
+  }, [props])
+
+  return (
+    <>
+      <BodyLarge text={description} margin='mb-4' />
+      {percentage !== undefined && percentage !== null && <Progress percentage={percentage} />}
+      <BodySmall text={message} margin='mt-2' />
+    </>
+  )
+}
+
+interface Copy {
+  description: string
+}
+
+function prepareCopy ({ description, locale }: Props): Copy {
+  return {
+    description: Translator.translate(description, locale)
+  }
+}
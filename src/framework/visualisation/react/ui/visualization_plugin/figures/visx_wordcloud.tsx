@@ -3,7 +3,6 @@ import Wordcloud from '@visx/wordcloud/lib/Wordcloud'
 import { ParentSize } from '@visx/responsive'
 import { ScoredTerm, TextVisualizationData } from '../types'
 import { useMemo } from 'react'
-import stopwords from './common_stopwords'
 
 interface Props {
   visualizationData: TextVisualizationData
@@ -19,7 +18,8 @@ function VisxWordcloud ({ visualizationData }: Props): JSX.Element | null {
 
   const words: Word[] = useMemo(() => {
     const fontRange = [20, 50]
-    const words = visualizationData.topTerms.filter((w) => !stopwords.includes(w.text.toLowerCase())).slice(0, nWords)
+    // stopwords are already left out of the top terms (see prepareTextData and port.term_frequency)
+    const words = visualizationData.topTerms.slice(0, nWords)
 
     let minImportance = words[0].importance
     let maxImportance = words[0].importance
@@ -31,7 +31,7 @@ export const zVisualizationProps = z.object({
 })
 export type VisualizationProps = z.infer<typeof zVisualizationProps>
 
-export const zAggregationFunction = z.enum(["count", "mean", "sum", "count_pct", "pct"])
+export const zAggregationFunction = z.enum(["count", "mean", "sum", "count_pct", "pct", "max"])
 export type AggregationFunction = z.infer<typeof zAggregationFunction>
 
 export const zDateFormat = z.enum([
@@ -87,6 +87,14 @@ export const zChartVisualization = zVisualizationProps.merge(
     type: zChartVisualizationType,
     group: zAggregationGroup,
     values: z.array(zAggregationValue),
+    downsample: z.object({ target: z.number() }).optional(),
+    // points selected by the Python script (LTTB), with the min and max of each value per point
+    downsampled: z
+      .object({
+        rowCount: z.number(),
+        data: z.array(z.record(z.union([z.string(), z.number()]))),
+      })
+      .optional(),
   })
 )
 export type ChartVisualization = z.infer<typeof zChartVisualization>
@@ -120,6 +128,9 @@ export const zTextVisualization = zVisualizationProps.merge(
     valueColumn: z.string().optional(),
     tokenize: z.boolean().optional(),
     extract: z.enum(["url_domain"]).optional(),
+    // precomputed by the Python script for the complete table (rowCount rows)
+    topTerms: z.array(z.object({ text: z.string(), value: z.number(), importance: z.number() })).optional(),
+    rowCount: z.number().optional(),
   })
 )
 export type TextVisualization = z.infer<typeof zTextVisualization>
@@ -0,0 +1,96 @@
+import { Table, VisualizationType } from '../types'
+
+// Number of (table, visualization) aggregates kept per worker
+const CACHE_SIZE = 4
+
+// Aggregates of one visualization of a table that follow the rows in the table.
+// Every row is parsed once, the first time it is seen. After that an update only adds and
+// subtracts the contributions of the rows that were removed from (or restored to) the table,
+// so deleting rows in the consent form costs time proportional to the deleted rows.
+export abstract class RowAggregate {
+  private readonly rowIndex = new Map<string, number>()
+  private readonly ids: string[] = []
+  private readonly live: boolean[] = []
+  private readonly seen: number[] = []
+  private generation = 0
+  // indexes of the rows in the table of the last sync, in table order
+  protected present: number[] = []
+
+  // Stores what the aggregate needs of a row that has not been seen before
+  protected abstract parseRow (index: number, cells: string[]): void
+  protected abstract addRow (index: number): void
+  protected abstract removeRow (index: number): void
+
+  // Parses the rows that were not seen before, and finds the rows that are in the table
+  protected sync (table: Table): void {
+    this.generation += 1
+    this.present = new Array(table.body.rows.length)
+
+    for (let i = 0; i < table.body.rows.length; i++) {
+      const row = table.body.rows[i]
+      let index = this.rowIndex.get(row.id)
+      if (index === undefined) {
+        index = this.live.length
+        this.rowIndex.set(row.id, index)
+        this.ids.push(row.id)
+        this.live.push(false)
+        this.seen.push(0)
+        this.parseRow(index, row.cells)
+      }
+      this.seen[index] = this.generation
+      this.present[i] = index
+    }
+  }
+
+  // Subtracts the rows that left the table since the previous sync, then adds the new ones
+  protected applyChanges (): void {
+    for (let index = 0; index < this.live.length; index++) {
+      if (this.live[index] && this.seen[index] !== this.generation) {
+        this.removeRow(index)
+        this.live[index] = false
+      }
+    }
+    for (const index of this.present) {
+      if (!this.live[index]) {
+        this.addRow(index)
+        this.live[index] = true
+      }
+    }
+  }
+
+  protected rowIds (indexes: Iterable<number>): string[] {
+    return Array.from(indexes, (index) => this.ids[index])
+  }
+}
+
+// Aggregates by table and visualization, the least recently used are dropped
+export class AggregateCache {
+  private readonly entries = new Map<string, RowAggregate>()
+
+  get<T extends RowAggregate> (table: Table, visualization: VisualizationType, create: () => T): T {
+    const key = cacheKey(table, visualization)
+    let entry = this.entries.get(key)
+    if (entry === undefined) {
+      entry = create()
+    } else {
+      this.entries.delete(key)
+    }
+    this.entries.set(key, entry)
+
+    if (this.entries.size > CACHE_SIZE) {
+      this.entries.delete(Array.from(this.entries.keys())[0])
+    }
+    return entry as T
+  }
+
+  replace<T extends RowAggregate> (table: Table, visualization: VisualizationType, entry: T): T {
+    const key = cacheKey(table, visualization)
+    this.entries.delete(key)
+    this.entries.set(key, entry)
+    return entry
+  }
+}
+
+function cacheKey (table: Table, visualization: VisualizationType): string {
+  return JSON.stringify([table.id, table.head.cells, visualization])
+}
@@ -1,16 +1,50 @@
-import { formatDate, getTableColumn } from './util'
-import { Table, TickerFormat, ChartVisualizationData, ChartVisualization, AxisSettings } from '../types'
+import {
+  autoFormatDate,
+  createSortable,
+  formatDate,
+  getColumnIndex,
+  getDateFormatter,
+  getDomain,
+  getTableColumn
+} from './util'
+import { AggregateCache, RowAggregate } from './aggregateCache'
+import {
+  Table,
+  TickerFormat,
+  ChartVisualizationData,
+  ChartVisualization,
+  AxisSettings,
+  DateFormat
+} from '../types'
 
 export async function prepareChartData (
   table: Table,
-  visualization: ChartVisualization
+  visualization: ChartVisualization,
+  cache?: AggregateCache
 ): Promise<ChartVisualizationData> {
   if (table.body.rows.length === 0) return { type: visualization.type, xKey: '', xLabel: '', yKeys: {}, data: [] }
 
-  const aggregate = aggregateData(table, visualization)
+  if (visualization.downsampled != null) return createDownsampledData(table, visualization)
+
+  const aggregate = cache != null ? updateAggregate(table, visualization, cache) : aggregateData(table, visualization)
   return createVisualizationData(table, visualization, aggregate)
 }
 
+// Brings the cached aggregate of the visualization up to date with the rows in table
+function updateAggregate (
+  table: Table,
+  visualization: ChartVisualization,
+  cache: AggregateCache
+): Record<string, PrepareAggregatedData> {
+  const chartAggregate = cache.get(table, visualization, () => new ChartAggregate(table, visualization))
+  if (chartAggregate.update(table)) return chartAggregate.aggregate()
+
+  // the automatic date format changed with the rows, so every x value has to be formatted again
+  const rebuilt = cache.replace(table, visualization, new ChartAggregate(table, visualization))
+  rebuilt.update(table)
+  return rebuilt.aggregate()
+}
+
 function createVisualizationData (
   table: Table,
   visualization: ChartVisualization,
@@ -34,6 +68,35 @@ function createVisualizationData (
   return visualizationData
 }
 
+// Points downsampled in Python stay bounded: the points of deleted rows are left out.
+// The envelope (the min and max around every point) is computed from all rows,
+// so it is left out as well once rows are deleted
+function createDownsampledData (table: Table, visualization: ChartVisualization): ChartVisualizationData {
+  const visualizationData = initializeVisualizationData(table, visualization)
+  const rowIds = new Set(table.body.rows.map((row) => row.id))
+  const envelopeKeys = visualization.values.flatMap((value) => [`${value.column}.min`, `${value.column}.max`])
+  const showEnvelope = table.body.rows.length >= (visualization.downsampled?.rowCount ?? 0)
+
+  if (showEnvelope) {
+    for (const value of visualization.values) {
+      const { tickerFormat } = visualizationData.yKeys[value.column]
+      visualizationData.yKeys[`${value.column}.min`] = { id: `${value.column}.min`, label: 'min', tickerFormat }
+      visualizationData.yKeys[`${value.column}.max`] = { id: `${value.column}.max`, label: 'max', tickerFormat }
+    }
+  }
+
+  visualizationData.data = (visualization.downsampled?.data ?? [])
+    .filter((point) => rowIds.has(String(point.__rowId)))
+    .map((point) => {
+      const d: Record<string, any> = { ...point }
+      if (!showEnvelope) for (const key of envelopeKeys) delete d[key]
+      for (const key of Object.keys(visualizationData.yKeys)) d[key] = Math.round(Number(d[key]) * 100) / 100
+      return d
+    })
+
+  return visualizationData
+}
+
 function initializeVisualizationData (table: Table, visualization: ChartVisualization): ChartVisualizationData {
   const yKeys: Record<string, AxisSettings> = {}
   for (const value of visualization.values) {
@@ -132,11 +195,14 @@ function aggregateData (table: Table, visualization: ChartVisualization): Record
       if (aggregate[xValue].rowIds[group] === undefined) aggregate[xValue].rowIds[group] = []
       aggregate[xValue].rowIds[group].push(rowIds[i])
 
-      if (aggregate[xValue].values[group] === undefined) aggregate[xValue].values[group] = 0
+      if (aggregate[xValue].values[group] === undefined) aggregate[xValue].values[group] = aggFun === 'max' ? -Infinity : 0
       if (aggFun === 'count' || aggFun === 'count_pct') aggregate[xValue].values[group] += 1
       if (aggFun === 'sum' || aggFun === 'mean' || aggFun === 'pct') {
         aggregate[xValue].values[group] += Number(yValue) ?? 0
       }
+      if (aggFun === 'max' && !isNaN(Number(yValue))) {
+        aggregate[xValue].values[group] = Math.max(aggregate[xValue].values[group], Number(yValue))
+      }
     }
 
     // use groupSummary to calculate the mean, pct and count_pct aggregations
@@ -146,6 +212,9 @@ function aggregateData (table: Table, visualization: ChartVisualization): Record
           if (addZeroes) aggregate[xValue].values[group] = 0
           else continue
         }
+        if (aggFun === 'max' && !isFinite(aggregate[xValue].values[group])) {
+          aggregate[xValue].values[group] = 0
+        }
         if (aggFun === 'mean') {
           aggregate[xValue].values[group] = Number(aggregate[xValue].values[group]) / groupSummary[group].n
         }
@@ -190,6 +259,271 @@ function prepareX (
   return { groupBy, xSortable }
 }
 
+interface Accumulator {
+  members: Set<number>
+  sum: number
+  nan: number
+  max: number
+}
+
+interface GroupSummary {
+  n: number
+  sum: number
+  nan: number
+}
+
+// The aggregate of aggregateData, with the contribution of every row kept apart (see RowAggregate).
+// Per value it holds an accumulator per x value and group, with the rows that are in it,
+// and per group the summary used for the mean, pct and count_pct aggregations.
+// Sums and counts are updated by subtracting the removed rows, a max only looks at the
+// rows of its group when the row that held the max is removed.
+export class ChartAggregate extends RowAggregate {
+  private readonly visualization: ChartVisualization
+  private readonly xColumn: number
+  private readonly yColumns: Array<number | null>
+  private readonly groupColumns: Array<number | null>
+
+  private format: DateFormat | undefined
+  private formatter: ((date: Date) => string) | undefined
+  private fixedDomain: [number, number] | null = null
+  private domain: [number, number] | null = null
+  private xSortable: Record<string, string | number> | null = null
+
+  // per row
+  private readonly xRaw: string[] = []
+  private readonly x: Array<string | undefined> = []
+  private readonly dateNumbers: number[] = []
+  private readonly y: number[][]
+  private readonly groups: string[][]
+
+  // per value
+  private readonly buckets: Array<Map<string, Map<string, Accumulator>>>
+  private readonly summaries: Array<Map<string, GroupSummary>>
+
+  constructor (table: Table, visualization: ChartVisualization) {
+    super()
+    this.visualization = visualization
+    this.xColumn = getColumnIndex(table, visualization.group.column)
+    this.yColumns = visualization.values.map((value) =>
+      value.column === '.COUNT' ? null : getColumnIndex(table, value.column)
+    )
+    this.groupColumns = visualization.values.map((value) =>
+      value.group_by !== undefined ? getColumnIndex(table, value.group_by) : null
+    )
+    this.y = visualization.values.map(() => [])
+    this.groups = visualization.values.map(() => [])
+    this.buckets = visualization.values.map(() => new Map())
+    this.summaries = visualization.values.map(() => new Map())
+
+    const { levels } = visualization.group
+    if (levels !== undefined) {
+      this.xSortable = {}
+      for (let i = 0; i < levels.length; i++) this.xSortable[levels[i]] = i
+    }
+  }
+
+  // Returns false if the aggregate has to be rebuilt for this table
+  update (table: Table): boolean {
+    this.sync(table)
+    if (this.visualization.group.dateFormat !== undefined && !this.updateDates(this.visualization.group.dateFormat)) {
+      return false
+    }
+    this.applyChanges()
+    return true
+  }
+
+  // The date format and sortable x values, as formatDate determines them for the rows in the table
+  private updateDates (dateFormat: DateFormat): boolean {
+    const dateNumbers = this.present.map((index) => this.dateNumbers[index])
+    const format = dateFormat === 'auto' ? autoFormatDate(dateNumbers, 10) : dateFormat
+
+    if (this.format === undefined) {
+      this.format = format
+      const { formatter, domain } = getDateFormatter(format)
+      this.formatter = formatter
+      this.fixedDomain = domain
+    }
+    if (format !== this.format || this.formatter === undefined) return false
+
+    if (this.visualization.group.levels !== undefined) return true
+    const domain = this.fixedDomain ?? getDomain(dateNumbers)
+    if (this.domain === null || domain[0] !== this.domain[0] || domain[1] !== this.domain[1]) {
+      this.domain = domain
+      this.xSortable = createSortable(domain, format, this.formatter)
+    }
+    return true
+  }
+
+  protected parseRow (index: number, cells: string[]): void {
+    this.xRaw[index] = cells[this.xColumn]
+    if (this.visualization.group.dateFormat !== undefined) {
+      this.dateNumbers[index] = new Date(cells[this.xColumn]).getTime()
+    }
+
+    this.visualization.values.forEach((value, k) => {
+      const yColumn = this.yColumns[k]
+      const groupColumn = this.groupColumns[k]
+      this.y[k][index] = yColumn !== null ? Number(cells[yColumn]) : 1
+      this.groups[k][index] = groupColumn !== null ? `${value.column}.GROUP_BY.${cells[groupColumn]}` : value.column
+    })
+  }
+
+  protected addRow (index: number): void {
+    const xValue = this.xValue(index)
+    if (!this.inRange(xValue)) return
+
+    for (let k = 0; k < this.visualization.values.length; k++) {
+      const y = this.y[k][index]
+      const group = this.groups[k][index]
+
+      let summary = this.summaries[k].get(group)
+      if (summary === undefined) {
+        summary = { n: 0, sum: 0, nan: 0 }
+        this.summaries[k].set(group, summary)
+      }
+      summary.n += 1
+      if (isNaN(y)) summary.nan += 1
+      else summary.sum += y
+
+      let groups = this.buckets[k].get(xValue)
+      if (groups === undefined) {
+        groups = new Map()
+        this.buckets[k].set(xValue, groups)
+      }
+      let accumulator = groups.get(group)
+      if (accumulator === undefined) {
+        accumulator = { members: new Set(), sum: 0, nan: 0, max: -Infinity }
+        groups.set(group, accumulator)
+      }
+      accumulator.members.add(index)
+      if (isNaN(y)) {
+        accumulator.nan += 1
+      } else {
+        accumulator.sum += y
+        accumulator.max = Math.max(accumulator.max, y)
+      }
+    }
+  }
+
+  protected removeRow (index: number): void {
+    const xValue = this.xValue(index)
+    if (!this.inRange(xValue)) return
+
+    for (let k = 0; k < this.visualization.values.length; k++) {
+      const y = this.y[k][index]
+      const group = this.groups[k][index]
+
+      const summary = this.summaries[k].get(group) as GroupSummary
+      summary.n -= 1
+      if (isNaN(y)) summary.nan -= 1
+      else summary.sum -= y
+      if (summary.n === 0) this.summaries[k].delete(group)
+
+      const groups = this.buckets[k].get(xValue) as Map<string, Accumulator>
+      const accumulator = groups.get(group) as Accumulator
+      accumulator.members.delete(index)
+      if (isNaN(y)) {
+        accumulator.nan -= 1
+      } else {
+        accumulator.sum -= y
+        if (y === accumulator.max) accumulator.max = this.maxOf(k, accumulator.members)
+      }
+      if (accumulator.members.size === 0) groups.delete(group)
+      if (groups.size === 0) this.buckets[k].delete(xValue)
+    }
+  }
+
+  // The same aggregate aggregateData computes for the rows in the table
+  aggregate (): Record<string, PrepareAggregatedData> {
+    const aggregate: Record<string, PrepareAggregatedData> = {}
+    const xKey = this.visualization.group.column
+    const xSortable = this.xSortable
+
+    const anyAddZeroes = this.visualization.values.some((value) => value.addZeroes === true)
+    if (anyAddZeroes && xSortable != null) {
+      for (const [uniqueValue, sortby] of Object.entries(xSortable)) {
+        aggregate[uniqueValue] = {
+          sortBy: sortby,
+          rowIds: {},
+          xKey,
+          xValue: uniqueValue,
+          values: {}
+        }
+      }
+    }
+
+    this.visualization.values.forEach((value, k) => {
+      const aggFun = value.aggregate !== undefined ? value.aggregate : 'count'
+      const addZeroes = value.addZeroes ?? false
+
+      this.buckets[k].forEach((groups, xValue) => {
+        if (aggregate[xValue] === undefined) {
+          aggregate[xValue] = {
+            sortBy: xSortable != null ? xSortable[xValue] : xValue,
+            rowIds: {},
+            xKey,
+            xValue,
+            values: {}
+          }
+        }
+
+        const { rowIds, values } = aggregate[xValue]
+        groups.forEach((accumulator, group) => {
+          const ids = this.rowIds(accumulator.members)
+          rowIds[group] = rowIds[group] === undefined ? ids : rowIds[group].concat(ids)
+
+          if (values[group] === undefined) values[group] = aggFun === 'max' ? -Infinity : 0
+          if (aggFun === 'count' || aggFun === 'count_pct') values[group] += accumulator.members.size
+          if (aggFun === 'sum' || aggFun === 'mean' || aggFun === 'pct') {
+            values[group] += accumulator.nan > 0 ? NaN : accumulator.sum
+          }
+          if (aggFun === 'max') values[group] = Math.max(values[group], accumulator.max)
+        })
+      })
+
+      // as in aggregateData
+      this.summaries[k].forEach((summary, group) => {
+        const sum = summary.nan > 0 ? NaN : summary.sum
+        for (const xValue of Object.keys(aggregate)) {
+          const values = aggregate[xValue].values
+          if (values[group] === undefined) {
+            if (addZeroes) values[group] = 0
+            else continue
+          }
+          if (aggFun === 'max' && !isFinite(values[group])) values[group] = 0
+          if (aggFun === 'mean') values[group] = Number(values[group]) / summary.n
+          if (aggFun === 'count_pct') values[group] = (100 * Number(values[group])) / summary.n
+          if (aggFun === 'pct') values[group] = (100 * Number(values[group])) / sum
+        }
+      })
+    })
+
+    return aggregate
+  }
+
+  private xValue (index: number): string {
+    let xValue = this.x[index]
+    if (xValue === undefined) {
+      xValue = this.formatter !== undefined ? this.formatter(new Date(this.dateNumbers[index])) : this.xRaw[index]
+      this.x[index] = xValue
+    }
+    return xValue
+  }
+
+  private inRange (xValue: string): boolean {
+    const { range } = this.visualization.group
+    return range === undefined || !(Number(xValue) < range[0] || Number(xValue) > range[1])
+  }
+
+  private maxOf (k: number, members: Set<number>): number {
+    let max = -Infinity
+    members.forEach((index) => {
+      if (!isNaN(this.y[k][index])) max = Math.max(max, this.y[k][index])
+    })
+    return max
+  }
+}
+
 export interface PrepareAggregatedData {
   xKey: string
   xValue: string
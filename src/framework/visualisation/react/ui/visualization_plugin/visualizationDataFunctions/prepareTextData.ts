@@ -1,12 +1,21 @@
-import { extractUrlDomain, getTableColumn, tokenize } from './util'
+import { extractUrlDomain, getColumnIndex, getTableColumn, tokenize } from './util'
+import { AggregateCache, RowAggregate } from './aggregateCache'
 import { TextVisualizationData, TextVisualization, ScoredTerm, Table } from '../types'
+import stopwords from '../figures/common_stopwords'
+
+// Stopwords are removed before the top terms are selected, like port.term_frequency does in Python
+const STOPWORDS = new Set(stopwords)
 
 interface VocabularyStats {
   value: number
   docFreq: number
 }
 
-export async function prepareTextData (table: Table, visualization: TextVisualization): Promise<TextVisualizationData> {
+export async function prepareTextData (
+  table: Table,
+  visualization: TextVisualization,
+  cache?: AggregateCache
+): Promise<TextVisualizationData> {
   const visualizationData: TextVisualizationData = {
     type: visualization.type,
     topTerms: []
@@ -14,6 +23,19 @@ export async function prepareTextData (table: Table, visualization: TextVisualiz
 
   if (table.body.rows.length === 0) return visualizationData
 
+  // Terms computed in Python are valid as long as no rows were removed from the table
+  if (visualization.topTerms != null && visualization.rowCount === table.body.rows.length) {
+    visualizationData.topTerms = visualization.topTerms
+    return visualizationData
+  }
+
+  if (cache != null) {
+    const textAggregate = cache.get(table, visualization, () => new TextAggregate(table, visualization))
+    textAggregate.update(table)
+    visualizationData.topTerms = getTopTerms(textAggregate.vocabulary(), table.body.rows.length, 200)
+    return visualizationData
+  }
+
   const texts = getTableColumn(table, visualization.textColumn)
   const values = visualization.valueColumn != null ? getTableColumn(table, visualization.valueColumn) : null
 
@@ -23,6 +45,81 @@ export async function prepareTextData (table: Table, visualization: TextVisualiz
   return visualizationData
 }
 
+// The vocabulary of getVocabulary, with the terms of every row kept so they can be subtracted again
+// (see RowAggregate)
+export class TextAggregate extends RowAggregate {
+  private readonly visualization: TextVisualization
+  private readonly textColumn: number
+  private readonly valueColumn: number | null
+  private readonly terms = new Map<string, VocabularyStats>()
+
+  // per row
+  private readonly tokens: string[][] = []
+  private readonly values: number[] = []
+
+  constructor (table: Table, visualization: TextVisualization) {
+    super()
+    this.visualization = visualization
+    this.textColumn = getColumnIndex(table, visualization.textColumn)
+    this.valueColumn = visualization.valueColumn != null ? getColumnIndex(table, visualization.valueColumn) : null
+  }
+
+  update (table: Table): void {
+    this.sync(table)
+    this.applyChanges()
+  }
+
+  vocabulary (): Record<string, VocabularyStats> {
+    const vocabulary: Record<string, VocabularyStats> = {}
+    this.terms.forEach((stats, term) => { vocabulary[term] = stats })
+    return vocabulary
+  }
+
+  protected parseRow (index: number, cells: string[]): void {
+    const text = cells[this.textColumn]
+    let tokens: string[] = []
+    if (text != null) {
+      tokens = this.visualization.tokenize != null && this.visualization.tokenize ? tokenize(text) : [text]
+      if (this.visualization.extract === 'url_domain') tokens = tokens.map(extractUrlDomain)
+    }
+    this.tokens[index] = tokens
+    this.values[index] = this.valueColumn !== null ? Number(cells[this.valueColumn]) : 1
+  }
+
+  protected addRow (index: number): void {
+    const v = this.values[index]
+    const seen = new Set<string>()
+    for (const token of this.tokens[index]) {
+      let stats = this.terms.get(token)
+      if (stats === undefined) {
+        stats = { value: 0, docFreq: 0 }
+        this.terms.set(token, stats)
+      }
+      if (!seen.has(token)) {
+        stats.docFreq += 1
+        seen.add(token)
+      }
+      if (!isNaN(v)) stats.value += v
+    }
+  }
+
+  protected removeRow (index: number): void {
+    const v = this.values[index]
+    const seen = new Set<string>()
+    for (const token of this.tokens[index]) {
+      const stats = this.terms.get(token) as VocabularyStats
+      if (!seen.has(token)) {
+        stats.docFreq -= 1
+        seen.add(token)
+      }
+      if (!isNaN(v)) stats.value -= v
+    }
+    seen.forEach((token) => {
+      if ((this.terms.get(token) as VocabularyStats).docFreq === 0) this.terms.delete(token)
+    })
+  }
+}
+
 function getVocabulary (
   texts: string[],
   values: string[] | null,
@@ -53,6 +150,7 @@ function getVocabulary (
 
 function getTopTerms (vocabulary: Record<string, VocabularyStats>, nDocs: number, topTerms: number): ScoredTerm[] {
   return Object.entries(vocabulary)
+    .filter(([text]) => !STOPWORDS.has(text.toLowerCase()))
     .map(([text, stats]) => {
       const tf = stats.value
       const idf = Math.log(nDocs / stats.docFreq)
@@ -5,13 +5,25 @@ export function formatDate(
   format: DateFormat,
   minValues: number = 10
 ): [string[], Record<string, number> | null] {
-  let formattedDate: string[] = dateString;
   const dateNumbers = dateString.map((date) => new Date(date).getTime());
-  let domain: [number, number] | null = null;
-  let formatter: (date: Date) => string = (date) => date.toISOString();
 
   if (format === "auto") format = autoFormatDate(dateNumbers, minValues);
 
+  const { formatter, domain } = getDateFormatter(format);
+  const formattedDate = dateNumbers.map((date) => formatter(new Date(date)));
+  const sortableDate: Record<string, number> | null = createSortable(domain ?? getDomain(dateNumbers), format, formatter);
+
+  return [formattedDate, sortableDate];
+}
+
+// The formatter of a (resolved, not "auto") date format, and its fixed domain if it is a cycle
+export function getDateFormatter(format: DateFormat): {
+  formatter: (date: Date) => string;
+  domain: [number, number] | null;
+} {
+  let domain: [number, number] | null = null;
+  let formatter: (date: Date) => string = (date) => date.toISOString();
+
   if (format === "year") formatter = (date) => date.getFullYear().toString();
 
   if (format === "quarter") {
@@ -74,14 +86,10 @@ export function formatDate(
     domain = [new Date("2000-01-01").getTime(), new Date("2000-01-02").getTime()];
   }
 
-  formattedDate = dateNumbers.map((date) => formatter(new Date(date)));
-  if (domain == null) domain = getDomain(dateNumbers);
-  const sortableDate: Record<string, number> | null = createSortable(domain, format, formatter);
-
-  return [formattedDate, sortableDate];
+  return { formatter, domain };
 }
 
-function autoFormatDate(dateNumbers: number[], minValues: number): DateFormat {
+export function autoFormatDate(dateNumbers: number[], minValues: number): DateFormat {
   const [minTime, maxTime] = getDomain(dateNumbers);
 
   let autoFormat: DateFormat = "hour";
@@ -93,7 +101,7 @@ function autoFormatDate(dateNumbers: number[], minValues: number): DateFormat {
   return autoFormat;
 }
 
-function createSortable(
+export function createSortable(
   domain: [number, number],
   interval: string,
   formatter: (date: Date) => string
@@ -125,7 +133,7 @@ function createSortable(
   return sortable;
 }
 
-function getDomain(numbers: number[]): [number, number] {
+export function getDomain(numbers: number[]): [number, number] {
   let min = numbers[0];
   let max = numbers[0];
   numbers.forEach((nr) => {
@@ -145,9 +153,14 @@ export function getTableColumn(table: Table, column: string): string[] {
     // special case: just return array with values of 1
     return Array(table.body.rows.length).fill("1");
   }
+  const columnIndex = getColumnIndex(table, column);
+  return table.body.rows.map((row) => row.cells[columnIndex]);
+}
+
+export function getColumnIndex(table: Table, column: string): number {
   const columnIndex = table.head.cells.findIndex((cell) => cell === column);
   if (columnIndex < 0) throw new Error(`column ${table.id}.${column} not found`);
-  return table.body.rows.map((row) => row.cells[columnIndex]);
+  return columnIndex;
 }
 
 export function rescaleToRange(value: number, min: number, max: number, newMin: number, newMax: number): number {
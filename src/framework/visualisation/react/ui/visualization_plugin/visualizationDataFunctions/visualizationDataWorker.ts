@@ -1,12 +1,17 @@
 import { ChartVisualization, TextVisualization, VisualizationType, VisualizationData, Table } from '../types'
 import { prepareChartData } from './prepareChartData'
 import { prepareTextData } from './prepareTextData'
+import { AggregateCache } from './aggregateCache'
 
 interface Input {
   table: Table
   visualization: VisualizationType
 }
 
+// The worker belongs to one figure, and gets its table again every time rows are deleted:
+// the aggregates are kept so only the deleted rows have to be subtracted
+const cache = new AggregateCache()
+
 self.onmessage = (e: MessageEvent<Input>) => {
   createVisualizationData(e.data.table, e.data.visualization)
     .then((visualizationData) => {
@@ -21,9 +26,9 @@ self.onmessage = (e: MessageEvent<Input>) => {
 async function createVisualizationData (table: Table, visualization: VisualizationType): Promise<VisualizationData> {
   if (table === undefined || visualization === undefined) throw new Error('Table and visualization are required')
 
-  if (['line', 'bar', 'area'].includes(visualization.type)) { return await prepareChartData(table, visualization as ChartVisualization) }
+  if (['line', 'bar', 'area'].includes(visualization.type)) { return await prepareChartData(table, visualization as ChartVisualization, cache) }
 
-  if (['wordcloud'].includes(visualization.type)) { return await prepareTextData(table, visualization as TextVisualization) }
+  if (['wordcloud'].includes(visualization.type)) { return await prepareTextData(table, visualization as TextVisualization, cache) }
 
   throw new Error(`Visualization type ${visualization.type} not supported`)
 }